@@ -15,6 +15,21 @@ Phase 1完全版システム - 一括処理スクリプト
     
     # 未処理の証拠を自動検出して一括処理
     python3 batch_process.py --auto
+    
+    # プロバイダーのバッチAPIに提出し、後で結果を取り込み（夜間一括再分析向け）
+    python3 batch_process.py --range ko70-73 --directory /path/to/evidence_files/ --submit-batch openai
+    python3 batch_process.py --ingest-batch batch_jobs/openai_XXXX/job.json --wait
+    
+    # AI分析結果キャッシュを使わずに再分析
+    python3 batch_process.py --range ko70-73 --directory /path/to/evidence_files/ --no-cache
+    
+    # OCR言語を固定（自動選択せず、指定した言語データのみ使用）
+    python3 batch_process.py --range ko70-73 --directory /path/to/evidence_files/ --ocr-languages jpn+eng
+    
+    # AI応答を記録し、ネットワークなしで再生してスループットを計測
+    python3 batch_process.py --range ko70-73 --directory /path/to/evidence_files/ --no-cache --record-ai cassettes/
+    AI_REPLAY_LATENCY_SCALE=1.0 AI_REPLAY_ERROR_RATE=0.05 \
+        python3 batch_process.py --range ko70-73 --directory /path/to/evidence_files/ --no-cache --replay-ai cassettes/
 
 【機能】
     - 複数証拠の一括処理
@@ -43,6 +58,10 @@ try:
     from src.metadata_extractor import MetadataExtractor
     from src.file_processor import FileProcessor
     from src.ai_analyzer_complete import AIAnalyzerComplete
+    from src.evidence_artifacts import EvidenceArtifacts
+    from src.ai_cassette import ai_cassette
+    from src.ocr_cache import ocr_cache
+    from src.ocr_language_selector import ocr_language_selector
 except ImportError as e:
     print(f"❌ エラー: モジュールのインポートに失敗しました: {e}")
     sys.exit(1)
@@ -62,12 +81,12 @@ logger = logging.getLogger(__name__)
 class BatchProcessor:
     """一括処理クラス"""
     
-    def __init__(self, database_path="database.json"):
+    def __init__(self, database_path="database.json", use_cache: bool = None):
         """初期化"""
         self.database_path = database_path
         self.metadata_extractor = MetadataExtractor()
         self.file_processor = FileProcessor()
-        self.ai_analyzer = AIAnalyzerComplete()
+        self.ai_analyzer = AIAnalyzerComplete(use_cache=use_cache)
         
         self.success_count = 0
         self.failed_count = 0
@@ -167,31 +186,38 @@ class BatchProcessor:
             
             logger.info(f"📁 ファイル: {file_path}")
             
+            # メタデータ・ファイル処理結果はAI分析でも再利用（ハッシュ計算・OCRの重複実行を防ぐ）
+            file_type = detect_file_type(file_path)
+            artifacts = EvidenceArtifacts(file_path, file_type)
+            
             # 1. メタデータ抽出
             logger.info(f"📊 メタデータを抽出中...")
-            metadata = self.metadata_extractor.extract_complete_metadata(file_path)
-            logger.info(f"  ✅ SHA-256: {metadata['file_hash']['sha256'][:16]}...")
-            logger.info(f"  ✅ サイズ: {metadata['file_size_bytes'] / 1024:.2f} KB")
+            metadata = artifacts.get_metadata(self.metadata_extractor)
+            logger.info(f"  ✅ SHA-256: {metadata['hashes']['sha256'][:16]}...")
+            logger.info(f"  ✅ サイズ: {metadata['basic']['file_size_human']}")
             
             # 2. ファイル処理
             logger.info(f"🔧 ファイルを処理中...")
-            processed_data = self.file_processor.process_file(file_path, evidence_number)
+            processed_data = artifacts.get_file_content(self.file_processor)
             logger.info(f"  ✅ タイプ: {processed_data['file_type']}")
-            logger.info(f"  ✅ 抽出画像数: {len(processed_data.get('images', []))}")
             
             # 3. AI分析
             logger.info(f"🤖 AI分析を実行中（GPT-4o Vision）...")
-            analysis_result = self.ai_analyzer.analyze_complete(  # TODO: analyze_evidence_complete への移行を検討  # TODO: analyze_evidence_complete への移行を検討
-                processed_data=processed_data,
-                evidence_number=evidence_number
+            analysis_result = self.ai_analyzer.analyze_evidence_complete(
+                evidence_id=evidence_number,
+                file_path=file_path,
+                file_type=file_type,
+                gdrive_file_info=None,
+                case_info=database.get("case_info", {}),
+                artifacts=artifacts
             )
             
             # 4. 品質評価
-            quality_scores = analysis_result['quality_scores']
+            quality_scores = analysis_result.get('quality_assessment', {})
             logger.info(f"📈 品質評価:")
-            logger.info(f"  ✅ 完全性: {quality_scores['completeness_score']:.1f}%")
-            logger.info(f"  ✅ 信頼度: {quality_scores['confidence_score']:.1f}%")
-            logger.info(f"  ✅ 言語化レベル: {quality_scores['verbalization_level']}")
+            logger.info(f"  ✅ 完全性: {quality_scores.get('completeness_score', 0):.1%}")
+            logger.info(f"  ✅ 信頼度: {quality_scores.get('confidence_score', 0):.1%}")
+            logger.info(f"  ✅ 言語化レベル: {quality_scores.get('verbalization_level', 0)}")
             
             # 5. database.jsonに保存
             logger.info(f"💾 database.jsonに保存中...")
@@ -276,8 +302,8 @@ class BatchProcessor:
             logger.info(f"  ❌ 失敗: {self.failed_count}")
             logger.info(f"  📈 進捗率: {idx}/{len(evidence_list)} ({idx/len(evidence_list)*100:.1f}%)")
             
-            # 少し待機（APIレート制限対策）
-            if idx < len(evidence_list):
+            # 少し待機（APIレート制限対策、再生時は不要）
+            if idx < len(evidence_list) and ai_cassette.mode != 'replay':
                 time.sleep(2)
         
         end_time = datetime.now()
@@ -286,6 +312,107 @@ class BatchProcessor:
         # 最終レポート
         self.print_final_report(duration)
     
+    def submit_provider_batch(
+        self,
+        evidence_list: List[Dict[str, str]],
+        provider: str,
+        skip_completed: bool = True
+    ) -> Dict:
+        """プロバイダーのバッチAPIに一括提出（オフライン一括分析）
+        
+        Args:
+            evidence_list: 証拠情報のリスト [{"number": "ko70", "file": "/path/to/file"}, ...]
+            provider: 'openai' | 'anthropic' | 'local'
+            skip_completed: 完了済み証拠をスキップするか
+            
+        Returns:
+            ジョブ情報（job_dir/job.json に保存済み）
+        """
+        database = self.load_database()
+        batch_entries = []
+        
+        for idx, evidence in enumerate(evidence_list, 1):
+            evidence_number = evidence["number"]
+            file_path = evidence["file"]
+            
+            if skip_completed and self.is_evidence_completed(database, evidence_number):
+                logger.info(f"⏭️  証拠 {evidence_number} は既に処理済みです（スキップ）")
+                self.skipped_count += 1
+                continue
+            
+            logger.info(f"[{idx}/{len(evidence_list)}] リクエスト作成: {evidence_number}")
+            try:
+                batch_entries.append(self.ai_analyzer.build_batch_request(
+                    evidence_id=evidence_number,
+                    file_path=file_path,
+                    file_type=detect_file_type(file_path),
+                    gdrive_file_info=None,
+                    case_info=database.get("case_info", {}),
+                    provider=provider
+                ))
+            except Exception as e:
+                logger.error(f"❌ リクエスト作成失敗: {evidence_number} - {e}")
+                self.failed_count += 1
+        
+        if not batch_entries:
+            raise ValueError("提出するリクエストがありません")
+        
+        job = self.ai_analyzer.write_batch_file(batch_entries, provider=provider)
+        job = self.ai_analyzer.submit_batch(job)
+        
+        logger.info(f"📤 バッチを提出しました: {', '.join(job['batch_ids'])} ({job['request_count']}件)")
+        logger.info(f"   結果の取り込み: python3 batch_process.py --ingest-batch {os.path.join(job['job_dir'], 'job.json')}")
+        return job
+    
+    def ingest_provider_batch(self, job_path: str, wait: bool = False) -> int:
+        """バッチ結果をdatabase.jsonに取り込み
+        
+        Args:
+            job_path: submit_provider_batch で作成された job.json のパス
+            wait: 未完了の場合に完了まで待機するか
+            
+        Returns:
+            取り込んだ件数
+        """
+        with open(job_path, 'r', encoding='utf-8') as f:
+            job = json.load(f)
+        
+        status = self.ai_analyzer.poll_batch(job, timeout=None if wait else 0)
+        if status != 'completed':
+            logger.warning(f"⚠️ バッチは未完了です: {', '.join(job['batch_ids'])} (状態: {status})")
+            return 0
+        
+        results = self.ai_analyzer.collect_batch_results(job)
+        
+        database = self.load_database()
+        for evidence_number, analysis_result in results.items():
+            evidence_entry = {
+                "evidence_number": evidence_number,
+                "complete_metadata": analysis_result["complete_metadata"],
+                "phase1_complete_analysis": analysis_result,
+                "status": "completed",
+                "processed_at": datetime.now().isoformat()
+            }
+            
+            existing_index = next(
+                (i for i, e in enumerate(database["evidence"]) 
+                 if e.get("evidence_number") == evidence_number),
+                None
+            )
+            if existing_index is not None:
+                database["evidence"][existing_index] = evidence_entry
+            else:
+                database["evidence"].append(evidence_entry)
+        
+        self.save_database(database)
+        
+        self.success_count += len(results)
+        # 上限超過でバッチに入れられなかった証拠も失敗として数える
+        total = job['request_count'] + len(job.get('skipped_evidence_ids', []))
+        self.failed_count += total - len(results)
+        logger.info(f"📥 バッチ結果を取り込みました: {len(results)}/{total}件")
+        return len(results)
+    
     def print_final_report(self, duration):
         """最終レポートを表示"""
         logger.info(f"\n{'='*70}")
@@ -303,6 +430,27 @@ class BatchProcessor:
         if self.success_count > 0:
             avg_time = duration.total_seconds() / self.success_count
             logger.info(f"  - 平均処理時間: {avg_time:.1f}秒/件")
+            logger.info(f"  - スループット: {self.success_count / duration.total_seconds() * 60:.1f}件/分")
+        
+        if ai_cassette.mode != 'off':
+            stats = ai_cassette.stats
+            logger.info(f"\n📼 AI呼び出しの{'記録' if ai_cassette.mode == 'record' else '再生'}:")
+            logger.info(f"  - 記録: {stats['recorded']} / 再生: {stats['replayed']} / "
+                        f"未記録: {stats['missed']} / 注入エラー: {stats['injected_errors']}")
+        
+        ocr_stats = ocr_cache.get_stats()
+        if ocr_stats['hits'] + ocr_stats['misses'] > 0:
+            logger.info(f"\n📷 OCRキャッシュ:")
+            logger.info(f"  - ヒット: {ocr_stats['hits']} / ミス: {ocr_stats['misses']} "
+                        f"（ヒット率 {ocr_stats['hit_rate']:.0%}）")
+        
+        language_stats = ocr_language_selector.get_stats()
+        if language_stats['images'] > 0:
+            logger.info(f"\n🔤 OCR言語（{language_stats['images']}画像、平均 {language_stats['average_packs']}言語/画像）:")
+            packs = ', '.join(f"{lang}: {count}" for lang, count in sorted(language_stats['pack_counts'].items()))
+            methods = ', '.join(f"{method}: {count}" for method, count in sorted(language_stats['method_counts'].items()))
+            logger.info(f"  - 言語データの使用回数: {packs}")
+            logger.info(f"  - 選択方法: {methods} / 全言語で再実行: {language_stats['retries']}")
         
         # 失敗した証拠のリスト
         if self.failed_count > 0:
@@ -325,6 +473,15 @@ class BatchProcessor:
         return unprocessed
 
 
+def detect_file_type(file_path: str) -> str:
+    """拡張子からファイルタイプを判定"""
+    ext = os.path.splitext(file_path)[1].lower()
+    for file_type, info in SUPPORTED_FORMATS.items():
+        if ext in info['extensions']:
+            return file_type
+    return 'document'
+
+
 def parse_evidence_range(range_str: str) -> List[str]:
     """証拠番号の範囲を解析
     
@@ -371,6 +528,12 @@ def main():
         action='store_true',
         help='未処理の証拠を自動検出して処理'
     )
+    group.add_argument(
+        '--ingest-batch',
+        type=str,
+        metavar='JOB_JSON',
+        help='提出済みバッチの結果をdatabase.jsonに取り込み（job.jsonのパス）'
+    )
     
     # ファイル指定方法
     parser.add_argument(
@@ -387,6 +550,45 @@ def main():
         help='完了済み証拠をスキップ（デフォルト: True）'
     )
     
+    parser.add_argument(
+        '--submit-batch',
+        choices=['openai', 'anthropic', 'local'],
+        help='対話的に処理せず、プロバイダーのバッチAPIに一括提出（localはAPIを使わない動作確認用）'
+    )
+    
+    parser.add_argument(
+        '--wait',
+        action='store_true',
+        help='--ingest-batch 時、バッチ完了まで待機'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='AI分析結果キャッシュを使用しない'
+    )
+    
+    parser.add_argument(
+        '--ocr-languages',
+        type=str,
+        metavar='LANGS',
+        help='OCR言語を固定（例: jpn+eng、未指定時は database.json の metadata.ocr_languages または自動選択）'
+    )
+    
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument(
+        '--record-ai',
+        type=str,
+        metavar='DIR',
+        help='AI応答をカセットとして記録（オフライン再生用）'
+    )
+    cassette_group.add_argument(
+        '--replay-ai',
+        type=str,
+        metavar='DIR',
+        help='記録済みのAI応答を再生（APIに接続しない。遅延・エラー注入は AI_REPLAY_* で設定）'
+    )
+    
     parser.add_argument(
         '--output',
         type=str,
@@ -396,11 +598,27 @@ def main():
     
     args = parser.parse_args()
     
+    # AI呼び出しの記録・再生（クライアント作成前に設定）
+    if args.record_ai:
+        ai_cassette.configure('record', args.record_ai)
+    elif args.replay_ai:
+        ai_cassette.configure('replay', args.replay_ai)
+    
+    # OCR言語の固定
+    if args.ocr_languages:
+        ocr_language_selector.set_case_languages(args.ocr_languages.split('+'))
+    
     # 環境チェック
-    if not os.getenv('OPENAI_API_KEY'):
+    if not os.getenv('OPENAI_API_KEY') and ai_cassette.mode != 'replay':
         logger.error("❌ エラー: OPENAI_API_KEYが設定されていません")
         return 1
     
+    # バッチ結果の取り込み
+    if args.ingest_batch:
+        processor = BatchProcessor(args.output)
+        ingested = processor.ingest_provider_batch(args.ingest_batch, wait=args.wait)
+        return 0 if ingested > 0 and processor.failed_count == 0 else 1
+    
     # 証拠番号のリストを作成
     if args.evidence:
         evidence_numbers = args.evidence
@@ -444,8 +662,18 @@ def main():
         logger.error("❌ 処理可能なファイルが見つかりません")
         return 1
     
+    # バッチAPIへの一括提出
+    if args.submit_batch:
+        processor = BatchProcessor(args.output)
+        processor.submit_provider_batch(
+            evidence_list=evidence_list,
+            provider=args.submit_batch,
+            skip_completed=args.skip_completed
+        )
+        return 0
+    
     # 一括処理実行
-    processor = BatchProcessor(args.output)
+    processor = BatchProcessor(args.output, use_cache=False if args.no_cache else None)
     processor.process_batch(
         evidence_list=evidence_list,
         skip_completed=args.skip_completed
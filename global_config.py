@@ -244,6 +244,24 @@ VERBALIZATION_LEVEL_MINIMUM = 3  # 最低レベル3
 OCR_ENABLED = True
 OCR_LANGUAGES = ['jpn', 'eng', 'chi_sim']  # 日本語、英語、中国語簡体字
 OCR_ENGINE = 'tesseract'  # tesseract, google_vision, azure
+# Tesseractの実行方式: auto（tesserocrがあればプロセス内、なければpytesseract）/ tesserocr / pytesseract
+OCR_BACKEND = os.getenv("OCR_BACKEND", "auto").lower()
+# tesserocrで言語ごとに保持する未使用のTessBaseAPIの上限（並列分析の数程度、超えた分は解放）
+OCR_ENGINE_POOL_SIZE = int(os.getenv("OCR_ENGINE_POOL_SIZE", "3"))
+
+# OCR言語の自動選択（テキスト層・OSDで文字種を判定し、必要な言語データのみでOCR）
+# 事件ごとに固定する場合は database.json の metadata.ocr_languages（例: ["jpn", "eng"]）を指定
+ENABLE_ADAPTIVE_OCR_LANGUAGES = os.getenv("ENABLE_ADAPTIVE_OCR_LANGUAGES", "true").lower() == "true"
+OCR_SCRIPT_LANGUAGES = {  # OSDの文字種 → OCR言語（未登録の文字種は OCR_LANGUAGES 全体）
+    'Japanese': ['jpn'],
+    'Hiragana': ['jpn'],
+    'Katakana': ['jpn'],
+    'Han': ['jpn', 'chi_sim'],  # 漢字のみの文書は日本語・中国語を区別できない
+    'Latin': ['eng']
+}
+OCR_LANGUAGE_DETECT_MAX_SIDE = 1600  # OSD用に縮小する長辺（px）
+OCR_LANGUAGE_DETECT_MIN_CONFIDENCE = 1.0  # OSDの文字種の確信度がこれ未満なら判定に使わない
+OCR_LANGUAGE_RETRY_CONFIDENCE = 0.5  # 絞り込んだ言語でのOCR信頼度がこれ未満なら OCR_LANGUAGES 全体で再実行
 
 # メタデータ抽出レベル
 METADATA_EXTRACTION_LEVEL = 'full'  # basic, standard, full
@@ -302,15 +320,108 @@ RETRY_EXPONENTIAL_BACKOFF = True
 API_TIMEOUT_SECONDS = 300  # 5分
 LARGE_FILE_TIMEOUT_SECONDS = 600  # 10分（動画等）
 
+# API接続（共有クライアントのコネクションプール）
+API_CONNECT_TIMEOUT_SECONDS = 10  # 接続確立のタイムアウト
+API_MAX_CONNECTIONS = 20  # プロバイダーごとの最大同時接続数
+API_MAX_KEEPALIVE_CONNECTIONS = 10  # 維持するアイドル接続数
+API_KEEPALIVE_EXPIRY_SECONDS = 120  # アイドル接続の保持時間
+ENABLE_HTTP2 = os.getenv("ENABLE_HTTP2", "true").lower() == "true"  # h2導入時のみ有効
+
 # ================================
 # パフォーマンス設定
 # ================================
 
-ENABLE_PARALLEL_PROCESSING = False
-MAX_PARALLEL_WORKERS = 3
+# 複数証拠の並列分析（メニュー2の範囲指定時に使用、既定は無効 - 有効化は環境変数で）
+ENABLE_PARALLEL_PROCESSING = os.getenv("ENABLE_PARALLEL_PROCESSING", "false").lower() == "true"
+MAX_PARALLEL_WORKERS = int(os.getenv("MAX_PARALLEL_WORKERS", "3"))
+
+# AIプロバイダー別の同時リクエスト数上限（レート制限対策）
+PROVIDER_CONCURRENCY_LIMITS = {
+    'openai': 3,
+    'anthropic': 2
+}
 
-ENABLE_CACHING = True
+# AI分析結果キャッシュ（--no-cache または ENABLE_CACHING=false で無効化）
+ENABLE_CACHING = os.getenv("ENABLE_CACHING", "true").lower() == "true"
 CACHE_EXPIRY_HOURS = 24
+ANALYSIS_CACHE_MAX_ENTRIES = 2000  # これを超えると最終利用が古いものから削除
+
+# OCR結果キャッシュ（LOCAL_CACHE_DIR/ocr、画素・言語・エンジンのバージョン・DPIが同じなら再利用）
+ENABLE_OCR_CACHE = os.getenv("ENABLE_OCR_CACHE", "true").lower() == "true"
+OCR_CACHE_MAX_MB = int(os.getenv("OCR_CACHE_MAX_MB", "500"))  # 合計サイズがこれを超えると最終利用が古いものから削除
+
+# バッチ分析モード（OpenAI Batch / Anthropic Message Batches）
+BATCH_WORK_DIR = os.path.join(PROJECT_ROOT, "batch_jobs")  # JSONL・ジョブ情報の保存先
+BATCH_POLL_INTERVAL_SECONDS = 60
+# 1バッチあたりの上限（OpenAI: 50,000件・200MB、Anthropic: 100,000件・256MB）
+# 超える場合は複数のバッチに分割して提出（サイズは上限に余裕を持たせる）
+BATCH_MAX_REQUESTS = {'openai': 50000, 'anthropic': 100000, 'local': 50000}
+BATCH_MAX_BYTES = {'openai': 190 * 1024 * 1024, 'anthropic': 240 * 1024 * 1024, 'local': 190 * 1024 * 1024}
+
+# ストリーミング受信（冒頭で拒否を検知した場合は受信を中止してフォールバック）
+ENABLE_STREAMING = os.getenv("ENABLE_STREAMING", "true").lower() == "true"
+STREAM_REFUSAL_CHECK_CHARS = 40  # この文字数までに拒否の書き出しがなければ通常応答と判定
+
+# 構造化出力（OpenAI json_schema / Anthropic tool use）
+ENABLE_STRUCTURED_OUTPUT = os.getenv("ENABLE_STRUCTURED_OUTPUT", "true").lower() == "true"
+STRUCTURED_OUTPUT_MAX_CONTINUATIONS = 2  # 出力上限で途切れた応答の続きを要求する最大回数
+
+# プロバイダールーティング・ヘッジリクエスト
+# 主リクエストがp95を超えたら別プロバイダーにも送信し、先に返った有効な結果を採用
+ENABLE_HEDGED_REQUESTS = os.getenv("ENABLE_HEDGED_REQUESTS", "true").lower() == "true"
+ROUTER_LATENCY_WINDOW = 50  # モデルごとに保持する直近の呼び出し数
+ROUTER_MIN_SAMPLES = 5  # p50/p95を算出する最小サンプル数
+ROUTER_DEFAULT_HEDGE_DELAY_SECONDS = 90  # サンプル不足時のヘッジ待ち時間
+ROUTER_MAX_ERROR_RATE = 0.5  # 第一候補のエラー率がこれを超えたら健全な候補を優先
+ROUTER_HEDGE_BUDGET_RATIO = 0.2  # 事件ごとのヘッジ上限（リクエスト数に対する割合）
+ROUTER_HEDGE_MAX_PER_CASE = 10  # 事件ごとのヘッジ上限（件数）
+ROUTER_STATS_SAVE_INTERVAL_SECONDS = 30  # レイテンシ統計の保存間隔（終了時にも保存）
+
+# AI呼び出しのテレメトリ（トークン・応答時間・推定コスト）
+# 証拠レコードと事件ごとの台帳（LOCAL_CACHE_DIR/ai_ledger）に記録
+ENABLE_AI_TELEMETRY = os.getenv("ENABLE_AI_TELEMETRY", "true").lower() == "true"
+# モデル別料金（USD / 100万トークン、モデルIDの前方一致）
+MODEL_PRICING_PER_MILLION = {
+    'gpt-4o-mini': {'input': 0.15, 'cached_input': 0.075, 'output': 0.60},
+    'gpt-4o': {'input': 2.50, 'cached_input': 1.25, 'output': 10.00},
+    'claude-sonnet': {'input': 3.00, 'cached_input': 0.30, 'cache_write': 3.75, 'output': 15.00},
+    'claude-haiku': {'input': 1.00, 'cached_input': 0.10, 'cache_write': 1.25, 'output': 5.00},
+}
+
+# AI呼び出しの記録・再生（ネットワークのない環境でのベンチマーク・回帰確認用）
+# off: 通常 / record: 応答をカセットに保存 / replay: カセットの応答を返す（APIに接続しない）
+AI_CASSETTE_MODE = os.getenv("AI_CASSETTE_MODE", "off").lower()
+AI_CASSETTE_DIR = os.getenv("AI_CASSETTE_DIR", os.path.join(PROJECT_ROOT, "cassettes"))
+AI_REPLAY_LATENCY_SCALE = float(os.getenv("AI_REPLAY_LATENCY_SCALE", "1.0"))  # 記録時の応答時間に掛ける倍率（0で待機なし）
+AI_REPLAY_FIXED_LATENCY_SECONDS = (
+    float(os.environ["AI_REPLAY_FIXED_LATENCY_SECONDS"]) if os.getenv("AI_REPLAY_FIXED_LATENCY_SECONDS") else None
+)  # 指定時は記録時の応答時間の代わりに固定の応答時間
+AI_REPLAY_ERROR_RATE = float(os.getenv("AI_REPLAY_ERROR_RATE", "0"))  # 擬似エラー（過負荷）を注入する割合
+AI_REPLAY_SEED = int(os.getenv("AI_REPLAY_SEED", "0"))  # エラー注入の乱数シード（再現性のため固定）
+
+# モデル別サーキットブレーカー
+# 利用不可（404）・過負荷のモデルはクールダウン中スキップし、経過後に1件だけ試行して復帰を判定
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 2  # 過負荷がこの回数連続したら遮断
+CIRCUIT_BREAKER_COOLDOWN_SECONDS = 60  # 過負荷による遮断の継続時間
+CIRCUIT_BREAKER_NOT_FOUND_COOLDOWN_SECONDS = 3600  # 404（モデル廃止・未提供）による遮断の継続時間
+
+# GPT-4o拒否の予測（過去に拒否された証拠と似た証拠は最初からClaudeへ送信）
+ENABLE_REFUSAL_ROUTING = os.getenv("ENABLE_REFUSAL_ROUTING", "true").lower() == "true"
+REFUSAL_ROUTING_THRESHOLD = 0.6  # この拒否確率以上ならClaudeを先に試行
+REFUSAL_ROUTING_MIN_SAMPLES = 3  # 特徴の拒否率を使う最小サンプル数
+REFUSAL_ROUTING_EXPLORATION_RATE = 0.1  # 予測に反してGPT-4oを先に試す割合（予測の評価用）
+
+# ローカル日付抽出（AI分析前の高速判定）
+# EXIF・PDF/Word作成日時・ファイル名・本文の日付候補が一致すればAIを呼ばずに確定
+ENABLE_LOCAL_DATE_EXTRACTION = os.getenv("ENABLE_LOCAL_DATE_EXTRACTION", "true").lower() == "true"
+LOCAL_DATE_MIN_CONFIDENCE = 0.75  # ローカル抽出で確定する最低信頼度
+LOCAL_DATE_CONFLICT_MARGIN = 0.15  # 次点候補との信頼度差がこれ未満ならAIに委ねる
+LOCAL_DATE_TEXT_CHARS = 5000  # 日付を探す本文の最大文字数
+LOCAL_DATE_TEXT_PAGES = 2  # 日付を探すPDFの先頭ページ数
+
+# プロンプト圧縮（トークン予算）
+PROMPT_METADATA_TOKEN_BUDGET = int(os.getenv("PROMPT_METADATA_TOKEN_BUDGET", "1500"))
+PROMPT_CONTENT_TOKEN_BUDGET = int(os.getenv("PROMPT_CONTENT_TOKEN_BUDGET", "12000"))
 
 # ================================
 # タイムスタンプ形式
@@ -355,6 +466,31 @@ MAX_FILE_SIZE = {
 IMAGE_MAX_SIZE = (3840, 2160)  # 最大解像度（4K）
 IMAGE_COMPRESSION_QUALITY = 90  # JPEG圧縮品質（1-100）
 
+# Vision API送信前の縮小上限（プロバイダー側の縮小処理と同じ基準）
+VISION_IMAGE_LIMITS = {
+    # detail=high: 2048px四方に収めた後、短辺768px・512pxタイル単位で課金
+    'openai': {'max_long_side': 2048, 'max_short_side': 768, 'tile_size': 512},
+    # 長辺1568px・約115万画素を超えると縮小される
+    'anthropic': {'max_long_side': 1568, 'max_pixels': 1_150_000},
+    # detail=low: 512px四方に縮小され、固定85トークン
+    'openai_low': {'max_long_side': 512, 'max_short_side': 512},
+    # detail=high・タイル4枚まで（文字の少ない画像）
+    'openai_medium': {'max_long_side': 1024, 'max_short_side': 768, 'tile_size': 512}
+}
+
+# Vision APIの詳細度の自動選択（文字のない写真は detail=low で送信）
+ENABLE_ADAPTIVE_VISION_DETAIL = os.getenv("ENABLE_ADAPTIVE_VISION_DETAIL", "true").lower() == "true"
+VISION_DETAIL_TEXT_CHARS = 20  # OCR文字数がこれ以上なら high（タイル数を抑える）
+VISION_DETAIL_DENSE_TEXT_CHARS = 200  # OCR文字数がこれ以上なら high（タイル数の上限なし）
+VISION_DETAIL_EDGE_DENSITY_HIGH = 0.15  # エッジ密度がこれ以上なら high（細部・小さな文字）
+VISION_DETAIL_MIN_OCR_CONFIDENCE = 0.5  # これ未満のOCR結果は誤認識とみなし文字数0
+VISION_LOW_DETAIL_MODEL = os.getenv("VISION_LOW_DETAIL_MODEL", OPENAI_MODEL)  # detail=low の画像に使うモデル
+VISION_DETAIL_ESCALATION_MIN_CONFIDENCE = 0.7  # low の分析結果の信頼度がこれ未満なら high で再分析
+
+# エンコード済み画像ペイロードのメモ（プロセス内で保持する件数）
+# 同じ証拠画像をGPT-4o・Claude・リトライ・AI編集で再読み込み・再エンコードしない
+IMAGE_PAYLOAD_MEMO_SIZE = 64
+
 # ================================
 # PDF処理設定
 # ================================
@@ -362,6 +498,19 @@ IMAGE_COMPRESSION_QUALITY = 90  # JPEG圧縮品質（1-100）
 PDF_MAX_PAGES = 100  # 一度に処理する最大ページ数
 PDF_DPI = 300  # PDF→画像変換時のDPI
 
+# スキャンPDFのOCR（ページ範囲ごとに子プロセスで画像化・OCRし、メモリ使用量を抑える）
+OCR_MAX_WORKERS = int(os.getenv("OCR_MAX_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) - 1)))))
+OCR_PAGES_PER_TASK = 2  # 1タスクで画像化・OCRするページ数（同時にメモリ上に置くのは OCR_MAX_WORKERS × この値）
+OCR_PAGE_MIN_TEXT_CHARS = 30  # テキスト層がこれ未満の文字数のページをOCR候補とする
+OCR_PAGE_IMAGE_COVERAGE = 0.3  # 画像がページのこの割合以上を占めるOCR候補ページをスキャンページとみなす
+
+# 複数ページPDF・文書のVision分析
+ENABLE_MULTIPAGE_VISION = os.getenv("ENABLE_MULTIPAGE_VISION", "true").lower() == "true"
+VISION_MAX_PAGES = 8  # 1証拠あたりVision APIに送信する最大ページ数
+VISION_PAGES_PER_REQUEST = 4  # 1リクエストに含める最大ページ数（超える分は並列リクエスト）
+VISION_PDF_DPI = 150  # Vision送信用の画像化DPI
+VISION_LOW_TEXT_PAGE_CHARS = 50  # これ未満のテキスト層しかないページを優先送信
+
 # ================================
 # 動画・音声処理設定
 # ================================
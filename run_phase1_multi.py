@@ -8,6 +8,7 @@ Phase1_Evidence Analysis System - マルチ事件対応版
 
 【使用方法】
     python3 run_phase1_multi.py
+    python3 run_phase1_multi.py --no-cache   # AI分析結果キャッシュを使わない
 
 【機能】
     - 共有ドライブから事件を自動検出
@@ -20,6 +21,8 @@ import os
 import sys
 import json
 import logging
+import argparse
+import threading
 from datetime import datetime
 from typing import List, Optional, Dict
 
@@ -40,6 +43,10 @@ try:
     from src.ai_analyzer_complete import AIAnalyzerComplete
     from src.evidence_editor_ai import EvidenceEditorAI
     from src.timeline_builder import TimelineBuilder
+    from src.parallel_analyzer import ParallelEvidenceExecutor
+    from src.evidence_artifacts import EvidenceArtifacts
+    from src.ai_telemetry import ai_telemetry
+    from src.ocr_language_selector import ocr_language_selector
 except ImportError as e:
     print(f"エラー: モジュールのインポートに失敗しました: {e}")
     print("\n必要なファイル:")
@@ -67,15 +74,20 @@ logger = logging.getLogger(__name__)
 class Phase1MultiRunner:
     """Phase 1マルチ事件対応実行クラス"""
     
-    def __init__(self):
-        """初期化"""
+    def __init__(self, use_cache: bool = None):
+        """初期化
+        
+        Args:
+            use_cache: AI分析結果キャッシュを使用するか（未指定時は ENABLE_CACHING）
+        """
         self.case_manager = CaseManager()
         self.current_case = None
         self.db_manager = None  # 事件選択後に初期化
         self.metadata_extractor = MetadataExtractor()
         self.file_processor = FileProcessor()
-        self.ai_analyzer = AIAnalyzerComplete()
+        self.ai_analyzer = AIAnalyzerComplete(use_cache=use_cache)
         self.evidence_editor = EvidenceEditorAI()
+        self._gdrive_lock = threading.Lock()
     
     def select_case(self) -> bool:
         """事件を選択または新規作成
@@ -125,17 +137,42 @@ class Phase1MultiRunner:
             return False
         
         self.current_case = selected_case
+        ai_telemetry.set_case(selected_case.get('case_id'))
         
         # データベースマネージャーを初期化
         self.db_manager = create_database_manager(self.case_manager, selected_case)
         if not self.db_manager:
             logger.warning(" データベースマネージャーの初期化に失敗しました")
+        else:
+            self._apply_case_settings()
         
         # 事件設定ファイルを生成
         self.case_manager.generate_case_config(selected_case, "current_case.json")
         
         return True
     
+    def _apply_case_settings(self):
+        """database.jsonから事件ごとの設定を反映（GPT-4o拒否の予測・OCR言語）"""
+        ocr_language_selector.set_case_languages(None)
+        try:
+            database = self.load_database()
+        except Exception as e:
+            logger.warning(f" 事件設定の反映をスキップ（database.jsonの読み込み失敗）: {e}")
+            return
+        
+        self._train_refusal_predictor(database.get('evidence', []))
+        ocr_language_selector.set_case_languages(database.get('metadata', {}).get('ocr_languages'))
+    
+    def _train_refusal_predictor(self, evidence_list: List[Dict]):
+        """事件の分析履歴からGPT-4o拒否の予測を学習（拒否されやすい証拠を最初からClaudeへ）"""
+        self.ai_analyzer.refusal_predictor.fit(evidence_list)
+        evaluation = self.ai_analyzer.refusal_predictor.evaluate(evidence_list)
+        if evaluation['routed_to_claude']:
+            logger.info(
+                f"   Claude優先にした証拠: {evaluation['routed_to_claude']}件"
+                f"（適合率 {evaluation['precision']}、再現率 {evaluation['recall']}）"
+            )
+    
     def _create_new_case(self) -> bool:
         """新規事件を作成
         
@@ -355,6 +392,8 @@ class Phase1MultiRunner:
                 'otsu_evidence_folder_id': otsu_folder['id'],
                 'case_folder_url': case_folder.get('webViewLink', '')
             }
+            ai_telemetry.set_case(case_id)
+            ocr_language_selector.set_case_languages(None)
             
             # 階層的構造の場合はサブフォルダ情報を追加
             if gconfig.USE_HIERARCHICAL_FOLDERS:
@@ -603,6 +642,7 @@ class Phase1MultiRunner:
         print("\n【システム管理】")
         print("  9. database.jsonの状態確認")
         print("  10. 事件を切り替え")
+        print("  11. AI利用状況レポート（トークン・所要時間・推定コスト）")
         print("  0. 終了")
         print("-"*70)
     
@@ -888,76 +928,13 @@ class Phase1MultiRunner:
                 
                 logger.info(f"✅ ローカルファイルを使用: {file_path}")
             
-            # 2. メタデータ抽出
-            logger.info(f"メタデータを抽出中...")
-            metadata = self.metadata_extractor.extract_complete_metadata(
-                file_path,
-                gdrive_file_info=gdrive_file_info
-            )
-            logger.info(f"  - ファイルハッシュ(SHA-256): {metadata['hashes']['sha256'][:16]}...")
-            logger.info(f"  - ファイルサイズ: {metadata['basic']['file_size_human']}")
-            
-            # 3. ファイル処理
-            logger.info(f"ファイルを処理中...")
-            file_type = self._detect_file_type(file_path)
-            processed_data = self.file_processor.process_file(file_path, file_type)
-            logger.info(f"  - ファイル形式: {processed_data['file_type']}")
-            
-            # 4. AI分析（GPT-4o Vision）
-            logger.info(f"AI分析を実行中（GPT-4o Vision）...")
-            analysis_result = self.ai_analyzer.analyze_evidence_complete(
-                evidence_id=evidence_number,
-                file_path=file_path,
-                file_type=file_type,
-                gdrive_file_info=gdrive_file_info,
-                case_info=self.current_case
-            )
-            
-            # 5. 品質評価
-            quality = analysis_result.get('quality_assessment', {})
-            logger.info(f"品質評価:")
-            logger.info(f"  - 完全性スコア: {quality.get('completeness_score', 0):.1%}")
-            logger.info(f"  - 信頼度スコア: {quality.get('confidence_score', 0):.1%}")
-            logger.info(f"  - 言語化レベル: {quality.get('verbalization_level', 0)}")
+            # 2-5. メタデータ抽出・ファイル処理・AI分析
+            evidence_entry = self._analyze_evidence_file(evidence_number, file_path, gdrive_file_info)
             
             # 6. database.jsonに追加
             logger.info(f"database.jsonに保存中...")
             database = self.load_database()
-            
-            evidence_entry = {
-                "evidence_id": evidence_number,
-                "evidence_number": f"甲{evidence_number.lstrip('ko')}",
-                "original_filename": gdrive_file_info['name'] if gdrive_file_info else os.path.basename(file_path),
-                "complete_metadata": metadata,
-                "phase1_complete_analysis": analysis_result,
-                "status": "completed",
-                "processed_at": datetime.now().isoformat()
-            }
-            
-            # 既存のエントリを更新、または新規追加
-            # temp_id, evidence_id, evidence_number のいずれかでマッチング
-            existing_index = next(
-                (i for i, e in enumerate(database["evidence"]) 
-                 if (e.get("evidence_id") == evidence_number or
-                     e.get("temp_id") == evidence_number or
-                     e.get("evidence_number") == evidence_number)),
-                None
-            )
-            
-            if existing_index is not None:
-                # 既存エントリのtemp_idを保持
-                old_entry = database["evidence"][existing_index]
-                if 'temp_id' in old_entry:
-                    evidence_entry['temp_id'] = old_entry['temp_id']
-                if 'temp_number' in old_entry:
-                    evidence_entry['temp_number'] = old_entry['temp_number']
-                
-                database["evidence"][existing_index] = evidence_entry
-                logger.info(f"  ✅ 既存エントリを更新しました（temp_id: {old_entry.get('temp_id')}）")
-            else:
-                database["evidence"].append(evidence_entry)
-                logger.info(f"  ✅ 新規エントリを追加しました")
-            
+            self._merge_evidence_entry(database, evidence_entry)
             self.save_database(database)
             
             logger.info(f"\n✅ 証拠 {evidence_number} の処理が完了しました！")
@@ -967,8 +944,152 @@ class Phase1MultiRunner:
             logger.error(f" エラーが発生しました: {e}", exc_info=True)
             return False
     
-    def _download_file_from_gdrive(self, file_info: Dict) -> Optional[str]:
-        """Google Driveからファイルをダウンロード"""
+    def _analyze_evidence_file(self, evidence_number: str, file_path: str, gdrive_file_info: Dict = None) -> Dict:
+        """証拠ファイルを分析してdatabase.json用のエントリを生成（保存はしない）
+        
+        Args:
+            evidence_number: 証拠番号（例: tmp_001）
+            file_path: ローカルファイルパス
+            gdrive_file_info: Google Driveファイル情報（オプション）
+            
+        Returns:
+            database.jsonの証拠エントリ
+        """
+        file_type = self._detect_file_type(file_path)
+        # メタデータ・ファイル処理結果はAI分析でも再利用（ハッシュ計算・OCRの重複実行を防ぐ）
+        artifacts = EvidenceArtifacts(file_path, file_type, gdrive_file_info)
+        
+        # メタデータ抽出
+        logger.info(f"メタデータを抽出中...")
+        metadata = artifacts.get_metadata(self.metadata_extractor)
+        logger.info(f"  - ファイルハッシュ(SHA-256): {metadata['hashes']['sha256'][:16]}...")
+        logger.info(f"  - ファイルサイズ: {metadata['basic']['file_size_human']}")
+        
+        # ファイル処理
+        logger.info(f"ファイルを処理中...")
+        processed_data = artifacts.get_file_content(self.file_processor)
+        logger.info(f"  - ファイル形式: {processed_data['file_type']}")
+        
+        # AI分析（GPT-4o Vision）
+        logger.info(f"AI分析を実行中（GPT-4o Vision）...")
+        analysis_result = self.ai_analyzer.analyze_evidence_complete(
+            evidence_id=evidence_number,
+            file_path=file_path,
+            file_type=file_type,
+            gdrive_file_info=gdrive_file_info,
+            case_info=self.current_case,
+            artifacts=artifacts
+        )
+        
+        # 品質評価
+        quality = analysis_result.get('quality_assessment', {})
+        logger.info(f"品質評価:")
+        logger.info(f"  - 完全性スコア: {quality.get('completeness_score', 0):.1%}")
+        logger.info(f"  - 信頼度スコア: {quality.get('confidence_score', 0):.1%}")
+        logger.info(f"  - 言語化レベル: {quality.get('verbalization_level', 0)}")
+        
+        return {
+            "evidence_id": evidence_number,
+            "evidence_number": f"甲{evidence_number.lstrip('ko')}",
+            "original_filename": gdrive_file_info['name'] if gdrive_file_info else os.path.basename(file_path),
+            "complete_metadata": metadata,
+            "phase1_complete_analysis": analysis_result,
+            "status": "completed",
+            "processed_at": datetime.now().isoformat()
+        }
+    
+    def _merge_evidence_entry(self, database: Dict, evidence_entry: Dict):
+        """証拠エントリをdatabase.jsonに反映（既存エントリは更新、なければ追加）
+        
+        Args:
+            database: database.jsonの内容
+            evidence_entry: 反映する証拠エントリ
+        """
+        evidence_number = evidence_entry['evidence_id']
+        
+        # 既存のエントリを更新、または新規追加
+        # temp_id, evidence_id, evidence_number のいずれかでマッチング
+        existing_index = next(
+            (i for i, e in enumerate(database["evidence"]) 
+             if (e.get("evidence_id") == evidence_number or
+                 e.get("temp_id") == evidence_number or
+                 e.get("evidence_number") == evidence_number)),
+            None
+        )
+        
+        if existing_index is not None:
+            # 既存エントリのtemp_idを保持
+            old_entry = database["evidence"][existing_index]
+            if 'temp_id' in old_entry:
+                evidence_entry['temp_id'] = old_entry['temp_id']
+            if 'temp_number' in old_entry:
+                evidence_entry['temp_number'] = old_entry['temp_number']
+            
+            database["evidence"][existing_index] = evidence_entry
+            logger.info(f"  ✅ 既存エントリを更新しました（temp_id: {old_entry.get('temp_id')}）")
+        else:
+            database["evidence"].append(evidence_entry)
+            logger.info(f"  ✅ 新規エントリを追加しました")
+    
+    def process_evidence_batch(self, evidence_numbers: List[str], evidence_type: str = 'ko') -> int:
+        """複数証拠を並列分析し、最後に1回だけdatabase.jsonへ保存
+        
+        Args:
+            evidence_numbers: 証拠番号のリスト（例: ['tmp_ko_001', 'tmp_ko_002']）
+            evidence_type: 証拠種別 ('ko' または 'otsu')
+            
+        Returns:
+            成功件数
+        """
+        # Google Drive情報は並列処理の前にメインスレッドで解決
+        gdrive_infos = {}
+        for evidence_number in evidence_numbers:
+            gdrive_infos[evidence_number] = self._get_gdrive_info_from_database(evidence_number, evidence_type)
+        
+        def analyze_one(evidence_number: str) -> Dict:
+            gdrive_file_info = gdrive_infos.get(evidence_number)
+            if not gdrive_file_info:
+                # 並列処理中は対話入力ができないため、ローカルファイル指定は不可
+                raise ValueError("Google Drive情報がありません（単一指定で再実行してください）")
+            
+            # Google Drive APIクライアントはスレッドセーフではないためダウンロードは直列化
+            # 同名ファイル（image.jpg等）が並列で上書きし合わないよう証拠ごとのディレクトリへ
+            with self._gdrive_lock:
+                file_path = self._download_file_from_gdrive(gdrive_file_info, subdir=evidence_number)
+            if not file_path:
+                raise IOError("ファイルのダウンロードに失敗しました")
+            
+            return self._analyze_evidence_file(evidence_number, file_path, gdrive_file_info)
+        
+        print(f"\n⚡ {len(evidence_numbers)}件を並列分析します（最大 {gconfig.MAX_PARALLEL_WORKERS} 並列）")
+        executor = ParallelEvidenceExecutor()
+        outcomes = executor.run(evidence_numbers, analyze_one)
+        
+        succeeded = [o['result'] for o in outcomes if o['status'] == 'success']
+        failed = [o for o in outcomes if o['status'] != 'success']
+        
+        # 成功分をまとめて1回だけ保存
+        if succeeded:
+            logger.info(f"database.jsonに{len(succeeded)}件をまとめて保存中...")
+            database = self.load_database()
+            for evidence_entry in succeeded:
+                self._merge_evidence_entry(database, evidence_entry)
+            self.save_database(database)
+        
+        print(f"\n完了: 成功 {len(succeeded)}件 / 失敗 {len(failed)}件")
+        for outcome in failed:
+            print(f"  ❌ {outcome['item']}: {outcome['error']}")
+        
+        return len(succeeded)
+    
+    def _download_file_from_gdrive(self, file_info: Dict, subdir: Optional[str] = None) -> Optional[str]:
+        """Google Driveからファイルをダウンロード
+        
+        Args:
+            file_info: Google Driveのファイル情報（id, name）
+            subdir: LOCAL_TEMP_DIR 配下の保存先（未指定時はファイルID）
+                    Drive上のファイル名は重複しうるため、ファイルごとに分ける
+        """
         try:
             import io
             from googleapiclient.http import MediaIoBaseDownload
@@ -978,7 +1099,7 @@ class Phase1MultiRunner:
             file_name = file_info['name']
             
             # 一時ディレクトリにダウンロード
-            temp_dir = gconfig.LOCAL_TEMP_DIR
+            temp_dir = os.path.join(gconfig.LOCAL_TEMP_DIR, subdir or file_id)
             os.makedirs(temp_dir, exist_ok=True)
             
             output_path = os.path.join(temp_dir, file_name)
@@ -1246,7 +1367,8 @@ class Phase1MultiRunner:
                 evidence['extracted_date'] = date_result.get('primary_date')
                 
                 if evidence['extracted_date']:
-                    print(f"  📅 抽出日付: {evidence['extracted_date']}")
+                    method = "ローカル抽出" if date_result.get('extraction_method') == 'local' else "AI分析"
+                    print(f"  📅 抽出日付: {evidence['extracted_date']}（{method}）")
                 else:
                     print(f"  ⚠️ 日付が抽出できませんでした")
                 
@@ -2367,7 +2489,7 @@ class Phase1MultiRunner:
         # メインループ
         while True:
             self.display_main_menu()
-            choice = input("\n選択 (0-9): ").strip()
+            choice = input("\n選択 (0-11): ").strip()
             
             if choice == '1':
                 # 証拠整理（未分類フォルダから整理済み_未確定へ）
@@ -2397,10 +2519,13 @@ class Phase1MultiRunner:
                             if confirm != 'y':
                                 continue
                         
-                        # 分析実行
-                        for evidence_number in evidence_numbers:
-                            gdrive_file_info = self._get_gdrive_info_from_database(evidence_number, evidence_type)
-                            self.process_evidence(evidence_number, gdrive_file_info, evidence_type)
+                        # 分析実行（複数件は並列処理）
+                        if len(evidence_numbers) > 1 and gconfig.ENABLE_PARALLEL_PROCESSING:
+                            self.process_evidence_batch(evidence_numbers, evidence_type)
+                        else:
+                            for evidence_number in evidence_numbers:
+                                gdrive_file_info = self._get_gdrive_info_from_database(evidence_number, evidence_type)
+                                self.process_evidence(evidence_number, gdrive_file_info, evidence_type)
                         
             elif choice == '3':
                 # AI対話形式で分析内容を改善
@@ -2477,19 +2602,42 @@ class Phase1MultiRunner:
                 if self.select_case():
                     print("\n✅ 事件を切り替えました")
                     
+            elif choice == '11':
+                # AI利用状況レポート（事件ごとの台帳を集計）
+                ai_telemetry.print_report(self.current_case['case_id'])
+                    
             elif choice == '0':
                 # 終了
                 print("\nPhase1_Evidence Analysis Systemを終了します")
                 break
                 
             else:
-                print("\nエラー: 無効な選択です。0-10を入力してください。")
+                print("\nエラー: 無効な選択です。0-11を入力してください。")
             
             input("\nEnterキーを押して続行...")
 
 
 def main():
     """メイン関数"""
+    parser = argparse.ArgumentParser(
+        description='Phase1_Evidence Analysis System（マルチ事件対応版）'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='AI分析結果キャッシュを使用せず、常にAPIを呼び出す'
+    )
+    parser.add_argument(
+        '--ai-usage-report',
+        metavar='CASE_ID',
+        help='指定した事件のAI利用状況レポート（トークン・所要時間・推定コスト）を表示して終了'
+    )
+    args = parser.parse_args()
+    
+    if args.ai_usage_report:
+        ai_telemetry.print_report(args.ai_usage_report)
+        return
+    
     print("\n" + "="*70)
     print("  Phase1_Evidence Analysis System（マルチ事件対応版）起動中...")
     print("="*70)
@@ -2522,7 +2670,7 @@ def main():
     print(f"\n✅ 共有ドライブID: {gconfig.SHARED_DRIVE_ROOT_ID}")
     
     # 実行
-    runner = Phase1MultiRunner()
+    runner = Phase1MultiRunner(use_cache=False if args.no_cache else None)
     runner.run()
 
 
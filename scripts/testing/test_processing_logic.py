@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+証拠処理の純粋ロジックのテストスクリプト
+
+APIキー・Google Drive・OCRエンジンなしで実行できる部分の動作確認用です。
+- 和暦の変換（local_date_extractor._from_text）
+- OCR結果の段落・行の連結（ocr_engine.build_ocr_result）
+- カセットの指紋の揮発値除去（ai_cassette.request_fingerprint）
+
+使用方法:
+    python3 scripts/testing/test_processing_logic.py
+"""
+
+import os
+import sys
+
+# プロジェクトルートをPythonパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+try:
+    import global_config as gconfig
+    from src.local_date_extractor import LocalDateExtractor, CONFIDENCE_CONTENT_KEYWORD
+    from src.ocr_engine import build_ocr_result, DATA_FIELDS
+    from src.ai_cassette import request_fingerprint
+except ImportError as e:
+    print(f"❌ エラー: モジュールのインポートに失敗しました: {e}")
+    sys.exit(1)
+
+
+failures = []
+
+
+def check(label: str, actual, expected):
+    """結果を比較して表示"""
+    if actual == expected:
+        print(f"  ✅ {label}")
+    else:
+        print(f"  ❌ {label}: {actual!r}（期待値: {expected!r}）")
+        failures.append(label)
+
+
+def test_era_conversion():
+    """和暦の変換テスト"""
+    print("\n" + "="*70)
+    print("和暦の変換テスト（LocalDateExtractor._from_text）")
+    print("="*70)
+
+    extractor = LocalDateExtractor()
+
+    def dates(text):
+        return sorted(c['date'] for c in extractor._from_text(text))
+
+    check("令和元年", dates("令和元年5月1日"), ["2019-05-01"])
+    check("平成元年", dates("平成元年1月8日"), ["1989-01-08"])
+    check("昭和64年", dates("昭和64年1月7日"), ["1989-01-07"])
+    check("平成31年", dates("平成31年4月30日"), ["2019-04-30"])
+    check("全角数字・空白", dates("令和３年 ８月 １５日"), ["2021-08-15"])
+    check("存在しない日付", dates("令和3年2月30日"), [])
+    check("存在しない月", dates("平成10年13月1日"), [])
+    check("未来の日付", dates("令和99年1月1日"), [])
+    check("西暦と同じ日付は1件", dates("令和3年8月15日（2021年8月15日）"), ["2021-08-15"])
+
+    keyword = extractor._from_text("本文" + "あ" * 400 + "作成日 令和2年4月1日")
+    check("作成日の直後は信頼度が高い",
+          [c['confidence'] for c in keyword], [CONFIDENCE_CONTENT_KEYWORD])
+
+
+def test_ocr_paragraph_joining():
+    """OCR結果の連結テスト"""
+    print("\n" + "="*70)
+    print("OCR結果の連結テスト（build_ocr_result）")
+    print("="*70)
+
+    # (page, block, par, line, conf, text)
+    words = [
+        (1, 1, 1, 1, 95, "契約書"),
+        (1, 1, 1, 1, 85, "第1条"),
+        (1, 1, 1, 2, 90, "本文"),
+        (1, 1, 1, 2, -1, ""),        # 構造のみの要素（信頼度-1）
+        (1, 1, 2, 1, 80, "次の段落"),
+        (1, 1, 2, 1, 70, "   "),     # 空白のみ
+        (1, 2, 1, 1, 60, "別ブロック"),
+    ]
+    data = {field: [] for field in DATA_FIELDS}
+    for i, (page, block, par, line, conf, text) in enumerate(words):
+        values = [5, page, block, par, line, i + 1, i * 10, line * 20, 10, 10, conf, text]
+        for field, value in zip(DATA_FIELDS, values):
+            data[field].append(value)
+
+    result = build_ocr_result(data, ['jpn', 'eng'])
+    check("行は改行・段落とブロックは空行で連結", result['text'], "契約書 第1条\n本文\n\n次の段落\n\n別ブロック")
+    check("単語数（信頼度-1・空白は除外）", result['word_count'], 5)
+    check("行数", len(result['lines']), 4)
+    check("行の信頼度", result['lines'][0]['confidence'], 0.9)
+    check("言語", result['language'], 'jpn')
+
+    empty = build_ocr_result({field: [] for field in DATA_FIELDS})
+    check("文字なし", (empty['text'], empty['confidence'], empty['word_count']), ("", 0.0, 0))
+
+
+def test_fingerprint_volatile_fields():
+    """カセットの指紋テスト"""
+    print("\n" + "="*70)
+    print("カセットの指紋テスト（request_fingerprint）")
+    print("="*70)
+
+    def params(created_time, temp_name, content="本文", stream=False):
+        prompt = (
+            f'{{"basic": {{"file_name": "a.pdf", "created_time": "{created_time}"}}, '
+            f'"extraction_timestamp": "{created_time}"}}\n'
+            f'ファイル: {os.path.join(gconfig.LOCAL_TEMP_DIR, temp_name, "a.pdf")}\n{content}'
+        )
+        return {
+            "model": "gpt-4o",
+            "messages": [{"role": "user", "content": [{"type": "text", "text": prompt}]}],
+            "temperature": 0.1,
+            "stream": stream
+        }
+
+    base = request_fingerprint('openai', params("2024-01-01T00:00:00", "tmp_ko_001"))
+    check("ファイルの日時・一時ディレクトリは無視",
+          request_fingerprint('openai', params("2025-06-30T12:34:56", "1AbCdEf")), base)
+    check("stream の有無は無視",
+          request_fingerprint('openai', params("2024-01-01T00:00:00", "tmp_ko_001", stream=True)), base)
+    check("内容が違えば別の指紋",
+          request_fingerprint('openai', params("2024-01-01T00:00:00", "tmp_ko_001", content="別の本文")) != base, True)
+    check("プロバイダーが違えば別の指紋",
+          request_fingerprint('anthropic', params("2024-01-01T00:00:00", "tmp_ko_001")) != base, True)
+
+
+def main():
+    """メイン処理"""
+    print("\n" + "="*70)
+    print("  証拠処理の純粋ロジックのテスト")
+    print("="*70)
+
+    test_era_conversion()
+    test_ocr_paragraph_joining()
+    test_fingerprint_volatile_fields()
+
+    print("\n" + "="*70)
+    if failures:
+        print(f"❌ {len(failures)}件失敗: {', '.join(failures)}")
+        sys.exit(1)
+    print("🎉 すべてのテストに成功しました")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,13 +10,33 @@ import os
 import json
 import logging
 import time
-import base64
-from typing import Dict, List, Optional, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Union
 import openai
 
 from global_config import *
 from src.file_processor import FileProcessor
 from src.metadata_extractor import MetadataExtractor
+from src.parallel_analyzer import provider_limiter
+from src.analysis_cache import AnalysisCache
+from src.evidence_artifacts import EvidenceArtifacts
+from src.batch_providers import OpenAIBatchProvider, AnthropicBatchProvider, LocalBatchProvider
+from src.prompt_compactor import PromptCompactor
+from src.vision_image_preprocessor import VisionImagePreprocessor
+from src.vision_detail_selector import VisionDetailSelector
+from src.pdf_page_sampler import PdfPageSampler
+from src.local_date_extractor import LocalDateExtractor
+from src.streaming_response import stream_openai_chat, stream_anthropic_message
+from src.analysis_schema import (
+    openai_response_format, anthropic_tool_params, validate_analysis_result, to_schema_keys, to_display_keys,
+    EVIDENCE_METADATA_KEYS
+)
+from src.provider_router import provider_router, model_circuit_breaker
+from src.api_clients import get_openai_client, get_anthropic_client
+from src.ai_cassette import ai_cassette
+from src.ai_telemetry import ai_telemetry, extract_usage, bind_context
+from src.refusal_predictor import RefusalPredictor
 
 logger = logging.getLogger(__name__)
 
@@ -32,27 +52,62 @@ except ImportError:
 class AIAnalyzerComplete:
     """完全版AI分析エンジン"""
     
-    def __init__(self, api_key: str = None, prompt_path: str = None):
-        """初期化"""
+    # 常に法律文書であることを明示（コンテンツポリシー誤検出を防ぐ）
+    # 全プロバイダー共通のシステムプロンプト先頭に置く（プロンプトキャッシュのため内容を変えないこと）
+    LEGAL_CONTEXT_PREFIX = """IMPORTANT: This is a legal evidence document submitted in civil litigation proceedings.
+
+CONTEXT:
+- This image is documentary evidence for legal proceedings
+- Contains factual records such as photos, screenshots, documents, or correspondence
+- Required for objective legal analysis and court procedures
+- Educational and professional analysis purpose only
+- No harmful, dangerous, or inappropriate content intended
+
+TASK: Analyze this evidence objectively and professionally for legal documentation purposes.
+
+"""
+    
+    # 出力上限で途切れた応答の続きを要求する指示
+    CONTINUATION_INSTRUCTION = "直前の出力は出力上限で途中で切れています。切れた位置の直後から続きのみを出力してください（既出部分の繰り返しやコードブロック記号は不要です）。"
+    
+    def __init__(self, api_key: str = None, prompt_path: str = None, use_cache: bool = None):
+        """初期化
+        
+        Args:
+            api_key: OpenAI APIキー
+            prompt_path: Phase 1プロンプトのパス
+            use_cache: AI分析結果キャッシュを使用するか（未指定時は ENABLE_CACHING）
+        """
         self.api_key = api_key or OPENAI_API_KEY
-        if not self.api_key:
+        replaying = ai_cassette.mode == 'replay'  # 記録済み応答の再生時はAPIキー不要
+        if not self.api_key and not replaying:
             raise ValueError("OpenAI APIキーが設定されていません")
         
         openai.api_key = self.api_key
-        self.client = openai.OpenAI(api_key=self.api_key)
+        self.client = get_openai_client(self.api_key)  # プロセス全体で共有（接続を再利用）
         
         # Anthropic Claudeクライアントの初期化（オプショナル）
         self.anthropic_client = None
-        if ANTHROPIC_AVAILABLE and ANTHROPIC_API_KEY and ENABLE_CLAUDE_FALLBACK:
+        if ENABLE_CLAUDE_FALLBACK and (replaying or (ANTHROPIC_AVAILABLE and ANTHROPIC_API_KEY)):
             try:
-                self.anthropic_client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+                self.anthropic_client = get_anthropic_client(ANTHROPIC_API_KEY)
                 logger.info("✅ Anthropic Claude Vision APIフォールバックを有効化")
             except Exception as e:
                 logger.warning(f"⚠️ Claude初期化失敗: {e}")
         
         self.prompt_template = self._load_prompt(prompt_path or LOCAL_PROMPT_PATH)
+        self.static_prompt = self._build_static_prompt()
         self.file_processor = FileProcessor()
         self.metadata_extractor = MetadataExtractor()
+        self.analysis_cache = AnalysisCache(enabled=use_cache)
+        self._request_context = threading.local()  # スレッドごとの分析対象（事件ID等）
+        self.prompt_compactor = PromptCompactor()
+        self.image_preprocessor = VisionImagePreprocessor()
+        self.detail_selector = VisionDetailSelector()
+        self.page_sampler = PdfPageSampler()
+        self.local_date_extractor = LocalDateExtractor()
+        self.refusal_predictor = RefusalPredictor()  # fit() で事件の分析履歴から学習
+        self.static_prompt_tokens = self.prompt_compactor.count_tokens(self.static_prompt)
         
         logger.info("✅ AIAnalyzerComplete初期化完了")
     
@@ -72,7 +127,8 @@ class AIAnalyzerComplete:
                                   file_path: str,
                                   file_type: str,
                                   gdrive_file_info: Dict,
-                                  case_info: Dict) -> Dict:
+                                  case_info: Dict,
+                                  artifacts: Optional[EvidenceArtifacts] = None) -> Dict:
         """
         証拠を完全言語化分析（レベル4）
         
@@ -82,6 +138,8 @@ class AIAnalyzerComplete:
             file_type: ファイルタイプ
             gdrive_file_info: Google Driveファイル情報
             case_info: 事件情報
+            artifacts: 呼び出し側で抽出済みのメタデータ・ファイル処理結果
+                       （指定時は抽出済みのステージを再実行しない）
         
         Returns:
             完全言語化分析結果
@@ -90,17 +148,25 @@ class AIAnalyzerComplete:
         logger.info(f"   ファイル: {os.path.basename(file_path)}")
         logger.info(f"   タイプ: {file_type}")
         
+        if artifacts is None:
+            artifacts = EvidenceArtifacts(file_path, file_type, gdrive_file_info)
+        
+        # ヘッジ予算は事件単位で管理
+        self._request_context.case_id = (case_info or {}).get('case_id') or 'default'
+        
+        # この証拠のAI呼び出し（トークン・時間・コスト）を記録
+        telemetry_session = ai_telemetry.start_session(
+            (case_info or {}).get('case_id'), evidence_id=evidence_id, file_type=file_type
+        )
+        
         try:
             # ステップ1: 完全メタデータ抽出
             logger.info("📊 [1/5] メタデータ抽出")
-            metadata = self.metadata_extractor.extract_complete_metadata(
-                file_path, 
-                gdrive_file_info
-            )
+            metadata = artifacts.get_metadata(self.metadata_extractor)
             
             # ステップ2: ファイル内容処理
             logger.info("🔄 [2/5] ファイル内容処理")
-            file_content = self.file_processor.process_file(file_path, file_type)
+            file_content = artifacts.get_file_content(self.file_processor)
             
             # ステップ3: AI分析実行
             logger.info("🤖 [3/5] AI分析実行")
@@ -110,7 +176,8 @@ class AIAnalyzerComplete:
                 file_type=file_type,
                 metadata=metadata,
                 file_content=file_content,
-                case_info=case_info
+                case_info=case_info,
+                original_filename=gdrive_file_info['name'] if gdrive_file_info else os.path.basename(file_path)
             )
             
             # ステップ4: 結果の構造化
@@ -126,6 +193,7 @@ class AIAnalyzerComplete:
             logger.info("✅ [5/5] 品質評価")
             quality_score = self._assess_analysis_quality(structured_result)
             structured_result['quality_assessment'] = quality_score
+            structured_result['ai_telemetry'] = ai_telemetry.to_record(telemetry_session)
             
             logger.info(f"✅ 完全言語化分析完了: {evidence_id}")
             logger.info(f"   完全言語化レベル: {quality_score['verbalization_level']}")
@@ -136,6 +204,8 @@ class AIAnalyzerComplete:
         except Exception as e:
             logger.error(f"❌ 完全言語化分析失敗: {evidence_id} - {e}")
             raise
+        finally:
+            telemetry_session.close()
     
     def _perform_ai_analysis(self,
                             evidence_id: str,
@@ -143,7 +213,8 @@ class AIAnalyzerComplete:
                             file_type: str,
                             metadata: Dict,
                             file_content: Dict,
-                            case_info: Dict) -> Dict:
+                            case_info: Dict,
+                            original_filename: Optional[str] = None) -> Dict:
         """AI分析実行（分析メソッド記録付き）"""
         # プロンプト構築
         analysis_prompt = self._build_complete_prompt(
@@ -171,9 +242,39 @@ class AIAnalyzerComplete:
             analysis_method_info["attempted_method"] = "vision_api"
             analysis_method_info["vision_api_used"] = True
             
+            # 過去の拒否傾向から、GPT-4oが拒否しそうな証拠は最初からClaudeへ
+            routing = self.refusal_predictor.decide(
+                file_type, original_filename or os.path.basename(file_path), file_content
+            )
+            analysis_method_info["refusal_routing"] = routing
+            
             # HEIC等の変換済みファイルパスを使用
             actual_file_path = file_content.get('processed_file_path', file_path)
-            vision_result = self._analyze_with_vision(actual_file_path, analysis_prompt, file_type)
+            
+            # 文字のない写真は detail=low で送信（OCR文字数・エッジ密度等から判定）
+            detail_plan = self.detail_selector.select([actual_file_path], file_type, file_content)
+            analysis_method_info["vision_detail"] = detail_plan
+            vision_result = self._analyze_with_vision(
+                actual_file_path, analysis_prompt, file_type, file_content=file_content,
+                routing=routing, detail_plan=detail_plan
+            )
+            
+            # detail=low の分析品質が不足していれば high で再分析
+            escalation_reason = self._detail_escalation_reason(vision_result) if detail_plan['detail'] == 'low' else None
+            if escalation_reason:
+                logger.info(f"🔍 detail=low の分析品質が不足（{escalation_reason}）- detail=high で再分析")
+                detail_plan = self.detail_selector.escalate(detail_plan, escalation_reason)
+                analysis_method_info["vision_detail"] = detail_plan
+                vision_result = self._analyze_with_vision(
+                    actual_file_path, analysis_prompt, file_type, file_content=file_content,
+                    routing=routing, detail_plan=detail_plan
+                ) or vision_result
+            
+            # GPT-4oの結果を学習（同じ事件の後続の証拠に反映）
+            if routing['openai_refused'] is not None:
+                self.refusal_predictor.observe(routing['features'], routing['openai_refused'])
+            if routing['openai_refused']:
+                analysis_method_info["rejection_reason"] = "content_policy_rejection"
             
             # Vision APIがコンテンツポリシーで拒否した場合、テキストベース分析にフォールバック
             if vision_result is None:
@@ -222,20 +323,17 @@ class AIAnalyzerComplete:
             
             return result
     
-    def _build_complete_prompt(self,
-                              evidence_id: str,
-                              metadata: Dict,
-                              file_content: Dict,
-                              case_info: Dict) -> str:
-        """完全版分析プロンプト構築"""
-        # メタデータを整形
-        metadata_text = json.dumps(metadata, ensure_ascii=False, indent=2)
-        
-        # ファイル内容を整形
-        content_summary = self._summarize_file_content(file_content)
+    def _build_static_prompt(self) -> str:
+        """全証拠で共通の静的プロンプト（プロバイダー側プロンプトキャッシュ用）
         
-        # 完全版プロンプト
-        full_prompt = f"""{self.prompt_template}
+        証拠ごとに変わる情報は一切含めないこと。1バイトでも変わると
+        OpenAIの自動プレフィックスキャッシュ・Anthropicのcache_controlが効かなくなります。
+        """
+        # evidence_metadata のキーはスキーマ（英字キー）と一致させる（表示キーへの変換は結果の構造化時）
+        metadata_example = ',\n'.join(
+            f'    "{key}": "{display_key}"' for key, display_key in EVIDENCE_METADATA_KEYS.items()
+        )
+        static_prompt = f"""{self.LEGAL_CONTEXT_PREFIX}{self.prompt_template}
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 【重要: Phase 1 = 客観的事実記録】
@@ -254,25 +352,11 @@ class AIAnalyzerComplete:
 4. **引用可能性**: Phase 2での法的分析や準備書面作成時に使用できる詳細度
 5. **プログラム解釈可能**: database.jsonに記録した際、プログラムで完全に解釈可能
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-【本証拠の完全メタデータ】
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-証拠ID: {evidence_id}
-
-{metadata_text}
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-【ファイル内容サマリー】
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-{content_summary}
-
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 【分析指示】
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-上記の証拠について、Phase 1プロンプトに従って**客観的・中立的な完全言語化レベル4**の分析を実行してください。
+末尾の【本証拠の完全メタデータ】に示す証拠について、Phase 1プロンプトに従って**客観的・中立的な完全言語化レベル4**の分析を実行してください。
 
 **重要:** 
 - 証拠に記載されている事実のみを記録
@@ -291,16 +375,12 @@ class AIAnalyzerComplete:
 以下の構造で、詳細かつ完全な分析結果を出力してください：
 
 {{
-  "evidence_id": "{evidence_id}",
+  "evidence_id": "<本証拠の証拠ID>",
   "verbalization_level": 4,
   "confidence_score": 0.0-1.0,
   
   "evidence_metadata": {{
-    "証拠の基本情報": "...",
-    "ファイル情報": "...",
-    "作成日時": "...",
-    "作成者": "...",
-    "Google DriveURL": "..."
+{metadata_example}
   }},
   
   "full_content": {{
@@ -389,7 +469,300 @@ class AIAnalyzerComplete:
 **重要**: JSON以外の余分なテキストは含めないでください。
 """
         
-        return full_prompt
+        return static_prompt
+    
+    def _build_complete_prompt(self,
+                              evidence_id: str,
+                              metadata: Dict,
+                              file_content: Dict,
+                              case_info: Dict) -> str:
+        """完全版分析プロンプト構築
+        
+        静的プレフィックス（self.static_prompt）の後に証拠ごとの情報を続けます。
+        API呼び出し時は _split_prompt で両者を分離して送信します。
+        """
+        # メタデータを整形（分析に必要なフィールドのみ・トークン予算内）
+        metadata_text = self.prompt_compactor.build_metadata_text(metadata)
+        self.prompt_compactor.log_savings("メタデータ", metadata, metadata_text)
+        
+        # ファイル内容を整形
+        content_summary = self._summarize_file_content(file_content)
+        
+        dynamic_prompt = f"""━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+【本証拠の完全メタデータ】
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+証拠ID: {evidence_id}
+
+{metadata_text}
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+【ファイル内容サマリー】
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+{content_summary}
+
+上記の証拠（証拠ID: {evidence_id}）について、指定の出力形式（JSON）で分析結果を出力してください。
+"""
+        
+        logger.info(
+            f"   🔢 プロンプト: 静的部分 {self.static_prompt_tokens} + "
+            f"証拠部分 {self.prompt_compactor.count_tokens(dynamic_prompt)} トークン"
+        )
+        
+        return f"{self.static_prompt}\n{dynamic_prompt}"
+    
+    def _split_prompt(self, prompt: str) -> tuple:
+        """プロンプトを静的プレフィックスと証拠ごとの部分に分離
+        
+        Returns:
+            (システムプロンプト, ユーザープロンプト)
+            静的プレフィックスで始まらないプロンプト（日付抽出等）は
+            法律文書コンテキストのみをシステムプロンプトとします
+        """
+        if prompt.startswith(self.static_prompt):
+            return self.static_prompt, prompt[len(self.static_prompt):].lstrip('\n')
+        return self.LEGAL_CONTEXT_PREFIX, prompt
+    
+    def _build_openai_messages(self,
+                               prompt: str,
+                               images: Optional[List[tuple]] = None,
+                               detail: str = 'high') -> List[Dict]:
+        """OpenAI Chat Completions用のメッセージを構築
+        
+        静的プレフィックスをsystemメッセージの先頭に固定し、
+        OpenAIの自動プレフィックスキャッシュを効かせます。
+        
+        Args:
+            prompt: _build_complete_prompt 等で構築したプロンプト
+            images: [(MIMEタイプ, Base64データ), ...]（ページ順）
+            detail: Vision APIの詳細度（'low' / 'high'）
+        """
+        system_prompt, user_prompt = self._split_prompt(prompt)
+        
+        if images:
+            user_content = [{"type": "text", "text": user_prompt}]
+            for mime_type, image_data in images:
+                user_content.append({
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:{mime_type};base64,{image_data}",
+                        "detail": detail
+                    }
+                })
+        else:
+            user_content = user_prompt
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content}
+        ]
+    
+    def _build_anthropic_request(self, prompt: str, images: Optional[List[tuple]] = None) -> Dict:
+        """Anthropic Messages API用のsystem/messagesを構築
+        
+        静的プレフィックスにcache_controlブレークポイントを設定します。
+        
+        Args:
+            prompt: _build_complete_prompt 等で構築したプロンプト
+            images: [(MIMEタイプ, Base64データ), ...]（ページ順）
+        """
+        system_prompt, user_prompt = self._split_prompt(prompt)
+        
+        # 画像はテキストより前に配置
+        user_content = [
+            {
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    "media_type": mime_type,
+                    "data": image_data,
+                },
+            }
+            for mime_type, image_data in (images or [])
+        ]
+        user_content.append({"type": "text", "text": user_prompt})
+        
+        return {
+            "system": [
+                {
+                    "type": "text",
+                    "text": system_prompt,
+                    "cache_control": {"type": "ephemeral"}
+                }
+            ],
+            "messages": [
+                {"role": "user", "content": user_content}
+            ]
+        }
+    
+    def _extract_token_usage(self, response, provider: str) -> Dict:
+        """APIレスポンスからトークン使用量（プロンプトキャッシュヒット数を含む）を取得"""
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            return {"provider": provider}
+        
+        token_usage = extract_usage(usage, provider)
+        logger.info(f"   トークン: 入力 {token_usage['input_tokens']} "
+                    f"(キャッシュ {token_usage['cached_tokens']}) / 出力 {token_usage['output_tokens']}")
+        return token_usage
+    
+    def _get_case_key(self) -> str:
+        """現在のスレッドで分析中の事件ID（ヘッジ予算の単位）"""
+        return getattr(self._request_context, 'case_id', 'default')
+    
+    def _add_token_usage(self, total: Dict, usage: Dict) -> Dict:
+        """トークン使用量を合算"""
+        for key, count in usage.items():
+            if isinstance(count, (int, float)):
+                total[key] = total.get(key, 0) + count
+            else:
+                total.setdefault(key, count)
+        return total
+    
+    def _structured_output_params(self, provider: str, prompt: str) -> Dict:
+        """構造化出力用のAPIパラメータ
+        
+        完全言語化分析のプロンプト（静的プレフィックスで始まるもの）のみ対象。
+        日付抽出等の別形式のプロンプトでは空の辞書を返します。
+        """
+        if not ENABLE_STRUCTURED_OUTPUT or not prompt.startswith(self.static_prompt):
+            return {}
+        if provider == 'anthropic':
+            return anthropic_tool_params()
+        return {"response_format": openai_response_format()}
+    
+    def _call_openai(self,
+                     messages: List[Dict],
+                     prompt: str,
+                     label: str,
+                     cancel_event: Optional[threading.Event] = None,
+                     timeout: float = API_TIMEOUT_SECONDS,
+                     retry_count: int = 0,
+                     model: str = OPENAI_MODEL) -> tuple:
+        """OpenAI API呼び出し（構造化出力・途切れた応答の続き要求付き）
+        
+        応答時間・エラーはモデル別統計（provider_router）に、
+        トークン・所要時間・推定コストはテレメトリ（ai_telemetry）に記録します。
+        
+        Args:
+            timeout: 1リクエストのタイムアウト（画像送信時は LARGE_FILE_TIMEOUT_SECONDS）
+            retry_count: テレメトリに記録するリトライ回数
+            model: モデルID（detail=low の画像は VISION_LOW_DETAIL_MODEL）
+        
+        Returns:
+            (StreamResult, トークン使用量)
+        """
+        start_time = time.time()
+        try:
+            with provider_limiter.limit('openai'):
+                response = stream_openai_chat(
+                    self.client,
+                    label=label,
+                    cancel_event=cancel_event,
+                    timeout=timeout,
+                    model=model,
+                    messages=messages,
+                    max_tokens=OPENAI_MAX_TOKENS,
+                    temperature=OPENAI_TEMPERATURE,
+                    **self._structured_output_params('openai', prompt)
+                )
+        except Exception:
+            provider_router.record(model, time.time() - start_time, success=False)
+            ai_telemetry.record_call('ai_analyzer', 'openai', model, None, time.time() - start_time,
+                                     retry_count=retry_count, status='error', label=label)
+            raise
+        
+        # 拒否・キャンセルで打ち切った応答は応答時間の統計に含めない
+        if not response.refused and not response.cancelled:
+            provider_router.record(model, time.time() - start_time, success=True)
+        token_usage = self._extract_token_usage(response, 'openai')
+        ai_telemetry.record_call('ai_analyzer', 'openai', model, token_usage, response.elapsed_seconds,
+                                 retry_count=retry_count, status=self._response_status(response), label=label)
+        
+        # 出力上限で途切れた場合は全体をやり直さず続きを要求
+        continuation = 0
+        while response.finish_reason == 'length' and not response.refused and not response.cancelled \
+                and continuation < STRUCTURED_OUTPUT_MAX_CONTINUATIONS:
+            continuation += 1
+            logger.warning(f"⚠️ 応答が出力上限で途切れました - 続きを要求します（{continuation}回目）")
+            with provider_limiter.limit('openai'):
+                follow_up = stream_openai_chat(
+                    self.client,
+                    label=f"{label}（続き{continuation}）",
+                    timeout=timeout,
+                    model=model,
+                    messages=messages + [
+                        {"role": "assistant", "content": response.text},
+                        {"role": "user", "content": self.CONTINUATION_INSTRUCTION}
+                    ],
+                    max_tokens=OPENAI_MAX_TOKENS,
+                    temperature=OPENAI_TEMPERATURE
+                )
+            response.text += self._strip_code_fence(follow_up.text)
+            response.finish_reason = follow_up.finish_reason
+            follow_up_usage = self._extract_token_usage(follow_up, 'openai')
+            self._add_token_usage(token_usage, follow_up_usage)
+            ai_telemetry.record_call('ai_analyzer', 'openai', model, follow_up_usage, follow_up.elapsed_seconds,
+                                     retry_count=retry_count, status=self._response_status(follow_up),
+                                     label=f"{label}（続き{continuation}）")
+        
+        return response, token_usage
+    
+    def _response_status(self, response) -> str:
+        """テレメトリに記録する応答の状態"""
+        if response.cancelled:
+            return 'cancelled'
+        if response.refused:
+            return 'refused'
+        return 'success'
+    
+    def _continue_anthropic_response(self,
+                                     message,
+                                     request: Dict,
+                                     model: str,
+                                     label: str,
+                                     token_usage: Dict):
+        """出力上限で途切れたClaudeの応答を、途中までの出力を先頭に置いて続けさせる"""
+        continuation = 0
+        while message.finish_reason == 'max_tokens' and not message.refused \
+                and continuation < STRUCTURED_OUTPUT_MAX_CONTINUATIONS:
+            continuation += 1
+            logger.warning(f"⚠️ 応答が出力上限で途切れました - 続きを要求します（{continuation}回目）")
+            
+            # アシスタント出力の先頭指定は末尾の空白を許容しない
+            partial_text = message.text.rstrip()
+            with provider_limiter.limit('anthropic'):
+                follow_up = stream_anthropic_message(
+                    self.anthropic_client,
+                    label=f"{label}（続き{continuation}）",
+                    timeout=LARGE_FILE_TIMEOUT_SECONDS,
+                    model=model,
+                    max_tokens=ANTHROPIC_MAX_TOKENS,
+                    temperature=ANTHROPIC_TEMPERATURE,
+                    system=request['system'],
+                    messages=request['messages'] + [
+                        {"role": "assistant", "content": partial_text}
+                    ],
+                )
+            message.text = partial_text + follow_up.text
+            message.finish_reason = follow_up.finish_reason
+            follow_up_usage = self._extract_token_usage(follow_up, 'anthropic')
+            self._add_token_usage(token_usage, follow_up_usage)
+            ai_telemetry.record_call('ai_analyzer', 'anthropic', model, follow_up_usage, follow_up.elapsed_seconds,
+                                     status=self._response_status(follow_up),
+                                     label=f"{label}（続き{continuation}）")
+        
+        return message
+    
+    def _strip_code_fence(self, text: str) -> str:
+        """続きの出力に付いたコードブロック記号を除去"""
+        stripped = text.strip()
+        if stripped.startswith("```"):
+            stripped = stripped.split('\n', 1)[1] if '\n' in stripped else ''
+        if stripped.endswith("```"):
+            stripped = stripped[:-3]
+        return stripped
     
     def _summarize_file_content(self, file_content: Dict) -> str:
         """ファイル内容をサマリー化"""
@@ -422,139 +795,212 @@ class AIAnalyzerComplete:
         
         return '\n'.join(summary_parts)
     
-    def _analyze_with_vision(self, file_path: str, prompt: str, file_type: str, retry_count: int = 0, track_retry: bool = True) -> Dict:
-        """Vision APIで分析（リトライ機構付き）"""
+    def _analyze_with_vision(self,
+                             file_path: str,
+                             prompt: str,
+                             file_type: str,
+                             retry_count: int = 0,
+                             track_retry: bool = True,
+                             file_content: Optional[Dict] = None,
+                             routing: Optional[Dict] = None,
+                             detail_plan: Optional[Dict] = None,
+                             first_page_only: bool = False) -> Dict:
+        """Vision APIで分析（リトライ機構付き）
+        
+        複数ページのPDF・文書は選択したページのみを画像化し、
+        VISION_PAGES_PER_REQUEST ページずつ並列リクエストで送信します。
+        
+        Args:
+            first_page_only: PDF・文書の1ページ目のみを送信（日付抽出等の軽量な分析用）
+            routing: 拒否予測によるルーティング（RefusalPredictor.decide の結果）。
+                     route が 'claude' ならClaudeを先に試行し、GPT-4oの拒否有無を openai_refused に記録
+            detail_plan: 詳細度・モデルの選択（VisionDetailSelector.select の結果、未指定時は detail=high）
+        """
         try:
             # ファイルタイプに応じた処理
-            if file_type == 'image':
-                image_path = file_path
-            elif file_type in ['pdf', 'document']:
-                # PDFまたはWord文書の最初のページを画像化
-                image_path = self._pdf_first_page_to_image(file_path)
+            if file_type in ['pdf', 'document']:
+                pdf_path = self._convert_to_pdf(file_path)
+                if first_page_only:
+                    page_count, page_groups = (1, [[1]]) if pdf_path else (0, [])
+                else:
+                    page_count, page_groups = self._select_vision_pages(pdf_path, file_content) if pdf_path else (0, [])
+                
+                # 選択したページのみを画像化
+                rendered = self._render_pages(pdf_path, [n for group in page_groups for n in group])
+                page_groups = [[n for n in group if rendered.get(n)] for group in page_groups]
+                page_groups = [group for group in page_groups if group]
                 
                 # PDF変換失敗時はテキスト解析にフォールバック
-                if image_path is None:
+                if not page_groups:
                     logger.warning(f"{file_type}→画像変換失敗、テキスト解析にフォールバック")
-                    return self._analyze_with_text(prompt, {'file_path': file_path})
+                    return self._analyze_with_text(prompt, file_content or {'file_path': file_path})
+                
+                if len(page_groups) > 1:
+                    return self._analyze_page_groups_with_vision(
+                        page_groups, rendered, page_count, prompt, retry_count, track_retry, routing
+                    )
+                
+                image_paths = [rendered[n] for n in page_groups[0]]
+                if page_count > 1:
+                    prompt = self._add_page_note(prompt, page_groups[0], page_count)
             else:
-                image_path = file_path
-            
-            # Base64エンコード
-            with open(image_path, 'rb') as f:
-                image_data = base64.b64encode(f.read()).decode('utf-8')
-            
-            mime_type = self._get_mime_type(image_path)
+                image_paths = [file_path]
             
-            # 常に法律文書であることを明示（コンテンツポリシー誤検出を防ぐ）
-            context_prefix = """
-IMPORTANT: This is a legal evidence document submitted in civil litigation proceedings.
-
-CONTEXT:
-- This image is documentary evidence for legal proceedings
-- Contains factual records such as photos, screenshots, documents, or correspondence
-- Required for objective legal analysis and court procedures
-- Educational and professional analysis purpose only
-- No harmful, dangerous, or inappropriate content intended
-
-TASK: Analyze this evidence objectively and professionally for legal documentation purposes.
-
-"""
-            if retry_count > 0:
-                logger.info(f"🔄 リトライ {retry_count}回目: 法律文書コンテキストを追加")
-            
-            # GPT-4o Vision API呼び出し
-            response = self.client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": context_prefix + prompt
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:{mime_type};base64,{image_data}",
-                                    "detail": "high"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=OPENAI_MAX_TOKENS,
-                temperature=OPENAI_TEMPERATURE
-            )
-            
-            result = response.choices[0].message.content
-            logger.debug(f"API応答: {len(result)}文字")
-            
-            # デバッグ: APIレスポンスの最初の200文字を表示
-            if result:
-                logger.debug(f"API応答プレビュー: {result[:200]}...")
-            
-            # OpenAIのコンテンツポリシー拒否チェック
-            # Vision APIが拒否した場合、Claude → OCRの順でフォールバック
-            # 拒否メッセージの特徴:
-            # 1. 非常に短い（通常100文字未満）
-            # 2. JSON形式ではない
-            # 3. "I'm sorry, I can't assist with that"という完全一致
-            if result and len(result) < 200 and "```" not in result and "{" not in result:
-                if "I'm sorry, I can't assist with that" in result or \
-                   "I cannot assist with that request" in result or \
-                   (result.startswith("I'm sorry") and "assist" in result):
-                    
-                    logger.warning(f"⚠️ OpenAI Vision API: コンテンツポリシーで拒否されました")
-                    logger.warning(f"   拒否メッセージ: {result}")
-                    
-                    # Claude Vision APIにフォールバック
-                    if self.anthropic_client:
-                        logger.info("🔄 Anthropic Claude Vision APIにフォールバックします")
-                        try:
-                            claude_result = self._analyze_with_claude(image_path, prompt)
-                            if claude_result:
-                                logger.info("✅ Claude Vision APIで分析成功")
-                                return claude_result
-                        except Exception as e:
-                            logger.warning(f"⚠️ Claude Vision API失敗: {e}")
-                    
-                    # OCRテキストベース分析にフォールバック
-                    logger.info("📝 OCRテキストベース分析にフォールバックします")
-                    return None  # Noneを返してフォールバック処理を促す
-            
-            parsed_result = self._parse_ai_response(result)
-            
-            # リトライ回数を記録
-            if track_retry and isinstance(parsed_result, dict) and retry_count > 0:
-                parsed_result['_retry_count'] = retry_count
-            
-            return parsed_result
+            return self._analyze_images_with_vision(image_paths, prompt, retry_count, track_retry, routing, detail_plan)
             
         except Exception as e:
             logger.error(f"❌ Vision API分析失敗: {e}")
             raise
     
-    def _analyze_with_claude(self, image_path: str, prompt: str) -> Optional[Dict]:
+    def _analyze_images_with_vision(self,
+                                    image_paths: List[str],
+                                    prompt: str,
+                                    retry_count: int = 0,
+                                    track_retry: bool = True,
+                                    routing: Optional[Dict] = None,
+                                    detail_plan: Optional[Dict] = None) -> Optional[Dict]:
+        """画像（1枚または複数ページ）をGPT-4o Visionで分析
+        
+        拒否予測で route が 'claude' の場合はClaude → GPT-4o の順に試行します。
+        detail_plan の detail が 'low' の場合は512pxに縮小して detail=low で送信します。
+        
+        Returns:
+            分析結果（コンテンツポリシー拒否かつClaudeも失敗した場合はNone）
+        """
+        detail = detail_plan['detail'] if detail_plan else 'high'
+        model = detail_plan['model'] if detail_plan else OPENAI_MODEL
+        if detail != 'high':
+            logger.info(f"🖼️ detail={detail} で送信（{'、'.join(detail_plan['reasons'])}）")
+        
+        # 縮小・再エンコードしてBase64エンコード
+        image_profile = detail_plan['image_profile'] if detail_plan else 'openai'
+        payloads = [self.image_preprocessor.get_payload(path, image_profile) for path in image_paths]
+        image_bytes = b''.join(payload.data for payload in payloads)
+        images = [(payload.mime_type, payload.base64) for payload in payloads]
+        
+        # キャッシュ確認（Claudeフォールバック結果も同じキーで保存される）
+        # detail=high 以外は別キー（同じ画像を high で再分析したときに low の結果を返さない）
+        cache_model = model if detail == 'high' else f"{model}:detail-{detail}"
+        cache_key = self.analysis_cache.make_key(image_bytes, prompt, cache_model, OPENAI_TEMPERATURE)
+        cached_result = self.analysis_cache.get(cache_key)
+        if cached_result is not None:
+            return cached_result
+        
+        if retry_count > 0:
+            logger.info(f"🔄 リトライ {retry_count}回目: 法律文書コンテキストを追加")
+        
+        # GPT-4o → Claude の順に実行（GPT-4oが拒否・失敗したらClaude、
+        # GPT-4oがp95を超えて応答しなければClaudeへヘッジ）
+        candidates = [
+            (model, lambda cancel_event: self._request_openai_vision(
+                images, prompt, cancel_event, retry_count, routing, detail, model
+            ))
+        ]
+        if self.anthropic_client:
+            claude_candidate = (
+                ANTHROPIC_MODEL, lambda cancel_event: self._analyze_with_claude(image_paths, prompt, cancel_event)
+            )
+            if routing and routing.get('route') == 'claude':
+                candidates.insert(0, claude_candidate)
+            else:
+                candidates.append(claude_candidate)
+        
+        parsed_result = provider_router.run(
+            candidates,
+            is_valid=lambda result: isinstance(result, dict) and 'parse_error' not in result,
+            budget_key=self._get_case_key()
+        )
+        
+        if parsed_result is None:
+            # OCRテキストベース分析にフォールバック
+            logger.info("📝 OCRテキストベース分析にフォールバックします")
+            return None  # Noneを返してフォールバック処理を促す
+        
+        used_claude = isinstance(parsed_result, dict) and str(parsed_result.get('_ai_engine', '')).startswith('Claude')
+        self.analysis_cache.put(cache_key, parsed_result, model=ANTHROPIC_MODEL if used_claude else model)
+        
+        # リトライ回数を記録
+        if track_retry and isinstance(parsed_result, dict) and retry_count > 0:
+            parsed_result['_retry_count'] = retry_count
+        
+        return parsed_result
+    
+    def _request_openai_vision(self,
+                               images: List[tuple],
+                               prompt: str,
+                               cancel_event: Optional[threading.Event] = None,
+                               retry_count: int = 0,
+                               routing: Optional[Dict] = None,
+                               detail: str = 'high',
+                               model: str = OPENAI_MODEL) -> Optional[Dict]:
+        """GPT-4o Vision APIで分析
+        
+        Args:
+            routing: 指定時は拒否の有無を openai_refused に記録（複数リクエストは1件でも拒否ならTrue）
+            detail: Vision APIの詳細度（'low' / 'high'）
+            model: モデルID
+        
+        Returns:
+            分析結果（コンテンツポリシー拒否・キャンセル時はNone）
+        """
+        # GPT-4o Vision API呼び出し（ストリーミング受信・構造化出力）
+        response, token_usage = self._call_openai(
+            self._build_openai_messages(prompt, images=images, detail=detail), prompt, "GPT-4o Vision",
+            cancel_event=cancel_event,
+            timeout=LARGE_FILE_TIMEOUT_SECONDS,
+            retry_count=retry_count,
+            model=model
+        )
+        if response.cancelled:
+            return None
+        
+        if routing is not None:
+            routing['openai_refused'] = bool(routing.get('openai_refused')) or response.refused
+        
+        result = response.text
+        logger.debug(f"API応答: {len(result)}文字")
+        
+        # デバッグ: APIレスポンスの最初の200文字を表示
+        if result:
+            logger.debug(f"API応答プレビュー: {result[:200]}...")
+        
+        # OpenAIのコンテンツポリシー拒否チェック
+        # ストリーミング時は応答冒頭で拒否を検知した時点で受信を中止済み
+        if response.refused:
+            logger.warning(f"⚠️ OpenAI Vision API: コンテンツポリシーで拒否されました")
+            logger.warning(f"   拒否メッセージ: {result}")
+            return None
+        
+        parsed_result = self._parse_ai_response(result)
+        if isinstance(parsed_result, dict):
+            parsed_result['_token_usage'] = token_usage
+        return parsed_result
+    
+    def _analyze_with_claude(self,
+                             image_paths: Union[str, List[str]],
+                             prompt: str,
+                             cancel_event: Optional[threading.Event] = None) -> Optional[Dict]:
         """Anthropic Claude Vision APIで分析
         
         Args:
-            image_path: 画像ファイルパス
+            image_paths: 画像ファイルパス（複数ページの場合はリスト）
             prompt: 分析プロンプト
+            cancel_event: セットされたら受信を中止するイベント
             
         Returns:
-            分析結果（失敗時はNone）
+            分析結果（失敗・キャンセル時はNone）
         """
         try:
             if not self.anthropic_client:
                 return None
             
-            # Base64エンコード
-            with open(image_path, 'rb') as f:
-                image_data = base64.b64encode(f.read()).decode('utf-8')
+            if isinstance(image_paths, str):
+                image_paths = [image_paths]
             
-            # MIME type取得
-            mime_type = self._get_mime_type(image_path)
+            # 縮小・再エンコードしてBase64エンコード
+            payloads = [self.image_preprocessor.get_payload(path, 'anthropic') for path in image_paths]
+            image_bytes = b''.join(payload.data for payload in payloads)
+            images = [(payload.mime_type, payload.base64) for payload in payloads]
             
             # Claude Vision API呼び出し（多段階フォールバック対応）
             # 試行順序: Sonnet 4 → Sonnet 3.7 → Haiku 4
@@ -564,67 +1010,79 @@ TASK: Analyze this evidence objectively and professionally for legal documentati
                 ("Claude Haiku 4.x (高速)", ANTHROPIC_MODEL_FALLBACK_2)
             ]
             
+            # キャッシュ確認（モデルの試行順序全体をキーに含める）
+            cache_key = self.analysis_cache.make_key(
+                image_bytes,
+                prompt,
+                '|'.join(model_id for _, model_id in models_to_try),
+                ANTHROPIC_TEMPERATURE
+            )
+            cached_result = self.analysis_cache.get(cache_key)
+            if cached_result is not None:
+                return cached_result
+            
             message = None
             model = None
             last_error = None
             
-            # メッセージコンテンツを準備（全モデル共通）
-            message_content = [
-                {
-                    "type": "image",
-                    "source": {
-                        "type": "base64",
-                        "media_type": mime_type,
-                        "data": image_data,
-                    },
-                },
-                {
-                    "type": "text",
-                    "text": f"""IMPORTANT: This is a legal evidence document submitted in civil litigation proceedings.
-
-CONTEXT:
-- This image is documentary evidence for legal proceedings
-- Contains factual records such as photos, screenshots, documents, or correspondence
-- Required for objective legal analysis and court procedures
-- Educational and professional analysis purpose only
-
-TASK: Analyze this evidence objectively and professionally for legal documentation purposes.
-
-{prompt}"""
-                }
-            ]
+            # リクエストを準備（全モデル共通、静的プレフィックスはcache_control付きsystem）
+            request = self._build_anthropic_request(prompt, images=images)
             
-            # 各モデルを順番に試行
-            for model_name, model_id in models_to_try:
+            # 各モデルを順番に試行（遮断中のモデルはスキップ）
+            for attempt, (model_name, model_id) in enumerate(models_to_try):
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
+                if not model_circuit_breaker.allow(model_id):
+                    logger.info(f"⏭️ {model_name} ({model_id}) は遮断中のためスキップ")
+                    continue
+                start_time = time.time()
                 try:
                     logger.info(f"🔄 {model_name} で分析を試行中...")
                     model = model_id
-                    message = self.anthropic_client.messages.create(
-                        model=model,
-                        max_tokens=ANTHROPIC_MAX_TOKENS,
-                        temperature=ANTHROPIC_TEMPERATURE,
-                        messages=[
-                            {
-                                "role": "user",
-                                "content": message_content,
-                            }
-                        ],
-                    )
+                    with provider_limiter.limit('anthropic'):
+                        message = stream_anthropic_message(
+                            self.anthropic_client,
+                            label=model_name,
+                            cancel_event=cancel_event,
+                            timeout=LARGE_FILE_TIMEOUT_SECONDS,
+                            model=model,
+                            max_tokens=ANTHROPIC_MAX_TOKENS,
+                            temperature=ANTHROPIC_TEMPERATURE,
+                            system=request['system'],
+                            messages=request['messages'],
+                            **self._structured_output_params('anthropic', prompt)
+                        )
+                    token_usage = self._extract_token_usage(message, 'anthropic')
+                    ai_telemetry.record_call('ai_analyzer', 'anthropic', model, token_usage,
+                                             message.elapsed_seconds, retry_count=attempt,
+                                             status=self._response_status(message), label=model_name)
+                    if message.cancelled:
+                        model_circuit_breaker.release(model)
+                        return None
+                    model_circuit_breaker.record_success(model)
+                    if not message.refused:
+                        provider_router.record(model, time.time() - start_time, success=True)
                     logger.info(f"✅ {model_name} で分析成功")
                     break  # 成功したらループ終了
                     
                 except Exception as model_error:
+                    provider_router.record(model, time.time() - start_time, success=False)
+                    ai_telemetry.record_call('ai_analyzer', 'anthropic', model, None, time.time() - start_time,
+                                             retry_count=attempt, status='error', label=model_name)
                     last_error = model_error
                     if "404" in str(model_error) or "not_found" in str(model_error):
                         logger.warning(f"⚠️ {model_name} ({model}) が利用不可: {model_error}")
+                        model_circuit_breaker.record_failure(model, not_found=True)
                         # 次のモデルに進む
                         continue
                     elif "overloaded" in str(model_error).lower():
                         logger.warning(f"⚠️ {model_name} が過負荷状態: {model_error}")
+                        model_circuit_breaker.record_failure(model)
                         # 次のモデルに進む
                         continue
                     else:
-                        # その他のエラーは再発生させる
+                        # その他のエラーは再発生させる（モデル自体は利用可能とみなす）
+                        model_circuit_breaker.release(model)
                         logger.error(f"❌ {model_name} でエラー: {model_error}")
                         raise
             
@@ -636,10 +1094,18 @@ TASK: Analyze this evidence objectively and professionally for legal documentati
                 else:
                     raise Exception("すべてのClaudeモデルが利用不可です")
             
+            # 出力上限で途切れた場合は続きを要求
+            message = self._continue_anthropic_response(message, request, model, model_name, token_usage)
+            
             # レスポンスからテキストを抽出
-            result = message.content[0].text
+            result = message.text
             logger.debug(f"Claude API応答: {len(result)}文字")
             
+            # Claudeも拒否した場合はOCRテキストベース分析に委ねる
+            if message.refused:
+                logger.warning(f"⚠️ Claude Vision API: 分析を拒否されました: {result[:80]}")
+                return None
+            
             # モデル世代を判定
             if "sonnet-4" in model:
                 model_family = "Claude Sonnet 4.x (最高品質)"
@@ -658,7 +1124,9 @@ TASK: Analyze this evidence objectively and professionally for legal documentati
             # AI分析エンジン情報を記録
             if isinstance(parsed_result, dict):
                 parsed_result['_ai_engine'] = f'{model_family} ({model})'
+                parsed_result['_token_usage'] = token_usage
             
+            self.analysis_cache.put(cache_key, parsed_result, model=model)
             return parsed_result
             
         except Exception as e:
@@ -668,30 +1136,37 @@ TASK: Analyze this evidence objectively and professionally for legal documentati
     def _analyze_with_text(self, prompt: str, file_content: Dict) -> Dict:
         """テキストベース分析"""
         try:
-            # ファイル内容をプロンプトに追加
-            content_text = json.dumps(file_content, ensure_ascii=False, indent=2)
-            full_prompt = f"{prompt}\n\n【ファイル内容詳細】\n{content_text}"
-            
-            # GPT-4o API呼び出し
-            response = self.client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": full_prompt
-                    }
-                ],
-                max_tokens=OPENAI_MAX_TOKENS,
-                temperature=OPENAI_TEMPERATURE
+            # ファイル内容をプロンプトに追加（重複除去・トークン予算内）
+            content_text = self.prompt_compactor.build_content_text(file_content)
+            self.prompt_compactor.log_savings("ファイル内容", file_content, content_text)
+            full_prompt = self._build_text_prompt(prompt, content_text)
+            
+            # キャッシュ確認
+            cache_key = self.analysis_cache.make_key(content_text, prompt, OPENAI_MODEL, OPENAI_TEMPERATURE)
+            cached_result = self.analysis_cache.get(cache_key)
+            if cached_result is not None:
+                return cached_result
+            
+            # GPT-4o API呼び出し（ストリーミング受信・構造化出力）
+            response, token_usage = self._call_openai(
+                self._build_openai_messages(full_prompt), full_prompt, "GPT-4o"
             )
             
-            result = response.choices[0].message.content
-            return self._parse_ai_response(result)
+            result = response.text
+            parsed_result = self._parse_ai_response(result)
+            if isinstance(parsed_result, dict):
+                parsed_result['_token_usage'] = token_usage
+            self.analysis_cache.put(cache_key, parsed_result, model=OPENAI_MODEL)
+            return parsed_result
             
         except Exception as e:
             logger.error(f"❌ テキストベース分析失敗: {e}")
             raise
     
+    def _build_text_prompt(self, prompt: str, content_text: str) -> str:
+        """テキストベース分析用にファイル内容をプロンプトへ追加"""
+        return f"{prompt}\n\n【ファイル内容詳細】\n{content_text}"
+    
     def _parse_ai_response(self, response: str) -> Dict:
         """AI応答をパース"""
         try:
@@ -754,6 +1229,20 @@ TASK: Analyze this evidence objectively and professionally for legal documentati
                                    file_content: Dict,
                                    ai_analysis: Dict) -> Dict:
         """完全な分析結果を構造化"""
+        # スキーマ検証結果を記録（構造化出力でも旧形式の応答・キャッシュでも同じ基準で確認）
+        if isinstance(ai_analysis, dict) and 'parse_error' not in ai_analysis:
+            schema_errors = validate_analysis_result(
+                to_schema_keys({k: v for k, v in ai_analysis.items() if not k.startswith('_')})
+            )
+            ai_analysis['_schema_validation'] = {
+                "valid": not schema_errors,
+                "errors": schema_errors[:20]
+            }
+            if schema_errors:
+                logger.warning(f"⚠️ スキーマ検証: {len(schema_errors)}件の不整合 - {schema_errors[0]}")
+            # 構造化出力の英字キーを従来の表示キーに戻す
+            ai_analysis = to_display_keys(ai_analysis)
+        
         return {
             # 証拠ID
             "evidence_id": evidence_id,
@@ -853,6 +1342,24 @@ TASK: Analyze this evidence objectively and professionally for legal documentati
         
         return quality
     
+    def _detail_escalation_reason(self, vision_result: Optional[Dict]) -> Optional[str]:
+        """detail=low の分析結果を high で再分析すべき理由（不要ならNone）"""
+        if not isinstance(vision_result, dict):
+            return None
+        if 'parse_error' in vision_result:
+            return "応答の解析失敗"
+        
+        quality = self._assess_analysis_quality({'ai_analysis': vision_result})
+        if quality['verbalization_level'] < QUALITY_CHECK_THRESHOLDS['verbalization']:
+            return f"言語化レベル {quality['verbalization_level']}"
+        
+        confidence = quality['confidence_score'] or 0.0
+        if confidence > 1:
+            confidence /= 100  # パーセント表記
+        if confidence < VISION_DETAIL_ESCALATION_MIN_CONFIDENCE:
+            return f"信頼度 {confidence:.0%}"
+        return None
+    
     def _assess_analysis_quality(self, result: Dict) -> Dict:
         """分析品質を評価"""
         quality = {
@@ -916,82 +1423,183 @@ TASK: Analyze this evidence objectively and professionally for legal documentati
         Returns:
             変換後の画像ファイルパス、失敗時はNone
         """
-        try:
-            # ファイル拡張子を確認
-            file_ext = os.path.splitext(file_path)[1].lower()
-            
-            # Word文書の場合はPDFに変換してから画像化
-            if file_ext in ['.doc', '.docx']:
-                logger.info(f"Word→PDF→画像変換開始: {os.path.basename(file_path)}")
-                
-                # Word→PDF変換（LibreOffice使用）
-                try:
-                    import subprocess
-                    temp_dir = os.path.dirname(file_path)
-                    
-                    # LibreOfficeでPDFに変換
-                    subprocess.run([
-                        'soffice',
-                        '--headless',
-                        '--convert-to', 'pdf',
-                        '--outdir', temp_dir,
-                        file_path
-                    ], check=True, capture_output=True, timeout=30)
-                    
-                    # 変換されたPDFパス
-                    pdf_path = file_path.rsplit('.', 1)[0] + '.pdf'
-                    
-                    if not os.path.exists(pdf_path):
-                        logger.warning("Word→PDF変換に失敗しました")
-                        return None
-                    
-                    # PDFを使用して画像変換を続行
-                    file_path = pdf_path
-                    file_ext = '.pdf'
-                    
-                except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired) as e:
-                    logger.warning(f"Word→PDF変換失敗: {e}")
-                    logger.warning("  LibreOfficeが未インストールの可能性があります")
-                    logger.warning("  インストール: brew install libreoffice (Mac)")
-                    return None
+        pdf_path = self._convert_to_pdf(file_path)
+        if pdf_path is None:
+            return None
+        
+        logger.info(f"PDF→画像変換開始: {os.path.basename(pdf_path)}")
+        image_path = self.page_sampler.render_page(pdf_path, 1)
+        if image_path is None:
+            logger.warning("PDFから画像を抽出できませんでした")
+            return None
+        
+        logger.info(f"変換成功: {os.path.basename(image_path)}")
+        return image_path
+    
+    def _convert_to_pdf(self, file_path: str) -> Optional[str]:
+        """Word文書をPDFに変換（PDFはそのまま返す）
+        
+        Returns:
+            PDFファイルパス、失敗時はNone
+        """
+        # ファイル拡張子を確認
+        file_ext = os.path.splitext(file_path)[1].lower()
+        
+        if file_ext == '.pdf':
+            return file_path
+        
+        # Word文書の場合はPDFに変換してから画像化
+        if file_ext in ['.doc', '.docx']:
+            logger.info(f"Word→PDF変換開始: {os.path.basename(file_path)}")
             
-            # PDFを画像に変換
-            if file_ext == '.pdf':
-                from pdf2image import convert_from_path
+            # Word→PDF変換（LibreOffice使用）
+            try:
+                import subprocess
+                temp_dir = os.path.dirname(file_path)
                 
-                logger.info(f"PDF→画像変換開始: {os.path.basename(file_path)}")
+                # LibreOfficeでPDFに変換
+                subprocess.run([
+                    'soffice',
+                    '--headless',
+                    '--convert-to', 'pdf',
+                    '--outdir', temp_dir,
+                    file_path
+                ], check=True, capture_output=True, timeout=30)
                 
-                # PDFの1ページ目のみを画像に変換
-                images = convert_from_path(
-                    file_path, 
-                    first_page=1, 
-                    last_page=1,
-                    dpi=150  # 解像度（高すぎるとファイルサイズ大）
-                )
+                # 変換されたPDFパス
+                pdf_path = file_path.rsplit('.', 1)[0] + '.pdf'
                 
-                if not images:
-                    logger.warning("PDFから画像を抽出できませんでした")
+                if not os.path.exists(pdf_path):
+                    logger.warning("Word→PDF変換に失敗しました")
                     return None
                 
-                # 一時ファイルとして保存
-                temp_image_path = file_path.replace('.pdf', '_page1.jpg')
-                images[0].save(temp_image_path, 'JPEG', quality=85)
+                return pdf_path
                 
-                logger.info(f"変換成功: {os.path.basename(temp_image_path)}")
-                return temp_image_path
-            else:
-                logger.warning(f"サポートされていないファイル形式: {file_ext}")
+            except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired) as e:
+                logger.warning(f"Word→PDF変換失敗: {e}")
+                logger.warning("  LibreOfficeが未インストールの可能性があります")
+                logger.warning("  インストール: brew install libreoffice (Mac)")
                 return None
+        
+        logger.warning(f"サポートされていないファイル形式: {file_ext}")
+        return None
+    
+    def _select_vision_pages(self, pdf_path: str, file_content: Optional[Dict] = None) -> tuple:
+        """Vision APIに送信するページを選択してリクエスト単位に分割
+        
+        Returns:
+            (総ページ数, [[ページ番号, ...], ...])
+            ENABLE_MULTIPAGE_VISION が無効の場合は (1, [[1]])
+        """
+        if not ENABLE_MULTIPAGE_VISION:
+            return 1, [[1]]
+        
+        page_count = self.page_sampler.get_page_count(pdf_path, file_content)
+        pages = self.page_sampler.select_pages(page_count, file_content)
+        if page_count > 1:
+            logger.info(f"📄 複数ページVision分析: 全{page_count}ページ中 {len(pages)}ページを送信 {pages}")
+        return page_count, self.page_sampler.chunk_pages(pages)
+    
+    def _render_pages(self, pdf_path: str, page_numbers: List[int]) -> Dict[int, str]:
+        """選択したページのみを並列で画像化
+        
+        Returns:
+            {ページ番号: 画像ファイルパス}（失敗したページは値がNone）
+        """
+        if not pdf_path or not page_numbers:
+            return {}
+        
+        if len(page_numbers) == 1:
+            return {page_numbers[0]: self.page_sampler.render_page(pdf_path, page_numbers[0])}
+        
+        with ThreadPoolExecutor(max_workers=min(len(page_numbers), MAX_PARALLEL_WORKERS),
+                                thread_name_prefix="pdf_render") as executor:
+            image_paths = executor.map(lambda n: self.page_sampler.render_page(pdf_path, n), page_numbers)
+            return dict(zip(page_numbers, image_paths))
+    
+    def _add_page_note(self, prompt: str, pages: List[int], page_count: int, partial: bool = False) -> str:
+        """送信ページの説明をプロンプト末尾（証拠ごとの部分）に追加"""
+        page_list = ', '.join(f"p.{n}" for n in pages)
+        note = f"\n【添付ページ】全{page_count}ページ中 {page_list} の画像を添付しています（添付していないページは上記のファイル内容サマリーを参照してください）。"
+        if partial:
+            note += "\nこれは同一証拠の一部のページです。添付ページから読み取れる内容について、同じ出力形式で分析してください。"
+        return f"{prompt}{note}\n"
+    
+    def _analyze_page_groups_with_vision(self,
+                                         page_groups: List[List[int]],
+                                         rendered: Dict[int, str],
+                                         page_count: int,
+                                         prompt: str,
+                                         retry_count: int = 0,
+                                         track_retry: bool = True,
+                                         routing: Optional[Dict] = None) -> Optional[Dict]:
+        """複数リクエストに分けたページを並列で分析し、結果を統合
+        
+        先頭ページを含むリクエストの結果を基準とし、他のリクエストの結果で
+        未記入の項目やリスト項目を補完します。
+        """
+        case_key = self._get_case_key()
+        
+        def analyze_group(index_and_pages):
+            index, pages = index_and_pages
+            self._request_context.case_id = case_key
+            group_prompt = self._add_page_note(prompt, pages, page_count, partial=index > 0)
+            return self._analyze_images_with_vision(
+                [rendered[n] for n in pages], group_prompt, retry_count, track_retry, routing
+            )
+        
+        with ThreadPoolExecutor(max_workers=len(page_groups), thread_name_prefix="vision_pages") as executor:
+            futures = [executor.submit(bind_context(analyze_group), item) for item in enumerate(page_groups)]
             
-        except ImportError:
-            logger.error("エラー: pdf2imageライブラリが未インストール")
-            logger.error("  インストール: pip install pdf2image")
-            logger.error("  システム依存: brew install poppler (Mac)")
-            return None
+            # 基準となる先頭グループの失敗・拒否は全体の失敗として扱う
+            base_result = futures[0].result()
+            if not isinstance(base_result, dict):
+                return base_result
             
-        except Exception as e:
-            logger.error(f"文書変換エラー: {e}")
-            return None
+            analyzed_pages = list(page_groups[0])
+            for pages, future in zip(page_groups[1:], futures[1:]):
+                try:
+                    group_result = future.result()
+                except Exception as e:
+                    logger.warning(f"⚠️ ページ {pages} の分析失敗（スキップ）: {e}")
+                    continue
+                if isinstance(group_result, dict) and 'parse_error' not in group_result:
+                    self._merge_page_group_result(base_result, group_result)
+                    analyzed_pages.extend(pages)
+        
+        base_result['_vision_pages'] = {
+            "page_count": page_count,
+            "analyzed_pages": sorted(analyzed_pages),
+            "request_count": len(page_groups)
+        }
+        return base_result
+    
+    def _merge_page_group_result(self, base: Dict, other: Dict) -> Dict:
+        """ページグループの分析結果を基準結果に統合
+        
+        - 基準側が空の項目は補完
+        - リストは重複を除いて追加
+        - 抽出テキストはページ順に連結
+        - トークン使用量は合算
+        """
+        for key, value in other.items():
+            if key == '_token_usage' and isinstance(value, dict):
+                self._add_token_usage(base.setdefault('_token_usage', {}), value)
+                continue
+            if key.startswith('_'):
+                continue
+            
+            current = base.get(key)
+            if current in (None, '', [], {}):
+                base[key] = value
+            elif isinstance(current, dict) and isinstance(value, dict):
+                self._merge_page_group_result(current, value)
+            elif isinstance(current, list) and isinstance(value, list):
+                current.extend(item for item in value if item not in current)
+            elif key == 'extracted_text' and isinstance(value, str) and value and value not in current:
+                base[key] = f"{current}\n\n{value}"
+        
+        return base
     
     def _get_mime_type(self, file_path: str) -> str:
         """MIMEタイプ取得"""
@@ -1005,6 +1613,344 @@ TASK: Analyze this evidence objectively and professionally for legal documentati
         }
         return mime_types.get(ext, 'image/jpeg')
 
+    # ================================
+    # バッチ分析モード（オフライン一括分析）
+    # ================================
+    
+    def build_batch_request(self,
+                            evidence_id: str,
+                            file_path: str,
+                            file_type: str,
+                            gdrive_file_info: Dict,
+                            case_info: Dict,
+                            provider: str = 'openai',
+                            artifacts: Optional[EvidenceArtifacts] = None) -> Dict:
+        """
+        バッチAPI用のリクエストを構築（ステップ1）
+        
+        Args:
+            evidence_id: 証拠ID（バッチのcustom_idとして使用）
+            file_path: ファイルパス
+            file_type: ファイルタイプ
+            gdrive_file_info: Google Driveファイル情報
+            case_info: 事件情報
+            provider: 'openai' | 'anthropic' | 'local'
+            artifacts: 抽出済みのメタデータ・ファイル処理結果
+        
+        Returns:
+            {"request": JSONLの1行分, "context": 結果取り込み時に使うメタデータ等}
+        """
+        if artifacts is None:
+            artifacts = EvidenceArtifacts(file_path, file_type, gdrive_file_info)
+        
+        metadata = artifacts.get_metadata(self.metadata_extractor)
+        file_content = artifacts.get_file_content(self.file_processor)
+        
+        prompt = self._build_complete_prompt(
+            evidence_id=evidence_id,
+            metadata=metadata,
+            file_content=file_content,
+            case_info=case_info
+        )
+        
+        # Vision対象は画像を添付、それ以外（または画像化失敗時）はテキストベース
+        image_paths = []
+        if file_type == 'image':
+            image_paths = [file_content.get('processed_file_path', file_path)]
+        elif file_type in ['pdf', 'document']:
+            # バッチは1証拠1リクエストのため、先頭のページグループのみ送信
+            pdf_path = self._convert_to_pdf(file_path)
+            if pdf_path:
+                page_count, page_groups = self._select_vision_pages(pdf_path, file_content)
+                rendered = self._render_pages(pdf_path, page_groups[0])
+                pages = [n for n in page_groups[0] if rendered.get(n)]
+                image_paths = [rendered[n] for n in pages]
+                if image_paths and page_count > 1:
+                    prompt = self._add_page_note(prompt, pages, page_count)
+        
+        if image_paths:
+            image_provider = 'anthropic' if provider == 'anthropic' else 'openai'
+            images = []
+            for image_path in image_paths:
+                payload = self.image_preprocessor.get_payload(image_path, image_provider)
+                images.append((payload.mime_type, payload.base64))
+            method = "vision_api"
+        else:
+            content_text = self.prompt_compactor.build_content_text(file_content)
+            prompt = self._build_text_prompt(prompt, content_text)
+            images = None
+            method = "text_analysis"
+        
+        # 対話モードと同じ静的プレフィックス構成（バッチでもプロンプトキャッシュが効く）
+        if provider == 'anthropic':
+            anthropic_request = self._build_anthropic_request(prompt, images=images)
+            request = {
+                "custom_id": evidence_id,
+                "params": {
+                    "model": ANTHROPIC_MODEL,
+                    "max_tokens": ANTHROPIC_MAX_TOKENS,
+                    "temperature": ANTHROPIC_TEMPERATURE,
+                    "system": anthropic_request['system'],
+                    "messages": anthropic_request['messages'],
+                    **self._structured_output_params('anthropic', prompt)
+                }
+            }
+        else:
+            request = {
+                "custom_id": evidence_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": OPENAI_MODEL,
+                    "messages": self._build_openai_messages(prompt, images=images),
+                    "max_tokens": OPENAI_MAX_TOKENS,
+                    "temperature": OPENAI_TEMPERATURE,
+                    **self._structured_output_params('openai', prompt)
+                }
+            }
+        
+        return {
+            "request": request,
+            "context": {
+                "evidence_id": evidence_id,
+                "method": method,
+                "metadata": metadata,
+                "file_content": file_content
+            }
+        }
+    
+    def write_batch_file(self, batch_entries: List[Dict], provider: str = 'openai', job_dir: str = None) -> Dict:
+        """
+        バッチリクエストをJSONLファイルに書き出す（ステップ2）
+        
+        プロバイダーの上限（BATCH_MAX_REQUESTS 件・BATCH_MAX_BYTES）を超えないよう、
+        複数のファイル（シャード）に分割します。各シャードは個別のバッチとして提出されます。
+        
+        Args:
+            batch_entries: build_batch_request の戻り値のリスト
+            provider: 'openai' | 'anthropic' | 'local'
+            job_dir: 出力先ディレクトリ（未指定時は BATCH_WORK_DIR 配下に作成）
+        
+        Returns:
+            ジョブ情報（job.jsonとしても保存）
+        """
+        job_dir = job_dir or os.path.join(BATCH_WORK_DIR, f"{provider}_{get_filename_timestamp()}")
+        os.makedirs(job_dir, exist_ok=True)
+        
+        max_requests = BATCH_MAX_REQUESTS.get(provider, BATCH_MAX_REQUESTS['openai'])
+        max_bytes = BATCH_MAX_BYTES.get(provider, BATCH_MAX_BYTES['openai'])
+        
+        shards = []
+        shard_file = None
+        skipped = []
+        try:
+            for entry in batch_entries:
+                line = (json.dumps(entry['request'], ensure_ascii=False) + '\n').encode('utf-8')
+                if len(line) > max_bytes:
+                    # 1件で上限を超えるリクエストはどのバッチにも入れられない
+                    logger.error(f"❌ バッチ上限を超えるリクエスト（{len(line) / 1024 / 1024:.1f}MB）: {entry['context']['evidence_id']}")
+                    skipped.append(entry['context']['evidence_id'])
+                    continue
+                
+                shard = shards[-1] if shards else None
+                if shard is None or shard['request_count'] >= max_requests or shard['size_bytes'] + len(line) > max_bytes:
+                    if shard_file:
+                        shard_file.close()
+                    input_path = os.path.join(job_dir, f"requests_{len(shards) + 1:03d}.jsonl")
+                    shard = {
+                        "input_path": input_path,
+                        "request_count": 0,
+                        "size_bytes": 0,
+                        "batch_id": None,
+                        "status": "created"
+                    }
+                    shards.append(shard)
+                    shard_file = open(input_path, 'wb')
+                
+                shard_file.write(line)
+                shard['request_count'] += 1
+                shard['size_bytes'] += len(line)
+        finally:
+            if shard_file:
+                shard_file.close()
+        
+        # 結果取り込み時に必要なメタデータ・ファイル処理結果
+        context_path = os.path.join(job_dir, "context.json")
+        with open(context_path, 'w', encoding='utf-8') as f:
+            json.dump({e['context']['evidence_id']: e['context'] for e in batch_entries}, f, ensure_ascii=False)
+        
+        job = {
+            "provider": provider,
+            "job_dir": job_dir,
+            "shards": shards,
+            "context_path": context_path,
+            "request_count": sum(shard['request_count'] for shard in shards),
+            "skipped_evidence_ids": skipped,
+            "batch_ids": [],
+            "status": "created",
+            "created_at": get_timestamp()
+        }
+        self._save_batch_job(job)
+        
+        logger.info(f"✅ バッチファイル作成: {job_dir} ({job['request_count']}件、{len(shards)}ファイル)")
+        return job
+    
+    def _job_shards(self, job: Dict) -> List[Dict]:
+        """ジョブのシャード（分割導入前の job.json は1シャードとして扱う）"""
+        if 'shards' not in job:
+            job['shards'] = [{
+                "input_path": job.get('input_path'),
+                "request_count": job.get('request_count', 0),
+                "batch_id": job.get('batch_id'),
+                "status": job.get('status', 'created')
+            }]
+            job['batch_ids'] = [job['batch_id']] if job.get('batch_id') else []
+        return job['shards']
+    
+    def submit_batch(self, job: Dict) -> Dict:
+        """
+        バッチを提出（ステップ3）
+        
+        シャードごとにバッチを作成し、すべてのbatch_idをジョブ情報に記録します。
+        提出済みのシャードは再提出しません（途中で失敗した場合は再実行で残りを提出）。
+        
+        Args:
+            job: write_batch_file の戻り値
+        
+        Returns:
+            batch_ids を追加したジョブ情報
+        """
+        batch_provider = self._get_batch_provider(job['provider'], job['job_dir'])
+        shards = self._job_shards(job)
+        for index, shard in enumerate(shards, 1):
+            if shard['batch_id']:
+                continue
+            shard['batch_id'] = batch_provider.submit(shard['input_path'])
+            shard['status'] = 'submitted'
+            job['batch_ids'] = [s['batch_id'] for s in shards if s['batch_id']]
+            self._save_batch_job(job)
+            logger.info(f"   バッチ {index}/{len(shards)}: {shard['batch_id']} ({shard['request_count']}件)")
+        
+        job['status'] = 'submitted'
+        job['submitted_at'] = get_timestamp()
+        self._save_batch_job(job)
+        return job
+    
+    def poll_batch(self, job: Dict, poll_interval: int = None, timeout: int = None) -> str:
+        """
+        バッチの完了を待機（全シャード）
+        
+        Args:
+            job: submit_batch の戻り値
+            poll_interval: 確認間隔（秒）
+            timeout: 最大待機時間（秒、未指定時は無制限）
+        
+        Returns:
+            'completed'（一部のシャードが失敗した場合も含む） | 'failed'（全シャード失敗） |
+            'in_progress'（タイムアウト時）
+        """
+        batch_provider = self._get_batch_provider(job['provider'], job['job_dir'])
+        poll_interval = poll_interval or BATCH_POLL_INTERVAL_SECONDS
+        shards = self._job_shards(job)
+        start_time = time.time()
+        
+        while True:
+            pending = [s for s in shards if s['status'] not in ('completed', 'failed')]
+            for shard in pending:
+                shard['status'] = batch_provider.get_status(shard['batch_id'])
+            in_progress = [s['batch_id'] for s in shards if s['status'] == 'in_progress']
+            if not in_progress:
+                break
+            if timeout is not None and time.time() - start_time >= timeout:
+                break
+            logger.info(f"⏳ バッチ処理中: {', '.join(in_progress)}（{poll_interval}秒後に再確認）")
+            time.sleep(poll_interval)
+        
+        failed = [s['batch_id'] for s in shards if s['status'] == 'failed']
+        if any(s['status'] == 'in_progress' for s in shards):
+            status = 'in_progress'
+        elif len(failed) == len(shards):
+            status = 'failed'
+        else:
+            status = 'completed'
+            if failed:
+                logger.warning(f"⚠️ 失敗したバッチ: {', '.join(failed)}（該当する証拠は取り込まれません）")
+        
+        job['status'] = status
+        self._save_batch_job(job)
+        return status
+    
+    def collect_batch_results(self, job: Dict) -> Dict[str, Dict]:
+        """
+        完了したバッチの結果を構造化（ステップ4）
+        
+        Args:
+            job: 完了済みのジョブ情報
+        
+        Returns:
+            {evidence_id: analyze_evidence_complete と同じ形式の分析結果}
+            失敗した証拠は含まれません
+        """
+        batch_provider = self._get_batch_provider(job['provider'], job['job_dir'])
+        raw_results = {}
+        result_batch_ids = {}
+        for shard in self._job_shards(job):
+            if shard['status'] != 'completed':
+                continue
+            for custom_id, raw in batch_provider.fetch_results(shard['batch_id']).items():
+                raw_results[custom_id] = raw
+                result_batch_ids[custom_id] = shard['batch_id']
+        
+        with open(job['context_path'], 'r', encoding='utf-8') as f:
+            contexts = json.load(f)
+        
+        structured_results = {}
+        for evidence_id, context in contexts.items():
+            raw = raw_results.get(evidence_id)
+            if not raw or raw.get('error') or not raw.get('text'):
+                logger.warning(f"⚠️ バッチ結果なし: {evidence_id} - {raw.get('error') if raw else '応答なし'}")
+                continue
+            
+            ai_analysis = self._parse_ai_response(raw['text'])
+            if isinstance(ai_analysis, dict):
+                ai_analysis['_analysis_method'] = {
+                    "attempted_method": "batch_api",
+                    "successful_method": context['method'],
+                    "vision_api_used": context['method'] == "vision_api",
+                    "vision_api_success": context['method'] == "vision_api",
+                    "batch_provider": job['provider'],
+                    "batch_id": result_batch_ids[evidence_id]
+                }
+            
+            structured_result = self._structure_complete_result(
+                evidence_id=evidence_id,
+                metadata=context['metadata'],
+                file_content=context['file_content'],
+                ai_analysis=ai_analysis
+            )
+            structured_result['quality_assessment'] = self._assess_analysis_quality(structured_result)
+            structured_results[evidence_id] = structured_result
+        
+        logger.info(f"✅ バッチ結果取り込み: {len(structured_results)}/{len(contexts)}件")
+        return structured_results
+    
+    def _get_batch_provider(self, provider: str, job_dir: str):
+        """バッチプロバイダーを取得"""
+        if provider == 'openai':
+            return OpenAIBatchProvider(self.client)
+        if provider == 'anthropic':
+            if not self.anthropic_client:
+                raise ValueError("Anthropicクライアントが初期化されていません（ANTHROPIC_API_KEYを確認してください）")
+            return AnthropicBatchProvider(self.anthropic_client)
+        if provider == 'local':
+            return LocalBatchProvider(os.path.join(job_dir, "local_provider"))
+        raise ValueError(f"未対応のバッチプロバイダー: {provider}")
+    
+    def _save_batch_job(self, job: Dict):
+        """ジョブ情報をjob.jsonに保存"""
+        with open(os.path.join(job['job_dir'], "job.json"), 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False, indent=2)
+    
     def extract_date_from_evidence(self, 
                                    evidence_id: str,
                                    file_path: str,
@@ -1013,6 +1959,10 @@ TASK: Analyze this evidence objectively and professionally for legal documentati
         """
         証拠から日付情報を抽出（軽量版AI分析）
         
+        EXIF・PDF/Word作成日時・ファイル名・本文の日付候補をローカルで抽出し、
+        候補が一致して十分な信頼度があればAIを呼ばずに返します。
+        候補が食い違う・見つからない場合のみAI分析を行います。
+        
         Args:
             evidence_id: 証拠ID（例: tmp_001）
             file_path: ファイルパス
@@ -1024,19 +1974,47 @@ TASK: Analyze this evidence objectively and professionally for legal documentati
                 "evidence_id": str,
                 "extracted_dates": [{"date": "YYYY-MM-DD", "confidence": float, "context": str}],
                 "primary_date": "YYYY-MM-DD" or None,
-                "date_source": "content" | "filename" | "metadata" | "unknown"
+                "date_source": "content" | "filename" | "metadata" | "unknown",
+                "extraction_method": "local" | "ai"
             }
         """
         logger.info(f"📅 日付抽出開始: {evidence_id} - {original_filename}")
         
+        # ローカル抽出（AI呼び出し不要で確定できる場合はここで終了）
+        local_result = None
+        if ENABLE_LOCAL_DATE_EXTRACTION:
+            local_result = self.local_date_extractor.extract(file_path, file_type, original_filename)
+            if local_result['decisive']:
+                logger.info(
+                    f"⚡ ローカル抽出で確定: {local_result['primary_date']}"
+                    f"（{local_result['extracted_dates'][0]['context']}）"
+                )
+                return {
+                    "evidence_id": evidence_id,
+                    "extracted_dates": local_result['extracted_dates'],
+                    "primary_date": local_result['primary_date'],
+                    "date_source": local_result['date_source'],
+                    "extraction_method": "local"
+                }
+            if local_result['extracted_dates']:
+                logger.info(f"   ローカル候補が食い違うためAIで判定: "
+                            f"{', '.join(d['date'] for d in local_result['extracted_dates'][:5])}")
+        
         try:
+            # ローカル抽出の候補（AIの判断材料として提示）
+            local_hint = ""
+            if local_result and local_result['extracted_dates']:
+                local_hint = "\n【ローカル抽出の候補（参考）】\n" + "\n".join(
+                    f"- {d['date']}（{d['context']}）" for d in local_result['extracted_dates'][:10]
+                ) + "\n"
+            
             # 日付抽出用プロンプト
             date_prompt = f"""
 以下の証拠から日付情報を抽出してください。
 
 証拠ID: {evidence_id}
 ファイル名: {original_filename}
-
+{local_hint}
 【抽出指示】
 1. 証拠内容から日付を抽出
 2. ファイル名から日付を抽出
@@ -1065,13 +2043,14 @@ TASK: Analyze this evidence objectively and professionally for legal documentati
             
             # ファイルタイプに応じた分析
             if file_type in ['image', 'pdf', 'document']:
-                # Vision API使用
-                result = self._analyze_with_vision(file_path, date_prompt, file_type)
+                # Vision API使用（日付は冒頭に記載されることが多いため1ページ目のみ送信）
+                result = self._analyze_with_vision(file_path, date_prompt, file_type, first_page_only=True)
             else:
                 # テキストベース分析
                 result = self._analyze_with_text(date_prompt, {})
             
             logger.info(f"✅ 日付抽出完了: {evidence_id}")
+            result['extraction_method'] = 'ai'
             
             # 主要日付をログ出力
             primary_date = result.get('primary_date')
@@ -1084,6 +2063,16 @@ TASK: Analyze this evidence objectively and professionally for legal documentati
             
         except Exception as e:
             logger.error(f"❌ 日付抽出失敗: {evidence_id} - {e}")
+            # AI分析に失敗した場合はローカル抽出の最有力候補を使用
+            if local_result and local_result['primary_date']:
+                return {
+                    "evidence_id": evidence_id,
+                    "extracted_dates": local_result['extracted_dates'],
+                    "primary_date": local_result['primary_date'],
+                    "date_source": local_result['date_source'],
+                    "extraction_method": "local",
+                    "extraction_error": str(e)
+                }
             # エラー時はデフォルト値を返す
             return {
                 "evidence_id": evidence_id,
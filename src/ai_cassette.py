@@ -0,0 +1,518 @@
+"""
+AI呼び出しの記録・再生（カセット）
+- record: OpenAI / Anthropic への実リクエストの応答を AI_CASSETTE_DIR に保存
+- replay: 保存済みの応答を返す（APIキー・ネットワーク不要）
+- リクエストの指紋（モデル・メッセージ・パラメータのハッシュ）で応答を照合
+- 再生時は記録時の応答時間（倍率・固定値を設定可能）を再現し、エラーを確率的に注入
+
+ネットワークのないビルド環境でPhase 1パイプライン全体のスループット計測・回帰確認を行うためのものです。
+ストリーミング・一括受信のどちらで記録した応答も、どちらの呼び出し方でも再生できます。
+"""
+
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import logging
+import threading
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from global_config import *
+
+logger = logging.getLogger(__name__)
+
+# 指紋に含めないパラメータ（受信方法・接続設定のみで応答内容に影響しない）
+IGNORED_PARAMS = {'stream', 'stream_options', 'timeout', 'extra_headers'}
+
+# 指紋から除外する値（ファイルの日時・処理時刻・一時ディレクトリ等、マシンや再ダウンロードで変わる値）
+VOLATILE_FIELD_PATTERN = re.compile(
+    r'"(created_time|modified_time|accessed_time|timestamp|extraction_timestamp)":\s*"[^"]*"'
+)
+VOLATILE_PATH_PATTERN = re.compile(re.escape(LOCAL_TEMP_DIR) + r'[^\s"\'\]\)]*')
+
+# 再生時のストリーミング1チャンクの文字数
+REPLAY_CHUNK_CHARS = 200
+
+
+class CassetteMissError(RuntimeError):
+    """再生モードで該当するリクエストが記録されていない"""
+
+
+class InjectedProviderError(RuntimeError):
+    """再生モードで注入した擬似エラー（過負荷として扱われる）"""
+
+
+def _strip_volatile(value):
+    """プロンプト中のマシン・実行ごとに変わる値を除去"""
+    if isinstance(value, str):
+        value = VOLATILE_FIELD_PATTERN.sub(r'"\1": ""', value)
+        return VOLATILE_PATH_PATTERN.sub('<temp>', value)
+    if isinstance(value, dict):
+        return {key: _strip_volatile(v) for key, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_strip_volatile(v) for v in value]
+    return value
+
+
+def request_fingerprint(provider: str, params: Dict) -> str:
+    """リクエストの指紋（同じ内容のリクエストは同じ値、ファイルの日時等の揮発的な値は無視）"""
+    relevant = {key: _strip_volatile(value) for key, value in params.items() if key not in IGNORED_PARAMS}
+    canonical = json.dumps([provider, relevant], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _to_dict(obj) -> Optional[Dict]:
+    """SDKのレスポンスオブジェクト（usage等）を辞書に変換"""
+    if obj is None or isinstance(obj, dict):
+        return obj
+    if hasattr(obj, 'model_dump'):
+        return obj.model_dump()
+    return {key: _to_dict(value) if hasattr(value, '__dict__') else value
+            for key, value in vars(obj).items() if not key.startswith('_')}
+
+
+def _to_namespace(value):
+    """辞書をSDKのレスポンスと同様に属性アクセスできる形に変換"""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: _to_namespace(v) for key, v in value.items()})
+    if isinstance(value, list):
+        return [_to_namespace(v) for v in value]
+    return value
+
+
+def _split_text(text: str) -> List[str]:
+    return [text[i:i + REPLAY_CHUNK_CHARS] for i in range(0, len(text), REPLAY_CHUNK_CHARS)] or ['']
+
+
+class AICassette:
+    """カセット（記録済み応答）の保存・読み込みと再生設定"""
+
+    def __init__(self, mode: str = None, directory: str = None):
+        """初期化
+
+        Args:
+            mode: 'off' / 'record' / 'replay'（未指定時は AI_CASSETTE_MODE）
+            directory: 保存先（未指定時は AI_CASSETTE_DIR）
+        """
+        self.configure(mode or AI_CASSETTE_MODE, directory or AI_CASSETTE_DIR)
+        self.latency_scale = AI_REPLAY_LATENCY_SCALE
+        self.fixed_latency = AI_REPLAY_FIXED_LATENCY_SECONDS
+        self.error_rate = AI_REPLAY_ERROR_RATE
+        self._random = random.Random(AI_REPLAY_SEED)
+        self._lock = threading.Lock()
+        self.stats = {"recorded": 0, "replayed": 0, "missed": 0, "injected_errors": 0}
+
+    def configure(self, mode: str, directory: Optional[str] = None):
+        """モードを切り替え（クライアント取得前に呼ぶこと）"""
+        if mode not in ('off', 'record', 'replay'):
+            raise ValueError(f"不明なカセットモード: {mode}")
+        self.mode = mode
+        if directory:
+            self.directory = directory
+        if mode != 'off':
+            logger.info(f"📼 AI呼び出しの{'記録' if mode == 'record' else '再生'}モード: {self.directory}")
+
+    # ================================
+    # クライアント
+    # ================================
+
+    def wrap(self, provider: str, client):
+        """記録モードなら実クライアントを記録用に包む（それ以外はそのまま返す）"""
+        if self.mode != 'record':
+            return client
+        if provider == 'anthropic':
+            return _RecordingAnthropicClient(client, self)
+        return _RecordingOpenAIClient(client, self)
+
+    def replay_client(self, provider: str):
+        """再生用クライアント（APIに接続しない）"""
+        if provider == 'anthropic':
+            return _ReplayAnthropicClient(self)
+        return _ReplayOpenAIClient(self)
+
+    # ================================
+    # 保存・読み込み
+    # ================================
+
+    def _path(self, provider: str, fingerprint: str) -> str:
+        return os.path.join(self.directory, provider, f"{fingerprint}.json")
+
+    def save(self, provider: str, params: Dict, response: Dict,
+             elapsed_seconds: float, first_token_seconds: Optional[float] = None):
+        """応答を記録"""
+        fingerprint = request_fingerprint(provider, params)
+        entry = {
+            "provider": provider,
+            "model": params.get('model'),
+            "fingerprint": fingerprint,
+            "recorded_at": get_timestamp(),
+            "elapsed_seconds": round(elapsed_seconds, 3),
+            "first_token_seconds": round(first_token_seconds, 3) if first_token_seconds is not None else None,
+            "response": response
+        }
+        path = self._path(provider, fingerprint)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False, indent=2, default=str)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"⚠️ カセット保存失敗: {e}")
+            return
+        with self._lock:
+            self.stats['recorded'] += 1
+        logger.debug(f"📼 記録: {provider} {params.get('model')} ({fingerprint[:12]})")
+
+    def load(self, provider: str, params: Dict) -> Dict:
+        """記録済みの応答を取得し、再生時の遅延・エラー注入を適用
+
+        Raises:
+            CassetteMissError: 該当するリクエストが記録されていない
+            InjectedProviderError: エラー注入（AI_REPLAY_ERROR_RATE）
+        """
+        fingerprint = request_fingerprint(provider, params)
+        try:
+            with open(self._path(provider, fingerprint), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self.stats['missed'] += 1
+            raise CassetteMissError(
+                f"カセット未記録のリクエスト: {provider} {params.get('model')} ({fingerprint[:12]})"
+            )
+
+        with self._lock:
+            inject_error = self._random.random() < self.error_rate
+            self.stats['injected_errors' if inject_error else 'replayed'] += 1
+
+        if inject_error:
+            time.sleep(self.latency(entry) * self._random.random())
+            raise InjectedProviderError(f"overloaded_error: 再生モードの注入エラー（{provider} {params.get('model')}）")
+        return entry
+
+    def latency(self, entry: Dict) -> float:
+        """再生時の応答時間"""
+        if self.fixed_latency is not None:
+            return self.fixed_latency
+        return (entry.get('elapsed_seconds') or 0.0) * self.latency_scale
+
+    def first_token_latency(self, entry: Dict) -> float:
+        """再生時の最初の応答までの時間"""
+        total = self.latency(entry)
+        recorded_total = entry.get('elapsed_seconds') or 0.0
+        first = entry.get('first_token_seconds')
+        if first is None or recorded_total <= 0:
+            return total
+        return total * min(1.0, first / recorded_total)
+
+
+# ================================
+# 記録用クライアント
+# ================================
+
+def _openai_response_dict(text: str, refusal: Optional[str], finish_reason: Optional[str], usage) -> Dict:
+    return {"text": text, "refusal": refusal, "finish_reason": finish_reason, "usage": _to_dict(usage)}
+
+
+def _anthropic_response_dict(message) -> Dict:
+    content = []
+    for block in message.content:
+        if getattr(block, 'type', '') == 'tool_use':
+            content.append({"type": "tool_use", "id": block.id, "name": block.name, "input": block.input})
+        elif getattr(block, 'type', '') == 'text':
+            content.append({"type": "text", "text": block.text})
+    return {"content": content, "stop_reason": message.stop_reason, "usage": _to_dict(message.usage)}
+
+
+class _RecordingOpenAIClient:
+    """chat.completions.create の応答を記録（その他の属性は実クライアントへ委譲）"""
+
+    def __init__(self, client, cassette: AICassette):
+        self._client = client
+        self._cassette = cassette
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def _create(self, **params):
+        start_time = time.time()
+        response = self._client.chat.completions.create(**params)
+        if params.get('stream'):
+            return _RecordingOpenAIStream(response, self._cassette, params, start_time)
+
+        choice = response.choices[0]
+        self._cassette.save('openai', params, _openai_response_dict(
+            choice.message.content or '', getattr(choice.message, 'refusal', None),
+            choice.finish_reason, getattr(response, 'usage', None)
+        ), time.time() - start_time)
+        return response
+
+
+class _RecordingOpenAIStream:
+    """ストリーミング応答を受け渡しながら記録
+
+    途中で受信を打ち切られた場合（冒頭の拒否検知等）も残りを受信してから保存し、
+    再生時に同じ打ち切り判定が再現されるようにします。
+    """
+
+    def __init__(self, stream, cassette: AICassette, params: Dict, start_time: float):
+        self._stream = stream
+        self._cassette = cassette
+        self._params = params
+        self._start_time = start_time
+        self._first_token_seconds: Optional[float] = None
+        self._parts: List[str] = []
+        self._refusal_parts: List[str] = []
+        self._finish_reason = None
+        self._usage = None
+        self._saved = False
+
+    def _collect(self, chunk):
+        if getattr(chunk, 'usage', None):
+            self._usage = chunk.usage
+        if not chunk.choices:
+            return
+        choice = chunk.choices[0]
+        if self._first_token_seconds is None:
+            self._first_token_seconds = time.time() - self._start_time
+        if choice.finish_reason:
+            self._finish_reason = choice.finish_reason
+        self._parts.append(choice.delta.content or '')
+        self._refusal_parts.append(getattr(choice.delta, 'refusal', None) or '')
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._collect(chunk)
+            yield chunk
+        self._save()
+
+    def _save(self):
+        if self._saved:
+            return
+        self._saved = True
+        refusal = ''.join(self._refusal_parts) or None
+        self._cassette.save('openai', self._params, _openai_response_dict(
+            ''.join(self._parts), refusal, self._finish_reason, self._usage
+        ), time.time() - self._start_time, self._first_token_seconds)
+
+    def close(self):
+        if not self._saved:
+            try:
+                for chunk in self._stream:
+                    self._collect(chunk)
+                self._save()
+            except Exception as e:
+                logger.debug(f"カセット記録のための残り受信に失敗（記録しません）: {e}")
+        self._stream.close()
+
+
+class _RecordingAnthropicClient:
+    """messages.create / messages.stream の応答を記録（その他の属性は実クライアントへ委譲）"""
+
+    def __init__(self, client, cassette: AICassette):
+        self._client = client
+        self.messages = _RecordingAnthropicMessages(client.messages, cassette)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class _RecordingAnthropicMessages:
+
+    def __init__(self, messages, cassette: AICassette):
+        self._messages = messages
+        self._cassette = cassette
+
+    def __getattr__(self, name):
+        # messages.batches 等
+        return getattr(self._messages, name)
+
+    def create(self, **params):
+        start_time = time.time()
+        message = self._messages.create(**params)
+        self._cassette.save('anthropic', params, _anthropic_response_dict(message), time.time() - start_time)
+        return message
+
+    def stream(self, **params):
+        return _RecordingAnthropicStream(self._messages.stream(**params), self._cassette, params)
+
+
+class _RecordingAnthropicStream:
+    """messages.stream のコンテキストマネージャーを包み、終了時に最終メッセージを記録"""
+
+    def __init__(self, manager, cassette: AICassette, params: Dict):
+        self._manager = manager
+        self._cassette = cassette
+        self._params = params
+        self._stream = None
+        self._start_time = None
+        self._first_token_seconds: Optional[float] = None
+
+    def __enter__(self):
+        self._start_time = time.time()
+        self._stream = self._manager.__enter__()
+        return self
+
+    def __iter__(self):
+        for event in self._stream:
+            if self._first_token_seconds is None and event.type == 'content_block_delta':
+                self._first_token_seconds = time.time() - self._start_time
+            yield event
+
+    def get_final_message(self):
+        return self._stream.get_final_message()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            try:
+                # 途中で打ち切られた場合も残りを受信して記録
+                message = self._stream.get_final_message()
+                self._cassette.save('anthropic', self._params, _anthropic_response_dict(message),
+                                    time.time() - self._start_time, self._first_token_seconds)
+            except Exception as e:
+                logger.debug(f"カセット記録のための残り受信に失敗（記録しません）: {e}")
+        return self._manager.__exit__(exc_type, exc, tb)
+
+
+# ================================
+# 再生用クライアント
+# ================================
+
+class _ReplayOpenAIClient:
+    """記録済みの応答を返すOpenAIクライアント（chat.completions.create のみ）"""
+
+    def __init__(self, cassette: AICassette):
+        self._cassette = cassette
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **params):
+        entry = self._cassette.load('openai', params)
+        response = entry['response']
+        if params.get('stream'):
+            return _ReplayOpenAIStream(self._cassette, entry)
+
+        time.sleep(self._cassette.latency(entry))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(
+                message=SimpleNamespace(content=response.get('text'), refusal=response.get('refusal')),
+                finish_reason=response.get('finish_reason')
+            )],
+            usage=_to_namespace(response.get('usage'))
+        )
+
+    def close(self):
+        pass
+
+
+class _ReplayOpenAIStream:
+    """記録済みの応答をチャンクに分けて返す（記録時の応答時間を再現）"""
+
+    def __init__(self, cassette: AICassette, entry: Dict):
+        self._cassette = cassette
+        self._entry = entry
+        self._closed = False
+
+    def _chunk(self, content=None, refusal=None, finish_reason=None, usage=None, empty=False):
+        choices = [] if empty else [SimpleNamespace(
+            delta=SimpleNamespace(content=content, refusal=refusal),
+            finish_reason=finish_reason
+        )]
+        return SimpleNamespace(choices=choices, usage=usage)
+
+    def __iter__(self):
+        response = self._entry['response']
+        pieces = [('refusal', response['refusal'])] if response.get('refusal') else \
+            [('content', piece) for piece in _split_text(response.get('text') or '')]
+
+        time.sleep(self._cassette.first_token_latency(self._entry))
+        remaining = max(0.0, self._cassette.latency(self._entry) - self._cassette.first_token_latency(self._entry))
+        interval = remaining / len(pieces)
+
+        for index, (kind, piece) in enumerate(pieces):
+            if self._closed:
+                return
+            if index > 0:
+                time.sleep(interval)
+            yield self._chunk(**{kind: piece})
+
+        yield self._chunk(finish_reason=response.get('finish_reason'))
+        yield self._chunk(usage=_to_namespace(response.get('usage')), empty=True)
+
+    def close(self):
+        self._closed = True
+
+
+def _anthropic_message(response: Dict):
+    content = []
+    for block in response.get('content', []):
+        if block.get('type') == 'tool_use':
+            # tool useの入力はSDKと同様に辞書のまま
+            content.append(SimpleNamespace(type='tool_use', id=block.get('id'), name=block.get('name'),
+                                           input=block.get('input')))
+        else:
+            content.append(SimpleNamespace(type='text', text=block.get('text', '')))
+    return SimpleNamespace(content=content, stop_reason=response.get('stop_reason'),
+                           usage=_to_namespace(response.get('usage')))
+
+
+class _ReplayAnthropicClient:
+    """記録済みの応答を返すAnthropicクライアント（messages.create / messages.stream のみ）"""
+
+    def __init__(self, cassette: AICassette):
+        self._cassette = cassette
+        self.messages = SimpleNamespace(create=self._create, stream=self._stream)
+
+    def _create(self, **params):
+        entry = self._cassette.load('anthropic', params)
+        time.sleep(self._cassette.latency(entry))
+        return _anthropic_message(entry['response'])
+
+    def _stream(self, **params):
+        return _ReplayAnthropicStream(self._cassette, self._cassette.load('anthropic', params))
+
+    def close(self):
+        pass
+
+
+class _ReplayAnthropicStream:
+    """記録済みの応答をストリーミングイベントとして返す"""
+
+    def __init__(self, cassette: AICassette, entry: Dict):
+        self._cassette = cassette
+        self._entry = entry
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __iter__(self):
+        pieces = []
+        for block in self._entry['response'].get('content', []):
+            if block.get('type') == 'tool_use':
+                text = json.dumps(block.get('input'), ensure_ascii=False)
+                pieces += [SimpleNamespace(type='input_json_delta', partial_json=p) for p in _split_text(text)]
+            else:
+                pieces += [SimpleNamespace(type='text_delta', text=p) for p in _split_text(block.get('text', ''))]
+
+        first = self._cassette.first_token_latency(self._entry)
+        time.sleep(first)
+        interval = max(0.0, self._cassette.latency(self._entry) - first) / max(1, len(pieces))
+
+        for index, delta in enumerate(pieces):
+            if index > 0:
+                time.sleep(interval)
+            yield SimpleNamespace(type='content_block_delta', delta=delta)
+
+    def get_final_message(self):
+        return _anthropic_message(self._entry['response'])
+
+
+# プロセス全体で共有するカセット
+ai_cassette = AICassette()
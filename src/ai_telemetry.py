@@ -0,0 +1,320 @@
+"""
+AI呼び出しのテレメトリ（トークン・応答時間・推定コスト）
+- API呼び出しごとにプロバイダー・モデル・トークン・所要時間・リトライ回数・推定コストを記録
+- 証拠分析中の呼び出しは証拠レコード（ai_telemetry）に集計
+- 全呼び出しを事件ごとの台帳（LOCAL_CACHE_DIR/ai_ledger/<事件ID>.jsonl）に追記
+- 台帳の集計レポート（事件全体のコスト、ファイル形式・モデル別の所要時間等）
+"""
+
+import os
+import json
+import logging
+import functools
+import threading
+import contextvars
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from global_config import *
+
+logger = logging.getLogger(__name__)
+
+# 分析中の証拠ごとの記録先（ヘッジ・ページ並列のスレッドにも引き継ぐ）
+_current_session: contextvars.ContextVar = contextvars.ContextVar('ai_telemetry_session', default=None)
+
+
+def extract_usage(usage, provider: str) -> Dict:
+    """SDKのusageオブジェクトをトークン使用量の辞書に変換
+
+    OpenAIの input_tokens はキャッシュヒット分を含み、
+    Anthropicの input_tokens はキャッシュ読み込み・書き込み分を含みません。
+    """
+    if usage is None:
+        return {"provider": provider}
+
+    if provider == 'anthropic':
+        return {
+            "provider": provider,
+            "input_tokens": getattr(usage, 'input_tokens', 0) or 0,
+            "output_tokens": getattr(usage, 'output_tokens', 0) or 0,
+            "cache_creation_input_tokens": getattr(usage, 'cache_creation_input_tokens', 0) or 0,
+            "cached_tokens": getattr(usage, 'cache_read_input_tokens', 0) or 0
+        }
+
+    details = getattr(usage, 'prompt_tokens_details', None)
+    return {
+        "provider": provider,
+        "input_tokens": getattr(usage, 'prompt_tokens', 0) or 0,
+        "output_tokens": getattr(usage, 'completion_tokens', 0) or 0,
+        "cached_tokens": (getattr(details, 'cached_tokens', 0) or 0) if details else 0
+    }
+
+
+def estimate_cost(model: str, usage: Dict) -> Optional[float]:
+    """トークン使用量から推定コスト（USD）を計算（料金未登録のモデルはNone）"""
+    pricing = next(
+        (price for prefix, price in MODEL_PRICING_PER_MILLION.items() if model and model.startswith(prefix)),
+        None
+    )
+    if pricing is None:
+        return None
+
+    input_tokens = usage.get('input_tokens', 0)
+    cached_tokens = usage.get('cached_tokens', 0)
+    if usage.get('provider') != 'anthropic':
+        # OpenAIは入力トークンにキャッシュヒット分を含む
+        input_tokens = max(0, input_tokens - cached_tokens)
+
+    cost = (
+        input_tokens * pricing['input'] +
+        cached_tokens * pricing['cached_input'] +
+        usage.get('cache_creation_input_tokens', 0) * pricing.get('cache_write', pricing['input']) +
+        usage.get('output_tokens', 0) * pricing['output']
+    ) / 1_000_000
+    return round(cost, 6)
+
+
+class TelemetrySession:
+    """1件の証拠分析（または編集）中のAI呼び出しの記録先"""
+
+    def __init__(self, case_id: Optional[str], context: Dict):
+        self.case_id = case_id
+        self.context = context
+        self.calls: List[Dict] = []
+        self._lock = threading.Lock()
+        self._token = None
+
+    def add(self, call: Dict):
+        with self._lock:
+            self.calls.append(call)
+
+    def close(self):
+        """記録を終了"""
+        if self._token is not None:
+            _current_session.reset(self._token)
+            self._token = None
+
+    def __enter__(self) -> 'TelemetrySession':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class AITelemetry:
+    """AI呼び出しの記録・事件台帳・レポート"""
+
+    def __init__(self, ledger_dir: str = None, enabled: bool = None):
+        """初期化
+
+        Args:
+            ledger_dir: 事件台帳の保存先（未指定時は LOCAL_CACHE_DIR/ai_ledger）
+            enabled: 記録を有効にするか（未指定時は ENABLE_AI_TELEMETRY）
+        """
+        self.ledger_dir = ledger_dir or os.path.join(LOCAL_CACHE_DIR, "ai_ledger")
+        self.enabled = ENABLE_AI_TELEMETRY if enabled is None else enabled
+        self.default_case_id: Optional[str] = None
+        self._lock = threading.Lock()
+
+    # ================================
+    # 記録
+    # ================================
+
+    def set_case(self, case_id: Optional[str]):
+        """証拠分析以外（時系列生成等）の呼び出しを記録する事件を設定"""
+        self.default_case_id = case_id
+
+    def start_session(self, case_id: Optional[str] = None, **context) -> TelemetrySession:
+        """証拠1件分の記録を開始（close() または with文で終了）
+
+        Args:
+            case_id: 事件ID（未指定時は set_case の事件）
+            **context: 各呼び出しに付与する情報（evidence_id, file_type 等）
+        """
+        session = TelemetrySession(case_id or self.default_case_id, context)
+        session._token = _current_session.set(session)
+        return session
+
+    def record_call(self,
+                    component: str,
+                    provider: str,
+                    model: str,
+                    usage: Optional[Dict],
+                    elapsed_seconds: float,
+                    retry_count: int = 0,
+                    status: str = 'success',
+                    label: Optional[str] = None) -> Dict:
+        """1回のAPI呼び出しを記録
+
+        Args:
+            component: 呼び出し元（ai_analyzer / evidence_editor / timeline_builder）
+            provider: 'openai' または 'anthropic'
+            model: モデルID
+            usage: トークン使用量（extract_usage の形式）
+            elapsed_seconds: 所要時間（秒）
+            retry_count: リトライ回数（フォールバックモデルの試行順を含む）
+            status: success / refused / cancelled / error
+            label: 呼び出しの種類（GPT-4o Vision 等）
+
+        Returns:
+            記録した内容
+        """
+        usage = usage or {}
+        session = _current_session.get()
+        call = {
+            "timestamp": get_timestamp(),
+            "component": component,
+            "label": label,
+            "provider": provider,
+            "model": model,
+            "status": status,
+            "retry_count": retry_count,
+            "elapsed_seconds": round(elapsed_seconds, 3),
+            "input_tokens": usage.get('input_tokens', 0),
+            "output_tokens": usage.get('output_tokens', 0),
+            "cached_tokens": usage.get('cached_tokens', 0),
+            "cache_creation_input_tokens": usage.get('cache_creation_input_tokens', 0),
+            "estimated_cost_usd": estimate_cost(model, {**usage, "provider": provider})
+        }
+        if session is not None:
+            call.update(session.context)
+
+        if not self.enabled:
+            return call
+
+        if session is not None:
+            session.add(call)
+
+        case_id = session.case_id if session is not None else self.default_case_id
+        if case_id:
+            self._append_ledger(case_id, call)
+        return call
+
+    def summarize(self, calls: List[Dict]) -> Dict:
+        """呼び出し記録の合計"""
+        costs = [c['estimated_cost_usd'] for c in calls if c.get('estimated_cost_usd') is not None]
+        return {
+            "calls": len(calls),
+            "input_tokens": sum(c.get('input_tokens', 0) for c in calls),
+            "output_tokens": sum(c.get('output_tokens', 0) for c in calls),
+            "cached_tokens": sum(c.get('cached_tokens', 0) for c in calls),
+            "elapsed_seconds": round(sum(c.get('elapsed_seconds', 0) for c in calls), 3),
+            "estimated_cost_usd": round(sum(costs), 6),
+            "errors": sum(1 for c in calls if c.get('status') == 'error')
+        }
+
+    def to_record(self, session: TelemetrySession) -> Dict:
+        """証拠レコードに保存する形式"""
+        return {
+            "summary": self.summarize(session.calls),
+            "calls": session.calls
+        }
+
+    # ================================
+    # 事件台帳
+    # ================================
+
+    def _ledger_path(self, case_id: str) -> str:
+        safe_id = "".join(ch if ch.isalnum() or ch in '-_' else '_' for ch in str(case_id))
+        return os.path.join(self.ledger_dir, f"{safe_id}.jsonl")
+
+    def _append_ledger(self, case_id: str, call: Dict):
+        """台帳に1行追記"""
+        try:
+            with self._lock:
+                os.makedirs(self.ledger_dir, exist_ok=True)
+                with open(self._ledger_path(case_id), 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(call, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.debug(f"AI利用台帳の書き込み失敗: {e}")
+
+    def load_ledger(self, case_id: str) -> List[Dict]:
+        """事件台帳を読み込み"""
+        calls = []
+        try:
+            with open(self._ledger_path(case_id), 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        calls.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return calls
+
+    # ================================
+    # レポート
+    # ================================
+
+    def build_report(self, case_id: str) -> Dict:
+        """事件台帳を集計
+
+        Returns:
+            {"total": 合計, "by_component": ..., "by_model": ..., "by_file_type": ..., "by_evidence": ...}
+        """
+        calls = self.load_ledger(case_id)
+        report = {"case_id": case_id, "total": self.summarize(calls)}
+
+        for field, key in [('component', 'by_component'), ('model', 'by_model'),
+                           ('file_type', 'by_file_type'), ('evidence_id', 'by_evidence')]:
+            groups = defaultdict(list)
+            for call in calls:
+                groups[call.get(field) or '(なし)'].append(call)
+            report[key] = {
+                name: {**self.summarize(group),
+                       "avg_seconds": round(sum(c.get('elapsed_seconds', 0) for c in group) / len(group), 2)}
+                for name, group in groups.items()
+            }
+        return report
+
+    def print_report(self, case_id: str):
+        """事件台帳のレポートを表示"""
+        report = self.build_report(case_id)
+        total = report['total']
+
+        print("\n" + "="*70)
+        print(f"  AI利用状況レポート（事件ID: {case_id}）")
+        print("="*70)
+
+        if total['calls'] == 0:
+            print("\nAI呼び出しの記録がありません")
+            return
+
+        print(f"\n呼び出し回数: {total['calls']}回（エラー {total['errors']}回）")
+        print(f"トークン: 入力 {total['input_tokens']:,}（キャッシュ {total['cached_tokens']:,}）"
+              f" / 出力 {total['output_tokens']:,}")
+        print(f"所要時間合計: {total['elapsed_seconds']:.1f}秒")
+        print(f"推定コスト: ${total['estimated_cost_usd']:.4f}")
+
+        sections = [
+            ('by_component', '呼び出し元別'),
+            ('by_model', 'モデル別'),
+            ('by_file_type', 'ファイル形式別')
+        ]
+        for key, title in sections:
+            print(f"\n【{title}】")
+            rows = sorted(report[key].items(), key=lambda item: item[1]['estimated_cost_usd'], reverse=True)
+            for name, summary in rows:
+                print(f"  {name:<32} {summary['calls']:>5}回  平均 {summary['avg_seconds']:>6.1f}秒"
+                      f"  ${summary['estimated_cost_usd']:.4f}")
+
+        print("\n【コストの大きい証拠（上位10件）】")
+        evidence_rows = sorted(
+            ((name, s) for name, s in report['by_evidence'].items() if name != '(なし)'),
+            key=lambda item: item[1]['estimated_cost_usd'], reverse=True
+        )[:10]
+        for name, summary in evidence_rows:
+            print(f"  {name:<16} {summary['calls']:>3}回  {summary['elapsed_seconds']:>7.1f}秒"
+                  f"  ${summary['estimated_cost_usd']:.4f}")
+
+
+def bind_context(fn):
+    """現在の記録先を引き継いで実行する関数を返す（スレッドプールへの投入ごとに呼ぶこと）"""
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+# プロセス全体で共有するテレメトリ
+ai_telemetry = AITelemetry()
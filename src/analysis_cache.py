@@ -0,0 +1,213 @@
+"""
+AI分析結果の永続キャッシュ
+- 入力（画像/テキスト）のSHA-256・プロンプトハッシュ・モデル・温度をキーに保存
+- CACHE_EXPIRY_HOURS による有効期限
+- 最大件数を超えた場合は最終利用が古いものから削除（LRU）
+  （件数は保存ごとに概算で加算し、上限を超えた時だけディレクトリを走査）
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional, Union
+
+from global_config import *
+
+logger = logging.getLogger(__name__)
+
+# 上限を超えた場合に削除後の件数をこの割合まで下げる（削除のたびに走査しないように）
+EVICT_TARGET_RATIO = 0.9
+
+
+class AnalysisCache:
+    """AI分析結果のディスクキャッシュ"""
+
+    def __init__(self,
+                 cache_dir: str = None,
+                 expiry_hours: float = None,
+                 max_entries: int = None,
+                 enabled: bool = None):
+        """初期化
+
+        Args:
+            cache_dir: キャッシュディレクトリ（未指定時は LOCAL_CACHE_DIR/analysis）
+            expiry_hours: 有効期限（時間）
+            max_entries: 最大保持件数
+            enabled: キャッシュを有効にするか（未指定時は ENABLE_CACHING）
+        """
+        self.cache_dir = cache_dir or os.path.join(LOCAL_CACHE_DIR, "analysis")
+        self.expiry_seconds = (expiry_hours if expiry_hours is not None else CACHE_EXPIRY_HOURS) * 3600
+        self.max_entries = max_entries or ANALYSIS_CACHE_MAX_ENTRIES
+        self.enabled = ENABLE_CACHING if enabled is None else enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 件数の概算（初回の保存時に1回だけ走査して初期化）
+        self._estimated_entries: Optional[int] = None
+
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(content: Union[bytes, str],
+                 prompt: str,
+                 model: str,
+                 temperature: float) -> str:
+        """キャッシュキーを生成
+
+        Args:
+            content: 入力画像のバイト列、またはテキスト
+            prompt: 構築済みプロンプト全文（静的プレフィックス＋証拠ごとの安定したメタデータ・内容。
+                    ローカルファイルの日時等、再ダウンロードで変わる値は PromptCompactor が除外済み）
+            model: モデルID
+            temperature: 温度パラメータ
+
+        Returns:
+            キャッシュキー（SHA-256）
+        """
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+
+        content_hash = hashlib.sha256(content).hexdigest()
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        key_source = f"{content_hash}:{prompt_hash}:{model}:{temperature}"
+        return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        """キャッシュファイルのパス"""
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        """キャッシュから分析結果を取得
+
+        Returns:
+            分析結果（未登録・期限切れ時はNone）
+        """
+        if not self.enabled:
+            return None
+
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            self._count(hit=False)
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ キャッシュ読み込み失敗（破棄します）: {e}")
+            self._remove(path)
+            self._count(hit=False)
+            return None
+
+        if time.time() - entry.get('created_at', 0) > self.expiry_seconds:
+            logger.debug(f"キャッシュ期限切れ: {key[:16]}...")
+            self._remove(path)
+            self._count(hit=False)
+            return None
+
+        # LRU用に最終利用時刻を更新
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        self._count(hit=True)
+        logger.info(f"💾 分析キャッシュヒット: {key[:16]}...")
+        return entry.get('result')
+
+    def put(self, key: str, result: Dict, model: str = None):
+        """分析結果をキャッシュに保存
+
+        パース失敗の結果はキャッシュしません。
+        """
+        if not self.enabled or not isinstance(result, dict) or 'parse_error' in result:
+            return
+
+        entry = {
+            "created_at": time.time(),
+            "model": model,
+            "result": result
+        }
+
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            is_new = not os.path.exists(path)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"⚠️ キャッシュ保存失敗: {e}")
+            self._remove(tmp_path)
+            return
+
+        with self._lock:
+            if self._estimated_entries is None:
+                self._estimated_entries = len(self._list_entries())
+            elif is_new:
+                self._estimated_entries += 1
+            if self._estimated_entries > self.max_entries:
+                self._evict()
+
+    def _list_entries(self):
+        """キャッシュファイルのパス一覧"""
+        try:
+            return [
+                os.path.join(self.cache_dir, name)
+                for name in os.listdir(self.cache_dir)
+                if name.endswith('.json')
+            ]
+        except OSError:
+            return []
+
+    def _evict(self):
+        """最終利用が古い順に削除し、件数を上限の EVICT_TARGET_RATIO まで下げる
+
+        概算は期限切れによる削除・他のプロセスの保存を含まないため、走査し直してから判断します。
+        呼び出し側で self._lock を取得すること。
+        """
+        entries = []
+        for path in self._list_entries():
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                # 他のプロセスが削除した
+                continue
+
+        if len(entries) > self.max_entries:
+            overflow = len(entries) - int(self.max_entries * EVICT_TARGET_RATIO)
+            entries.sort()
+            for _, path in entries[:overflow]:
+                self._remove(path)
+            logger.debug(f"キャッシュ削除（LRU）: {overflow}件")
+            self._estimated_entries = len(entries) - overflow
+        else:
+            self._estimated_entries = len(entries)
+
+    def _remove(self, path: str):
+        """キャッシュファイルを削除（存在しなくてもエラーにしない）"""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _count(self, hit: bool):
+        """ヒット/ミス数を記録"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_stats(self) -> Dict:
+        """キャッシュ統計を取得"""
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
@@ -0,0 +1,241 @@
+"""
+Phase 1 AI分析結果のJSON Schema
+- _build_static_prompt の出力形式と同じ構造
+- OpenAI Structured Outputs（response_format: json_schema）
+- Anthropic tool use（input_schema）
+- 受信結果のローカル検証
+"""
+
+from typing import Any, Dict, List
+
+# JSON Schema検証（オプショナル）
+try:
+    import jsonschema
+    JSONSCHEMA_AVAILABLE = True
+except ImportError:
+    JSONSCHEMA_AVAILABLE = False
+
+
+ANALYSIS_SCHEMA_NAME = "phase1_evidence_analysis"
+ANALYSIS_TOOL_NAME = "record_evidence_analysis"
+
+# evidence_metadata のスキーマ上のキー → 分析結果（database.json）での表示キー
+# Anthropic tool use のプロパティ名は英数字・_.- のみ使用できるため、スキーマでは英字キーを使います。
+EVIDENCE_METADATA_KEYS = {
+    "basic_info": "証拠の基本情報",
+    "file_info": "ファイル情報",
+    "created_at": "作成日時",
+    "author": "作成者",
+    "gdrive_url": "Google DriveURL"
+}
+
+
+def _obj(properties: Dict[str, Dict]) -> Dict:
+    """Structured Outputs（strict）用のオブジェクト定義
+
+    strictモードでは全プロパティを必須とし、追加プロパティを禁止する必要があります。
+    """
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties.keys()),
+        "additionalProperties": False
+    }
+
+
+def _str(description: str = None) -> Dict:
+    schema = {"type": "string"}
+    if description:
+        schema["description"] = description
+    return schema
+
+
+def _str_list() -> Dict:
+    return {"type": "array", "items": {"type": "string"}}
+
+
+ANALYSIS_JSON_SCHEMA = _obj({
+    "evidence_id": _str("本証拠の証拠ID"),
+    "verbalization_level": {"type": "integer"},
+    "confidence_score": {"type": "number"},
+    "evidence_metadata": _obj({
+        key: _str(display_key) for key, display_key in EVIDENCE_METADATA_KEYS.items()
+    }),
+    "full_content": _obj({
+        "complete_description": _str("原文を見なくても完全に理解できる詳細な記述"),
+        "visual_information": _obj({
+            "overall_description": _str(),
+            "key_elements": _str_list(),
+            "text_in_image": {
+                "type": "array",
+                "items": _obj({
+                    "text": _str(),
+                    "location": _str(),
+                    "size": _str()
+                })
+            },
+            "background_details": _str(),
+            "quality_notes": _str()
+        }),
+        "textual_content": _obj({
+            "extracted_text": _str("文書内の全テキストを正確に抽出"),
+            "text_summary": _str(),
+            "document_structure": _str(),
+            "formatting_notes": _str()
+        }),
+        "ocr_results": _obj({
+            "extracted_text": _str(),
+            "confidence": {"type": "number"}
+        })
+    }),
+    "objective_analysis": _obj({
+        "document_type": _str(),
+        "observable_facts": _str_list(),
+        "temporal_information": _obj({
+            "document_date": {
+                "type": ["string", "null"],
+                "description": "証拠の作成年月日（YYYY-MM-DD形式）"
+            },
+            "document_date_source": _str(),
+            "other_dates": {
+                "type": "array",
+                "items": _obj({
+                    "date": _str("YYYY-MM-DD"),
+                    "context": _str()
+                })
+            },
+            "timeline": _str(),
+            "date_confidence": _str()
+        }),
+        "parties_mentioned": _obj({
+            "individuals": _str_list(),
+            "organizations": _str_list(),
+            "roles_described": _str()
+        }),
+        "financial_information": _obj({
+            "amounts": _str_list(),
+            "currency": _str(),
+            "amount_context": _str()
+        }),
+        "identifiers": _obj({
+            "contract_numbers": _str_list(),
+            "reference_numbers": _str_list(),
+            "serial_numbers": _str_list()
+        }),
+        "signatures_and_seals": _obj({
+            "signatures": _str_list(),
+            "seals": _str_list(),
+            "signature_dates": _str_list(),
+            "signature_locations": _str()
+        }),
+        "document_state": _obj({
+            "completeness": _str(),
+            "modifications": _str(),
+            "annotations": _str(),
+            "preservation_state": _str()
+        })
+    }),
+    "extracted_data": _obj({
+        "key_terms": _str_list(),
+        "definitions": _str(),
+        "conditions": _str_list(),
+        "obligations": _str_list(),
+        "rights": _str_list(),
+        "exceptions": _str_list()
+    }),
+    "metadata_analysis": _obj({
+        "file_properties": _str(),
+        "creation_metadata": _str(),
+        "technical_details": _str()
+    })
+})
+
+
+def openai_response_format() -> Dict:
+    """OpenAI Chat Completions の response_format"""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": ANALYSIS_SCHEMA_NAME,
+            "schema": ANALYSIS_JSON_SCHEMA,
+            "strict": True
+        }
+    }
+
+
+def anthropic_tool_params() -> Dict:
+    """Anthropic Messages の tools / tool_choice"""
+    return {
+        "tools": [{
+            "name": ANALYSIS_TOOL_NAME,
+            "description": "Phase 1 証拠分析結果を記録する",
+            "input_schema": ANALYSIS_JSON_SCHEMA
+        }],
+        "tool_choice": {"type": "tool", "name": ANALYSIS_TOOL_NAME}
+    }
+
+
+def _rename_metadata_keys(result: Dict, mapping: Dict[str, str]) -> Dict:
+    metadata = result.get("evidence_metadata")
+    if not isinstance(metadata, dict):
+        return result
+    renamed = dict(result)
+    renamed["evidence_metadata"] = {mapping.get(k, k): v for k, v in metadata.items()}
+    return renamed
+
+
+def to_schema_keys(result: Dict) -> Dict:
+    """evidence_metadata の表示キー（日本語）をスキーマのキーに変換（旧形式の応答の検証用）"""
+    return _rename_metadata_keys(result, {v: k for k, v in EVIDENCE_METADATA_KEYS.items()})
+
+
+def to_display_keys(result: Dict) -> Dict:
+    """evidence_metadata のスキーマのキーを表示キー（日本語）に変換"""
+    return _rename_metadata_keys(result, EVIDENCE_METADATA_KEYS)
+
+
+def validate_analysis_result(result: Dict) -> List[str]:
+    """分析結果をスキーマで検証
+
+    Returns:
+        エラーメッセージのリスト（空なら妥当）
+    """
+    if JSONSCHEMA_AVAILABLE:
+        validator = jsonschema.Draft202012Validator(ANALYSIS_JSON_SCHEMA)
+        return [
+            f"{'/'.join(str(p) for p in error.path) or '(root)'}: {error.message}"
+            for error in validator.iter_errors(result)
+        ]
+    return _validate(result, ANALYSIS_JSON_SCHEMA, "")
+
+
+def _validate(value: Any, schema: Dict, path: str) -> List[str]:
+    """jsonschema未インストール時の簡易検証（型・必須項目のみ）"""
+    types = schema.get("type")
+    types = types if isinstance(types, list) else [types]
+    type_checks = {
+        "object": lambda v: isinstance(v, dict),
+        "array": lambda v: isinstance(v, list),
+        "string": lambda v: isinstance(v, str),
+        "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+        "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+        "null": lambda v: v is None
+    }
+    label = path or "(root)"
+
+    if not any(type_checks[t](value) for t in types if t in type_checks):
+        return [f"{label}: {'/'.join(types)} 型ではありません"]
+
+    errors = []
+    if isinstance(value, dict) and "properties" in schema:
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{label}: 必須項目 '{key}' がありません")
+        for key, sub_schema in schema["properties"].items():
+            if key in value:
+                errors.extend(_validate(value[key], sub_schema, f"{path}/{key}" if path else key))
+    elif isinstance(value, list) and "items" in schema:
+        for i, item in enumerate(value):
+            errors.extend(_validate(item, schema["items"], f"{path}/{i}"))
+
+    return errors
@@ -0,0 +1,133 @@
+"""
+AI APIクライアントの共有レジストリ
+- OpenAI / Anthropic クライアントをプロセス全体で1つずつ（APIキーごと）共有
+- httpxのコネクションプール・Keep-Alive・HTTP/2（h2導入時）を設定
+- タイムアウトは API_TIMEOUT_SECONDS（大容量ファイルは LARGE_FILE_TIMEOUT_SECONDS を個別指定）
+
+メニュー操作のたびに分析器・時系列ビルダーを作り直しても、
+TLS接続を確立済みのクライアントを再利用します。
+AI_CASSETTE_MODE が record / replay の場合は応答の記録・再生用クライアントを返します（ai_cassette）。
+"""
+
+import atexit
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from global_config import *
+from src.ai_cassette import ai_cassette
+
+logger = logging.getLogger(__name__)
+
+# HTTPクライアント
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+# HTTP/2（オプショナル）
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# OpenAI
+try:
+    import openai
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+
+# Anthropic Claude（オプショナル）
+try:
+    import anthropic
+    ANTHROPIC_AVAILABLE = True
+except ImportError:
+    ANTHROPIC_AVAILABLE = False
+
+_clients: Dict[Tuple[str, str], object] = {}
+_lock = threading.Lock()
+
+
+def _build_http_client(sdk):
+    """コネクションプール・タイムアウトを設定したhttpxクライアントを作成
+
+    SDKの DefaultHttpxClient（リダイレクト等のSDK既定値を維持）があれば使用します。
+    """
+    if not HTTPX_AVAILABLE:
+        return None
+
+    options = {
+        "timeout": httpx.Timeout(API_TIMEOUT_SECONDS, connect=API_CONNECT_TIMEOUT_SECONDS),
+        "limits": httpx.Limits(
+            max_connections=API_MAX_CONNECTIONS,
+            max_keepalive_connections=API_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=API_KEEPALIVE_EXPIRY_SECONDS
+        ),
+        "http2": ENABLE_HTTP2 and HTTP2_AVAILABLE
+    }
+    client_class = getattr(sdk, 'DefaultHttpxClient', None) or httpx.Client
+    return client_class(**options)
+
+
+def _get_or_create(provider: str, api_key: str, factory):
+    key = (provider, api_key)
+    with _lock:
+        if key not in _clients:
+            _clients[key] = factory()
+            logger.debug(f"{provider} APIクライアントを作成（共有）")
+        return _clients[key]
+
+
+def get_openai_client(api_key: Optional[str] = None):
+    """共有OpenAIクライアントを取得
+
+    Args:
+        api_key: OpenAI APIキー（未指定時は OPENAI_API_KEY）
+    """
+    if ai_cassette.mode == 'replay':
+        return ai_cassette.replay_client('openai')
+    if not OPENAI_AVAILABLE:
+        raise ImportError("openaiライブラリが未インストールです")
+
+    api_key = api_key or OPENAI_API_KEY
+    return ai_cassette.wrap('openai', _get_or_create('openai', api_key, lambda: openai.OpenAI(
+        api_key=api_key,
+        timeout=API_TIMEOUT_SECONDS,
+        http_client=_build_http_client(openai)
+    )))
+
+
+def get_anthropic_client(api_key: Optional[str] = None):
+    """共有Anthropicクライアントを取得
+
+    Args:
+        api_key: Anthropic APIキー（未指定時は ANTHROPIC_API_KEY）
+    """
+    if ai_cassette.mode == 'replay':
+        return ai_cassette.replay_client('anthropic')
+    if not ANTHROPIC_AVAILABLE:
+        raise ImportError("anthropicライブラリが未インストールです")
+
+    api_key = api_key or ANTHROPIC_API_KEY
+    return ai_cassette.wrap('anthropic', _get_or_create('anthropic', api_key, lambda: anthropic.Anthropic(
+        api_key=api_key,
+        timeout=API_TIMEOUT_SECONDS,
+        http_client=_build_http_client(anthropic)
+    )))
+
+
+def close_all_clients():
+    """共有クライアントを閉じる（プロセス終了時）"""
+    with _lock:
+        for client in _clients.values():
+            try:
+                client.close()
+            except Exception as e:
+                logger.debug(f"APIクライアントのクローズ失敗: {e}")
+        _clients.clear()
+
+
+atexit.register(close_all_clients)
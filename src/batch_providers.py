@@ -0,0 +1,228 @@
+"""
+AIプロバイダーのバッチAPIクライアント
+- OpenAI Batch API
+- Anthropic Message Batches API
+- ローカルファイルベースの代替プロバイダー（テスト・オフライン確認用）
+
+各プロバイダーは共通のインターフェースを持ちます:
+    submit(input_path) -> batch_id
+    get_status(batch_id) -> 'in_progress' | 'completed' | 'failed'
+    fetch_results(batch_id) -> {custom_id: {"text": str | None, "error": str | None}}
+"""
+
+import os
+import json
+import logging
+from typing import Callable, Dict, Optional
+
+from global_config import *
+from src.streaming_response import anthropic_message_text
+
+logger = logging.getLogger(__name__)
+
+
+class OpenAIBatchProvider:
+    """OpenAI Batch API（/v1/chat/completions）"""
+
+    name = 'openai'
+
+    def __init__(self, client):
+        """
+        Args:
+            client: openai.OpenAIクライアント
+        """
+        self.client = client
+
+    def submit(self, input_path: str) -> str:
+        """JSONLファイルをアップロードしてバッチを作成"""
+        with open(input_path, 'rb') as f:
+            batch_file = self.client.files.create(file=f, purpose="batch")
+
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        logger.info(f"✅ OpenAIバッチ作成: {batch.id}")
+        return batch.id
+
+    def get_status(self, batch_id: str) -> str:
+        """バッチの状態を取得"""
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status == 'completed':
+            return 'completed'
+        if batch.status in ('failed', 'expired', 'cancelled'):
+            return 'failed'
+        return 'in_progress'
+
+    def fetch_results(self, batch_id: str) -> Dict[str, Dict]:
+        """バッチ結果を取得"""
+        batch = self.client.batches.retrieve(batch_id)
+        results = {}
+
+        if batch.output_file_id:
+            content = self.client.files.content(batch.output_file_id).text
+            results.update(parse_openai_batch_output(content))
+
+        if getattr(batch, 'error_file_id', None):
+            content = self.client.files.content(batch.error_file_id).text
+            for custom_id, item in parse_openai_batch_output(content).items():
+                results.setdefault(custom_id, item)
+
+        return results
+
+
+class AnthropicBatchProvider:
+    """Anthropic Message Batches API"""
+
+    name = 'anthropic'
+
+    def __init__(self, client):
+        """
+        Args:
+            client: anthropic.Anthropicクライアント
+        """
+        self.client = client
+
+    def submit(self, input_path: str) -> str:
+        """JSONLファイルのリクエストでバッチを作成"""
+        requests = []
+        with open(input_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    requests.append(json.loads(line))
+
+        batch = self.client.messages.batches.create(requests=requests)
+        logger.info(f"✅ Anthropicバッチ作成: {batch.id}")
+        return batch.id
+
+    def get_status(self, batch_id: str) -> str:
+        """バッチの状態を取得"""
+        batch = self.client.messages.batches.retrieve(batch_id)
+        if batch.processing_status == 'ended':
+            return 'completed'
+        return 'in_progress'
+
+    def fetch_results(self, batch_id: str) -> Dict[str, Dict]:
+        """バッチ結果を取得"""
+        results = {}
+        for entry in self.client.messages.batches.results(batch_id):
+            if entry.result.type == 'succeeded':
+                text = anthropic_message_text(entry.result.message.content)
+                results[entry.custom_id] = {"text": text, "error": None}
+            else:
+                error = getattr(entry.result, 'error', None)
+                results[entry.custom_id] = {
+                    "text": None,
+                    "error": str(error) if error else entry.result.type
+                }
+        return results
+
+
+class LocalBatchProvider:
+    """ローカルファイルベースの代替プロバイダー
+
+    OpenAI Batch API と同じ入出力形式（JSONL）で、APIを呼び出さずに
+    即座に結果ファイルを生成します。APIキーのない環境での動作確認用です。
+    """
+
+    name = 'local'
+
+    def __init__(self,
+                 work_dir: str = None,
+                 responder: Optional[Callable[[str, Dict], str]] = None):
+        """
+        Args:
+            work_dir: 結果ファイルの出力先
+            responder: (custom_id, リクエストbody) → 応答テキスト を返す関数
+                       未指定時は responses/{custom_id}.json があればその内容、
+                       なければ最小限のJSONを返す
+        """
+        self.work_dir = work_dir or os.path.join(BATCH_WORK_DIR, "local")
+        self.responder = responder or self._default_responder
+        os.makedirs(self.work_dir, exist_ok=True)
+
+    def _default_responder(self, custom_id: str, body: Dict) -> str:
+        """既定の応答（responsesディレクトリの内容、なければ最小限のJSON）"""
+        response_path = os.path.join(self.work_dir, "responses", f"{custom_id}.json")
+        if os.path.exists(response_path):
+            with open(response_path, 'r', encoding='utf-8') as f:
+                return f.read()
+
+        return json.dumps({
+            "evidence_id": custom_id,
+            "verbalization_level": 0,
+            "confidence_score": 0.0,
+            "local_batch_stub": True
+        }, ensure_ascii=False)
+
+    def submit(self, input_path: str) -> str:
+        """入力JSONLを読み込み、結果JSONLを書き出す"""
+        batch_id = f"local_{get_filename_timestamp()}"
+        output_path = os.path.join(self.work_dir, f"{batch_id}_output.jsonl")
+
+        with open(input_path, 'r', encoding='utf-8') as fin, \
+             open(output_path, 'w', encoding='utf-8') as fout:
+            for line in fin:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                custom_id = request['custom_id']
+                body = request.get('body') or request.get('params') or {}
+
+                try:
+                    text = self.responder(custom_id, body)
+                    output = {
+                        "custom_id": custom_id,
+                        "response": {
+                            "status_code": 200,
+                            "body": {"choices": [{"message": {"content": text}}]}
+                        },
+                        "error": None
+                    }
+                except Exception as e:
+                    output = {"custom_id": custom_id, "response": None, "error": {"message": str(e)}}
+
+                fout.write(json.dumps(output, ensure_ascii=False) + '\n')
+
+        logger.info(f"✅ ローカルバッチ作成: {batch_id}")
+        return batch_id
+
+    def get_status(self, batch_id: str) -> str:
+        """結果ファイルがあれば完了"""
+        output_path = os.path.join(self.work_dir, f"{batch_id}_output.jsonl")
+        return 'completed' if os.path.exists(output_path) else 'failed'
+
+    def fetch_results(self, batch_id: str) -> Dict[str, Dict]:
+        """結果ファイルを読み込み"""
+        output_path = os.path.join(self.work_dir, f"{batch_id}_output.jsonl")
+        with open(output_path, 'r', encoding='utf-8') as f:
+            return parse_openai_batch_output(f.read())
+
+
+def parse_openai_batch_output(content: str) -> Dict[str, Dict]:
+    """OpenAI Batch API形式の出力JSONLを解析
+
+    Returns:
+        {custom_id: {"text": str | None, "error": str | None}}
+    """
+    results = {}
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        custom_id = entry.get('custom_id')
+        response = entry.get('response') or {}
+
+        if entry.get('error') or response.get('status_code', 200) != 200:
+            error = entry.get('error') or response.get('body', {}).get('error')
+            results[custom_id] = {"text": None, "error": json.dumps(error, ensure_ascii=False)}
+            continue
+
+        try:
+            text = response['body']['choices'][0]['message']['content']
+            results[custom_id] = {"text": text, "error": None}
+        except (KeyError, IndexError, TypeError) as e:
+            results[custom_id] = {"text": None, "error": f"応答形式が不正です: {e}"}
+
+    return results
@@ -0,0 +1,61 @@
+"""
+証拠ファイル1件分の処理成果物
+- メタデータ抽出結果
+- ファイル内容処理結果（OCR・PDF解析等）
+
+同じ証拠に対してメタデータ抽出やOCRが重複実行されないよう、
+最初の計算結果を保持して以降の処理で共有します。
+"""
+
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EvidenceArtifacts:
+    """証拠1件分の処理成果物（各ステージは1回だけ実行）"""
+
+    def __init__(self,
+                 file_path: str,
+                 file_type: str,
+                 gdrive_file_info: Optional[Dict] = None):
+        """初期化
+
+        Args:
+            file_path: ローカルファイルパス
+            file_type: ファイルタイプ
+            gdrive_file_info: Google Driveファイル情報
+        """
+        self.file_path = file_path
+        self.file_type = file_type
+        self.gdrive_file_info = gdrive_file_info
+        self.metadata: Optional[Dict] = None
+        self.file_content: Optional[Dict] = None
+
+    def get_metadata(self, metadata_extractor) -> Dict:
+        """メタデータを取得（未抽出の場合のみ抽出）
+
+        Args:
+            metadata_extractor: MetadataExtractorインスタンス
+        """
+        if self.metadata is None:
+            self.metadata = metadata_extractor.extract_complete_metadata(
+                self.file_path,
+                self.gdrive_file_info
+            )
+        else:
+            logger.debug("メタデータ抽出済み - 再利用します")
+        return self.metadata
+
+    def get_file_content(self, file_processor) -> Dict:
+        """ファイル内容処理結果を取得（未処理の場合のみ処理）
+
+        Args:
+            file_processor: FileProcessorインスタンス
+        """
+        if self.file_content is None:
+            self.file_content = file_processor.process_file(self.file_path, self.file_type)
+        else:
+            logger.debug("ファイル内容処理済み - 再利用します")
+        return self.file_content
@@ -12,10 +12,15 @@ AI対話形式による証拠内容編集モジュール
 
 import os
 import json
+import time
 import logging
 from datetime import datetime
 from typing import Dict, Optional, List
-from openai import OpenAI
+
+from src.streaming_response import stream_openai_chat
+from src.api_clients import get_openai_client
+from src.vision_image_preprocessor import VisionImagePreprocessor
+from src.ai_telemetry import ai_telemetry, extract_usage
 
 logger = logging.getLogger(__name__)
 
@@ -33,8 +38,9 @@ class EvidenceEditorAI:
         if not api_key:
             raise ValueError("OpenAI APIキーが設定されていません")
         
-        self.client = OpenAI(api_key=api_key)
+        self.client = get_openai_client(api_key)  # プロセス全体で共有（接続を再利用）
         self.model = "gpt-4o"  # より高精度なモデルを使用
+        self.image_preprocessor = VisionImagePreprocessor()
         self.edit_history = []  # 変更履歴
     
     def edit_evidence_interactive(self, 
@@ -80,18 +86,20 @@ class EvidenceEditorAI:
                 if not instruction:
                     continue
                 
-                # AIに修正案を生成させる
+                # AIに修正案を生成させる（AI呼び出しのトークン・コストを記録）
                 print("\nAIが修正案を生成中...")
-                modified_data, changes = self._generate_improvement(
-                    modified_data, 
-                    instruction
-                )
+                with ai_telemetry.start_session(evidence_id=evidence_id) as telemetry_session:
+                    modified_data, changes = self._generate_improvement(
+                        modified_data, 
+                        instruction
+                    )
                 
                 if changes:
                     session_history.append({
                         'timestamp': datetime.now().isoformat(),
                         'instruction': instruction,
-                        'changes': changes
+                        'changes': changes,
+                        'ai_telemetry': ai_telemetry.to_record(telemetry_session)
                     })
                     
                     # 修正内容を表示
@@ -210,7 +218,9 @@ class EvidenceEditorAI:
                 # テキストベースの場合は既存のロジック
                 prompt = self._build_improvement_prompt(current_analysis, instruction)
                 
-                response = self.client.chat.completions.create(
+                response = self._call_openai(
+                    label="修正案生成",
+                    on_key=self._print_stream_progress,
                     model=self.model,
                     messages=[
                         {
@@ -225,8 +235,12 @@ class EvidenceEditorAI:
                     temperature=0.3,
                     response_format={"type": "json_object"}
                 )
+                print()
+                
+                if response.refused:
+                    raise ValueError(f"AIが修正案の生成を拒否しました: {response.text[:80]}")
             
-                result_text = response.choices[0].message.content
+                result_text = response.text
                 result = json.loads(result_text)
                 
                 # 修正後のデータを構築
@@ -266,17 +280,13 @@ class EvidenceEditorAI:
             (修正後のデータ, 変更内容の要約)
         """
         try:
-            import base64
+            # 画像ペイロード（分析時・前回の編集時にエンコード済みなら再利用）
+            payload = self.image_preprocessor.get_payload(file_path, 'openai')
             
-            # 画像ファイルをBase64エンコード
-            with open(file_path, 'rb') as f:
-                image_data = base64.b64encode(f.read()).decode('utf-8')
-            
-            # MIMEタイプを取得
-            mime_type = self._get_mime_type(file_path)
-            
-            # Vision APIで再分析
-            response = self.client.chat.completions.create(
+            # Vision APIで再分析（ストリーミング受信）
+            response = self._call_openai(
+                label="画像再精査",
+                on_key=self._print_stream_progress,
                 model=self.model,
                 messages=[
                     {
@@ -293,7 +303,7 @@ class EvidenceEditorAI:
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:{mime_type};base64,{image_data}",
+                                    "url": payload.data_url,
                                     "detail": "high"  # 高解像度で分析
                                 }
                             }
@@ -304,8 +314,12 @@ class EvidenceEditorAI:
                 temperature=0.3,
                 response_format={"type": "json_object"}
             )
+            print()
+            
+            if response.refused:
+                raise ValueError(f"AIが画像の再精査を拒否しました: {response.text[:80]}")
             
-            result_text = response.choices[0].message.content
+            result_text = response.text
             result = json.loads(result_text)
             
             # 修正後のデータを構築
@@ -329,25 +343,24 @@ class EvidenceEditorAI:
             print(f"\nエラー: 画像再精査に失敗しました - {e}")
             return evidence_data, {}
     
-    def _get_mime_type(self, file_path: str) -> str:
-        """MIMEタイプ取得
+    def _call_openai(self, label: str, **params):
+        """OpenAI API呼び出し（トークン・所要時間・推定コストをテレメトリに記録）"""
+        start_time = time.time()
+        try:
+            response = stream_openai_chat(self.client, label=label, **params)
+        except Exception:
+            ai_telemetry.record_call('evidence_editor', 'openai', self.model, None,
+                                     time.time() - start_time, status='error', label=label)
+            raise
         
-        Args:
-            file_path: ファイルパス
-            
-        Returns:
-            MIMEタイプ
-        """
-        ext = os.path.splitext(file_path)[1].lower()
-        mime_types = {
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.gif': 'image/gif',
-            '.webp': 'image/webp',
-            '.pdf': 'application/pdf'
-        }
-        return mime_types.get(ext, 'image/jpeg')
+        ai_telemetry.record_call('evidence_editor', 'openai', self.model,
+                                 extract_usage(response.usage, 'openai'), response.elapsed_seconds,
+                                 status='refused' if response.refused else 'success', label=label)
+        return response
+    
+    def _print_stream_progress(self, key: str, received_chars: int):
+        """ストリーミング受信中の進捗を1行で表示"""
+        print(f"\r  📥 受信中: {key}（{received_chars}文字）\033[K", end='', flush=True)
     
     def _build_improvement_prompt_with_image(self,
                                             current_analysis: Dict,
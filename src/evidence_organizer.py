@@ -29,6 +29,7 @@ try:
     from src.case_manager import CaseManager
     from src.ai_analyzer_complete import AIAnalyzerComplete
     from src.metadata_extractor import MetadataExtractor
+    from src.refusal_predictor import guess_evidence_type
     from src.gdrive_database_manager import GDriveDatabaseManager, create_database_manager
 except ImportError as e:
     print(f"❌ エラー: モジュールのインポートに失敗しました: {e}")
@@ -396,25 +397,7 @@ class EvidenceOrganizer:
     
     def _guess_evidence_type(self, filename: str) -> str:
         """ファイル名から証拠種別を推測"""
-        filename_lower = filename.lower()
-        
-        keywords = {
-            "診断書": ["診断", "診断書", "medical", "diagnosis"],
-            "契約書": ["契約", "契約書", "contract", "agreement"],
-            "メール": ["メール", "mail", "email", "message"],
-            "SNS投稿": ["sns", "twitter", "facebook", "instagram", "投稿", "post"],
-            "写真": ["img", "photo", "写真", "画像", "jpg", "jpeg", "png"],
-            "請求書": ["請求", "請求書", "invoice", "bill"],
-            "領収書": ["領収", "領収書", "receipt"],
-            "録音": ["録音", "audio", "recording", "mp3", "m4a"],
-            "動画": ["動画", "video", "mp4", "mov"],
-        }
-        
-        for evidence_type, words in keywords.items():
-            if any(word in filename_lower for word in words):
-                return evidence_type
-        
-        return "その他"
+        return guess_evidence_type(filename)
     
     def _extract_description(self, filename: str) -> str:
         """ファイル名から簡潔な説明を抽出"""
@@ -9,8 +9,14 @@
 
 import os
 import json
+import hashlib
+import atexit
 import logging
+import threading
 import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
@@ -58,17 +64,77 @@ try:
 except ImportError:
     BS4_AVAILABLE = False
 
-# OCR
-try:
-    import pytesseract
-    TESSERACT_AVAILABLE = True
-except ImportError:
-    TESSERACT_AVAILABLE = False
-
 from global_config import *
+from src.ocr_engine import get_ocr_backend, OCR_AVAILABLE
+from src.ocr_language_selector import ocr_language_selector
 
 logger = logging.getLogger(__name__)
 
+# スキャンPDFのOCR用プロセスプール（証拠をまたいで共有し、各プロセスのOCRエンジンを再利用）
+_ocr_pool: Optional[ProcessPoolExecutor] = None
+_ocr_pool_lock = threading.Lock()
+
+
+def _get_ocr_pool() -> ProcessPoolExecutor:
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            # spawn: 証拠処理スレッド・HTTPクライアントのスレッドが動作中のプロセスをforkすると、
+            # 子プロセスが継承したロック（logging・OCRエンジン・キャッシュ）でデッドロックし得るため
+            _ocr_pool = ProcessPoolExecutor(
+                max_workers=OCR_MAX_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            atexit.register(_ocr_pool.shutdown, wait=False, cancel_futures=True)
+        return _ocr_pool
+
+
+def _reset_ocr_pool():
+    """異常終了したプロセスプールを破棄（次回呼び出し時に作り直す）"""
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is not None:
+            _ocr_pool.shutdown(wait=False, cancel_futures=True)
+            _ocr_pool = None
+
+
+def _ocr_pdf_page_range(pdf_path: str,
+                        first_page: int,
+                        last_page: int,
+                        dpi: int,
+                        language_plan: Optional[Dict] = None) -> List[Dict]:
+    """PDFの指定ページ範囲を画像化してOCR（子プロセスで実行）
+
+    画像化はこの範囲のみ行うため、同時にメモリ上に置くページはこの範囲に限られます。
+    OCR結果はキャッシュ（src.ocr_cache）を参照し、返すOCR結果のヒット/ミスは cache_hit として、
+    選択した言語・各キャッシュ参照のヒット/ミスは language_selection として親プロセスに返します。
+
+    Args:
+        language_plan: 親プロセスで決定済みのOCR言語（未指定時はページごとにOSDで判定）
+                       事件の指定は親プロセスでこの計画に反映済みのため、子プロセスでは参照しません。
+    """
+    backend = get_ocr_backend()
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page)
+    filename = os.path.basename(pdf_path)
+    results = []
+    for page_number, image in enumerate(images, start=first_page):
+        if backend:
+            ocr_result, cache_hit, plan = ocr_language_selector.recognize(
+                backend, image, dpi=dpi, filename=filename, plan=language_plan
+            )
+        else:
+            ocr_result, cache_hit, plan = {"text": "", "confidence": 0.0}, False, None
+        results.append({
+            "page_number": page_number,
+            "ocr_text": ocr_result['text'],
+            "confidence": ocr_result['confidence'],
+            "languages": plan['languages'] if plan else [],
+            "cache_hit": cache_hit,
+            "language_selection": plan
+        })
+        image.close()
+    return results
+
 
 class FileProcessor:
     """全形式対応ファイルプロセッサー"""
@@ -77,6 +143,7 @@ class FileProcessor:
         """初期化"""
         self.temp_dir = LOCAL_TEMP_DIR
         os.makedirs(self.temp_dir, exist_ok=True)
+        self.ocr_backend = get_ocr_backend()  # プロセス内で共有（tesserocr導入時は常駐）
         logger.info("✅ FileProcessor初期化完了")
     
     def process_file(self, file_path: str, file_type: str) -> Dict:
@@ -135,6 +202,8 @@ class FileProcessor:
             "content": {}
         }
         
+        original_filename = os.path.basename(image_path)
+        
         try:
             # HEIC変換
             if image_path.lower().endswith(('.heic', '.heif')):
@@ -149,12 +218,14 @@ class FileProcessor:
                         "mode": img.mode
                     }
                     
-                    # OCR実行
-                    if OCR_ENABLED and TESSERACT_AVAILABLE:
-                        ocr_result = self._perform_ocr(image_path)
+                    # OCR実行（読み込み済みの画像を渡す）
+                    if OCR_ENABLED and OCR_AVAILABLE:
+                        ocr_result = self._perform_ocr(img, filename=original_filename)
                         result['content']['ocr_text'] = ocr_result['text']
                         result['content']['ocr_confidence'] = ocr_result['confidence']
                         result['content']['ocr_language'] = ocr_result['language']
+                        result['content']['ocr_languages'] = ocr_result.get('languages', [])
+                        result['content']['ocr_lines'] = ocr_result.get('lines', [])
             
             # 画像を一時保存（AI分析用）
             result['processed_file_path'] = image_path
@@ -168,13 +239,15 @@ class FileProcessor:
             result['error'] = str(e)
             return result
     
+    def _derived_path(self, source_path: str, suffix: str) -> str:
+        """変換ファイルの出力先（並列処理中に同名の元ファイル同士で衝突しないよう元のパスのハッシュを含める）"""
+        source_hash = hashlib.sha256(os.path.abspath(source_path).encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.temp_dir, f"{Path(source_path).stem}_{source_hash}{suffix}")
+    
     def _convert_heic_to_jpg(self, heic_path: str) -> str:
         """HEICをJPGに変換"""
         try:
-            output_path = os.path.join(
-                self.temp_dir,
-                f"{Path(heic_path).stem}_converted.jpg"
-            )
+            output_path = self._derived_path(heic_path, "_converted.jpg")
             
             # PIL + pillow-heif での変換
             if PILLOW_AVAILABLE:
@@ -200,33 +273,33 @@ class FileProcessor:
             traceback.print_exc()
             return heic_path
     
-    def _perform_ocr(self, image_path: str) -> Dict:
-        """OCR実行"""
+    def _perform_ocr(self, image: "Image.Image", dpi: Optional[int] = None, filename: str = '') -> Dict:
+        """OCR実行（image_to_data 1回で本文・信頼度・位置・行構造を取得）
+        
+        OCR言語は画像ごとに選択し（src.ocr_language_selector）、
+        同じ画素・言語・エンジンのOCR結果はキャッシュ（src.ocr_cache）から返します。
+        
+        Args:
+            image: 呼び出し側で読み込み済みの画像（再読み込みしない）
+            dpi: PDFを画像化したDPI（画像ファイルはNone）
+            filename: 元のファイル名（言語選択のヒント）
+        
+        Returns:
+            {"text", "confidence", "language", "word_count", "char_count", "words", "lines",
+             "languages", "language_selection"}
+            （OCR部分の形式は src.ocr_engine.build_ocr_result を参照）
+        """
         try:
-            # Tesseract OCR
-            text = pytesseract.image_to_string(
-                Image.open(image_path),
-                lang='+'.join(OCR_LANGUAGES)
-            )
-            
-            # 詳細情報取得
-            data = pytesseract.image_to_data(
-                Image.open(image_path),
-                lang='+'.join(OCR_LANGUAGES),
-                output_type=pytesseract.Output.DICT
+            if self.ocr_backend is None:
+                raise ImportError("OCRエンジン（tesserocr / pytesseract）が未インストールです")
+            ocr_result, cache_hit, plan = ocr_language_selector.recognize(
+                self.ocr_backend, image, dpi=dpi, filename=filename,
+                case_languages=ocr_language_selector.case_languages
             )
-            
-            # 信頼度計算
-            confidences = [int(conf) for conf in data['conf'] if conf != '-1']
-            avg_confidence = sum(confidences) / len(confidences) if confidences else 0
-            
-            return {
-                "text": text.strip(),
-                "confidence": round(avg_confidence / 100, 2),
-                "language": OCR_LANGUAGES[0],
-                "word_count": len(text.split()),
-                "char_count": len(text)
-            }
+            ocr_language_selector.record(plan)
+            logger.debug(f"OCR言語: {'+'.join(plan['languages'])}（{plan['reason']}）"
+                         f"{' キャッシュヒット' if cache_hit else ''}")
+            return {**ocr_result, "languages": plan['languages'], "language_selection": plan}
             
         except Exception as e:
             logger.error(f"❌ OCR実行失敗: {e}")
@@ -245,7 +318,7 @@ class FileProcessor:
         """
         PDF処理
         - テキスト抽出
-        - 画像変換してOCR
+        - テキスト層のないページのみ画像変換してOCR
         """
         logger.info(f"📄 PDF処理: {os.path.basename(pdf_path)}")
         
@@ -266,25 +339,42 @@ class FileProcessor:
                 result['content']['page_count'] = len(pdf_reader.pages)
                 result['content']['is_encrypted'] = pdf_reader.is_encrypted
                 
-                # 全ページのテキスト抽出
+                # 全ページのテキスト抽出とページ構成（フォント・画像）の判定
                 full_text = []
                 for i, page in enumerate(pdf_reader.pages):
-                    page_text = page.extract_text()
+                    page_text, layout = self._extract_page_layer(page)
                     full_text.append({
                         "page_number": i + 1,
                         "text": page_text,
-                        "char_count": len(page_text)
+                        "char_count": len(page_text),
+                        "source": "text_layer",
+                        **layout
                     })
-                
-                result['content']['pages'] = full_text
-                result['content']['total_text'] = '\n\n'.join([p['text'] for p in full_text])
-                
-                # テキストが少ない場合はOCR実行
-                total_chars = sum(p['char_count'] for p in full_text)
-                if total_chars < 100 and OCR_ENABLED:
-                    logger.info("📷 PDF→画像変換してOCR実行")
-                    ocr_result = self._pdf_to_image_ocr(pdf_path)
-                    result['content']['ocr_results'] = ocr_result
+            
+            # テキスト層のないページ（スキャン・画像のみ）だけOCR実行
+            ocr_pages = [p['page_number'] for p in full_text if p.pop('needs_ocr')]
+            if ocr_pages and OCR_ENABLED:
+                logger.info(f"📷 {len(ocr_pages)}/{len(full_text)}ページを画像変換してOCR実行")
+                # テキスト層の残るページ・部分的なテキストからOCR言語を判定
+                hint_text = '\n'.join(p['text'] for p in full_text)
+                ocr_result = self._pdf_to_image_ocr(pdf_path, ocr_pages, hint_text)
+                for ocr_page in ocr_result:
+                    page = full_text[ocr_page['page_number'] - 1]
+                    page.update({
+                        "text": ocr_page['ocr_text'],
+                        "char_count": len(ocr_page['ocr_text']),
+                        "source": "ocr",
+                        "ocr_confidence": ocr_page['confidence']
+                    })
+                result['content']['ocr_results'] = ocr_result
+                # 画像化・OCRに失敗したページ（PDF_MAX_PAGES 超過分は含めない）
+                ocr_done = {ocr_page['page_number'] for ocr_page in ocr_result}
+                failed_pages = [n for n in sorted(ocr_pages)[:PDF_MAX_PAGES] if n not in ocr_done]
+                if failed_pages:
+                    result['content']['ocr_failed_pages'] = failed_pages
+            
+            result['content']['pages'] = full_text
+            result['content']['total_text'] = '\n\n'.join([p['text'] for p in full_text])
             
             result['processed_file_path'] = pdf_path
             logger.info(f"✅ PDF処理完了")
@@ -296,33 +386,124 @@ class FileProcessor:
             result['error'] = str(e)
             return result
     
-    def _pdf_to_image_ocr(self, pdf_path: str) -> List[Dict]:
-        """PDFを画像化してOCR"""
+    def _extract_page_layer(self, page) -> Tuple[str, Dict]:
+        """ページのテキスト層と構成を取得し、OCRが必要か判定
+        
+        テキスト層の文字数が OCR_PAGE_MIN_TEXT_CHARS 未満で、画像がページの
+        OCR_PAGE_IMAGE_COVERAGE 以上を占める（またはフォントがない）ページをOCR対象とします。
+        
+        Returns:
+            (テキスト層, {"has_fonts", "image_coverage", "needs_ocr"})
+        """
         try:
-            # PDF→画像変換
-            images = convert_from_path(pdf_path, dpi=300)
-            
-            ocr_results = []
-            for i, image in enumerate(images):
-                # 一時保存
-                temp_image_path = os.path.join(
-                    self.temp_dir,
-                    f"pdf_page_{i+1}.jpg"
-                )
-                image.save(temp_image_path, 'JPEG')
-                
-                # OCR実行
-                ocr_result = self._perform_ocr(temp_image_path)
-                ocr_results.append({
-                    "page_number": i + 1,
-                    "ocr_text": ocr_result['text'],
-                    "confidence": ocr_result['confidence']
-                })
-                
-                # 一時ファイル削除
-                os.remove(temp_image_path)
-            
-            return ocr_results
+            resources = page.get('/Resources')
+            resources = resources.get_object() if resources is not None else {}
+            fonts = resources.get('/Font')
+            has_fonts = bool(fonts.get_object()) if fonts is not None else False
+            
+            image_names = set()
+            xobjects = resources.get('/XObject')
+            if xobjects is not None:
+                for name, ref in xobjects.get_object().items():
+                    if ref.get_object().get('/Subtype') == '/Image':
+                        image_names.add(name)
+            
+            # 画像を描画する時点の変換行列から、画像がページに占める面積を集計
+            image_areas = []
+            
+            def visitor(operator, operands, cm, tm):
+                if operator == b'Do' and operands and operands[0] in image_names:
+                    image_areas.append(abs(cm[0] * cm[3] - cm[1] * cm[2]))
+            
+            page_text = page.extract_text(visitor_operand_before=visitor) or ''
+            page_area = float(page.mediabox.width) * float(page.mediabox.height)
+            image_coverage = min(1.0, sum(image_areas) / page_area) if page_area else 0.0
+        except Exception as e:
+            logger.debug(f"ページ構成の判定失敗（文字数のみで判定）: {e}")
+            page_text = page.extract_text() or ''
+            has_fonts = True
+            image_coverage = 1.0
+        
+        text_chars = len(page_text.strip())
+        needs_ocr = text_chars < OCR_PAGE_MIN_TEXT_CHARS and (
+            image_coverage >= OCR_PAGE_IMAGE_COVERAGE or not has_fonts
+        )
+        return page_text, {
+            "has_fonts": has_fonts,
+            "image_coverage": round(image_coverage, 2),
+            "needs_ocr": needs_ocr
+        }
+    
+    def _pdf_to_image_ocr(self, pdf_path: str, page_numbers: List[int], hint_text: str = '') -> List[Dict]:
+        """PDFの指定ページを画像化してOCR
+        
+        連続するページを OCR_PAGES_PER_TASK ページずつ子プロセスで画像化・OCRし、ページ順に結果を集めます。
+        PDF_MAX_PAGES を超えるページは処理しません。
+        一部の範囲が失敗した場合（破損ページ等）はその範囲のみ除き、成功したページを返します。
+        事件の指定・テキスト層（hint_text）でOCR言語が決まる場合は全ページ共通とし、ページごとのOSDを省略します。
+        """
+        if len(page_numbers) > PDF_MAX_PAGES:
+            logger.warning(f"⚠️ OCR対象{len(page_numbers)}ページ中、先頭{PDF_MAX_PAGES}ページのみOCRします（PDF_MAX_PAGES）")
+        page_numbers = sorted(page_numbers)[:PDF_MAX_PAGES]
+        
+        # 連続するページを OCR_PAGES_PER_TASK ページずつの範囲にまとめる
+        ranges = []
+        for page_number in page_numbers:
+            if ranges and ranges[-1][1] == page_number - 1 and page_number - ranges[-1][0] < OCR_PAGES_PER_TASK:
+                ranges[-1] = (ranges[-1][0], page_number)
+            else:
+                ranges.append((page_number, page_number))
+        if not ranges:
+            return []
+        
+        language_plan = ocr_language_selector.plan_from_hints(hint_text, ocr_language_selector.case_languages)
+        if language_plan:
+            logger.info(f"   OCR言語: {'+'.join(language_plan['languages'])}（{language_plan['reason']}）")
+        
+        try:
+            # 範囲ごとの結果（失敗した範囲は含めない）
+            range_pages = {}
+            remaining = list(ranges)
+            if OCR_MAX_WORKERS > 1 and len(ranges) > 1:
+                logger.info(f"   {len(page_numbers)}ページを最大{OCR_MAX_WORKERS}プロセスでOCR")
+                try:
+                    pool = _get_ocr_pool()
+                    futures = {
+                        page_range: pool.submit(_ocr_pdf_page_range, pdf_path, page_range[0], page_range[1],
+                                                PDF_DPI, language_plan)
+                        for page_range in ranges
+                    }
+                    for page_range, future in futures.items():
+                        try:
+                            range_pages[page_range] = future.result()
+                        except (BrokenProcessPool, OSError):
+                            raise
+                        except Exception as e:
+                            logger.error(f"❌ {page_range[0]}-{page_range[1]}ページのOCR失敗（スキップ）: {e}")
+                        remaining.remove(page_range)
+                except (BrokenProcessPool, OSError) as e:
+                    # プロセスを起動できない環境等では未完了の範囲をこのプロセス内で実行
+                    logger.warning(f"⚠️ 並列OCR失敗（逐次処理で再実行）: {e}")
+                    _reset_ocr_pool()
+            
+            for first, last in remaining:
+                try:
+                    range_pages[(first, last)] = _ocr_pdf_page_range(pdf_path, first, last, PDF_DPI, language_plan)
+                except Exception as e:
+                    logger.error(f"❌ {first}-{last}ページのOCR失敗（スキップ）: {e}")
+            
+            pages = [page for page_range in ranges for page in range_pages.get(page_range, [])]
+            
+            # 子プロセスでのキャッシュ参照結果・言語の選択をこのプロセスの統計に集計
+            cache_hits = 0
+            for page in pages:
+                cache_hits += page.pop('cache_hit', False)
+                plan = page.pop('language_selection', None)
+                if plan:
+                    ocr_language_selector.record(plan)
+            if cache_hits:
+                logger.info(f"   OCRキャッシュヒット: {cache_hits}/{len(pages)}ページ")
+            return pages
             
         except Exception as e:
             logger.error(f"❌ PDF→画像OCR失敗: {e}")
@@ -616,10 +797,7 @@ class FileProcessor:
     def _extract_audio_from_video(self, video_path: str) -> Optional[str]:
         """動画から音声抽出"""
         try:
-            output_path = os.path.join(
-                self.temp_dir,
-                f"{Path(video_path).stem}_audio.mp3"
-            )
+            output_path = self._derived_path(video_path, "_audio.mp3")
             
             cmd = [
                 'ffmpeg',
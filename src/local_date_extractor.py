@@ -0,0 +1,356 @@
+"""
+ローカル日付抽出（AI分析前の高速判定）
+- 画像のEXIF撮影日時（DateTimeOriginal）
+- PDFの作成日時（/CreationDate）、Word文書のコアプロパティ
+- ファイル名の日付パターン（IMG_20210815、2021-08-15 等）
+- テキスト層・OCRテキスト中の日付（和暦 令和/平成/昭和、YYYY年M月D日 等）
+
+各候補に信頼度を付け、候補が一致して十分な信頼度があればAIを呼ばずに確定します。
+候補が食い違う・見つからない場合のみAI分析（extract_date_from_evidence）に委ねます。
+"""
+
+import os
+import re
+import logging
+import unicodedata
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from global_config import *
+
+logger = logging.getLogger(__name__)
+
+# 画像処理
+try:
+    from PIL import Image
+    PILLOW_AVAILABLE = True
+except ImportError:
+    PILLOW_AVAILABLE = False
+
+# PDF処理
+try:
+    import PyPDF2
+    PYPDF2_AVAILABLE = True
+except ImportError:
+    PYPDF2_AVAILABLE = False
+
+# Word文書処理
+try:
+    from docx import Document
+    DOCX_AVAILABLE = True
+except ImportError:
+    DOCX_AVAILABLE = False
+
+# OCR
+from src.ocr_engine import get_ocr_backend, OCR_AVAILABLE
+from src.ocr_language_selector import ocr_language_selector
+
+# EXIFタグID
+EXIF_DATETIME_ORIGINAL = 36867
+EXIF_DATETIME = 306
+
+# 和暦の元年（西暦）
+ERA_START_YEARS = {
+    '令和': 2019,
+    '平成': 1989,
+    '昭和': 1926
+}
+
+# 作成日付であることを示す語（直前にあれば信頼度を上げる）
+DATE_KEYWORDS = ['作成日', '作成', '日付', '契約日', '締結日', '発行日', '発行', '交付日', '受付日', '年月日', '提出日']
+
+# 信頼度（出典別）
+CONFIDENCE_EXIF = 0.9
+CONFIDENCE_EXIF_MODIFIED = 0.5  # EXIFの DateTime（最終編集日時、DateTimeOriginal がない場合のみ使用）
+CONFIDENCE_EXIF_DOCUMENT = 0.5  # 文書を撮影した画像の撮影日時（文書の作成日とは限らない）
+CONFIDENCE_CONTENT_KEYWORD = 0.9
+CONFIDENCE_CONTENT_HEADER = 0.8
+CONFIDENCE_FILENAME = 0.75
+CONFIDENCE_CONTENT_OTHER = 0.4
+CONFIDENCE_FILE_METADATA = 0.5  # PDF/Word作成日時はスキャン・テンプレート作成日の場合がある
+
+# 本文中の日付パターン（NFKC正規化後のテキストに適用）
+_ERA_PATTERN = re.compile(r'(令和|平成|昭和)\s*(元|\d{1,2})\s*年\s*(\d{1,2})\s*月\s*(\d{1,2})\s*日')
+_KANJI_DATE_PATTERN = re.compile(r'(?<!\d)((?:19|20)\d{2})\s*年\s*(\d{1,2})\s*月\s*(\d{1,2})\s*日')
+_NUMERIC_DATE_PATTERN = re.compile(r'(?<!\d)((?:19|20)\d{2})[/.\-](\d{1,2})[/.\-](\d{1,2})(?!\d)')
+
+# ファイル名の日付パターン（IMG_20210815、2021-08-15、2021_08_15 等）
+_FILENAME_DATE_PATTERN = re.compile(r'(?<!\d)((?:19|20)\d{2})[-_.]?(0[1-9]|1[0-2])[-_.]?(0[1-9]|[12]\d|3[01])(?!\d)')
+
+# PDFの日付文字列（D:20210815123000+09'00'）
+_PDF_DATE_PATTERN = re.compile(r'D?:?((?:19|20)\d{2})(\d{2})(\d{2})')
+
+
+class LocalDateExtractor:
+    """AIを使わずに証拠の作成年月日を推定"""
+
+    def __init__(self,
+                 min_confidence: float = None,
+                 conflict_margin: float = None,
+                 text_chars: int = None):
+        """初期化
+
+        Args:
+            min_confidence: ローカル抽出で確定する最低信頼度
+            conflict_margin: 次点候補との信頼度差がこれ未満なら「食い違い」とみなす
+            text_chars: 日付を探すテキストの最大文字数
+        """
+        self.min_confidence = LOCAL_DATE_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        self.conflict_margin = LOCAL_DATE_CONFLICT_MARGIN if conflict_margin is None else conflict_margin
+        self.text_chars = text_chars or LOCAL_DATE_TEXT_CHARS
+
+    def extract(self, file_path: str, file_type: str, original_filename: str) -> Dict:
+        """日付候補を抽出し、確定できるか判定
+
+        Returns:
+            {
+                "extracted_dates": [{"date", "confidence", "context", "source"}],
+                "primary_date": "YYYY-MM-DD" or None,
+                "date_source": "content" | "filename" | "metadata" | "unknown",
+                "decisive": bool  # TrueならAI分析不要
+            }
+        """
+        candidates = []
+        candidates += self._from_filename(original_filename or os.path.basename(file_path))
+
+        if file_type == 'image':
+            # 文書を撮影した画像では撮影日時だけで確定せず、本文の日付と比較する
+            # （OCR結果はOCRキャッシュに保存され、FileProcessorのOCRで再利用される）
+            text, ocr_confidence = self._read_image_ocr(file_path)
+            candidates += self._from_exif(file_path, self._is_document_image(text, ocr_confidence))
+            candidates += self._from_text(text)
+        elif file_type == 'pdf':
+            candidates += self._from_pdf_metadata(file_path)
+        elif file_type == 'document' and file_path.lower().endswith('.docx'):
+            candidates += self._from_docx_metadata(file_path)
+
+        if file_type != 'image':
+            candidates += self._from_text(self._read_text(file_path, file_type))
+
+        return self._decide(candidates)
+
+    # ================================
+    # 候補の判定
+    # ================================
+
+    def _decide(self, candidates: List[Dict]) -> Dict:
+        """同じ日付の候補をまとめて主要日付を決定"""
+        scores: Dict[str, float] = {}
+        best: Dict[str, Dict] = {}
+        sources: Dict[str, set] = {}
+        for candidate in candidates:
+            key = candidate['date']
+            if key not in best or candidate['confidence'] > best[key]['confidence']:
+                best[key] = candidate
+            sources.setdefault(key, set()).add(candidate['source'])
+
+        # 異なる出典（ファイル名・メタデータ・本文）が一致すれば信頼度を加算
+        for key, candidate in best.items():
+            scores[key] = min(0.99, candidate['confidence'] + 0.1 * (len(sources[key]) - 1))
+
+        ranked = sorted(scores, key=lambda d: scores[d], reverse=True)
+        extracted_dates = [
+            {**best[d], "confidence": round(scores[d], 2)} for d in ranked
+        ]
+
+        if not ranked:
+            return {
+                "extracted_dates": [],
+                "primary_date": None,
+                "date_source": "unknown",
+                "decisive": False
+            }
+
+        top = ranked[0]
+        runner_up = scores[ranked[1]] if len(ranked) > 1 else 0.0
+        decisive = scores[top] >= self.min_confidence and scores[top] - runner_up >= self.conflict_margin
+
+        return {
+            "extracted_dates": extracted_dates,
+            "primary_date": top,
+            "date_source": best[top]['source'],
+            "decisive": decisive
+        }
+
+    # ================================
+    # 出典別の候補抽出
+    # ================================
+
+    def _from_filename(self, filename: str) -> List[Dict]:
+        """ファイル名の日付"""
+        candidates = []
+        stem = os.path.splitext(filename)[0]
+        for match in _FILENAME_DATE_PATTERN.finditer(stem):
+            parsed = self._to_date(*match.groups())
+            if parsed:
+                candidates.append(self._candidate(parsed, CONFIDENCE_FILENAME, f"ファイル名: {filename}", "filename"))
+
+        # 和暦・YYYY年M月D日形式のファイル名
+        for candidate in self._from_text(stem):
+            candidates.append(self._candidate(candidate['date'], CONFIDENCE_FILENAME,
+                                              f"ファイル名: {filename}", "filename"))
+        return candidates
+
+    def _from_exif(self, image_path: str, document_like: bool = False) -> List[Dict]:
+        """EXIFの撮影日時
+
+        Args:
+            document_like: 文書を撮影した画像か（撮影日時の信頼度を下げる）
+        """
+        if not PILLOW_AVAILABLE:
+            return []
+        try:
+            with Image.open(image_path) as img:
+                exif = img.getexif()
+                # DateTimeOriginalはExif IFD内にある
+                value = exif.get_ifd(0x8769).get(EXIF_DATETIME_ORIGINAL)
+                confidence, label = CONFIDENCE_EXIF, "EXIF撮影日時"
+                if not value:
+                    value = exif.get(EXIF_DATETIME)
+                    confidence, label = CONFIDENCE_EXIF_MODIFIED, "EXIF更新日時"
+        except Exception as e:
+            logger.debug(f"EXIF読み込み失敗: {e}")
+            return []
+
+        if document_like:
+            confidence = min(confidence, CONFIDENCE_EXIF_DOCUMENT)
+
+        match = re.match(r'((?:19|20)\d{2})[:\-](\d{2})[:\-](\d{2})', str(value or ''))
+        parsed = self._to_date(*match.groups()) if match else None
+        return [self._candidate(parsed, confidence, f"{label}: {value}", "metadata")] if parsed else []
+
+    def _from_pdf_metadata(self, pdf_path: str) -> List[Dict]:
+        """PDFの作成日時"""
+        if not PYPDF2_AVAILABLE:
+            return []
+        try:
+            with open(pdf_path, 'rb') as f:
+                info = PyPDF2.PdfReader(f).metadata or {}
+                value = str(info.get('/CreationDate') or '')
+        except Exception as e:
+            logger.debug(f"PDFメタデータ読み込み失敗: {e}")
+            return []
+
+        match = _PDF_DATE_PATTERN.search(value)
+        parsed = self._to_date(*match.groups()) if match else None
+        return [self._candidate(parsed, CONFIDENCE_FILE_METADATA, f"PDF作成日時: {value}", "metadata")] if parsed else []
+
+    def _from_docx_metadata(self, docx_path: str) -> List[Dict]:
+        """Word文書の作成日時"""
+        if not DOCX_AVAILABLE:
+            return []
+        try:
+            created = Document(docx_path).core_properties.created
+        except Exception as e:
+            logger.debug(f"Word文書プロパティ読み込み失敗: {e}")
+            return []
+
+        if not created:
+            return []
+        parsed = self._to_date(created.year, created.month, created.day)
+        return [self._candidate(parsed, CONFIDENCE_FILE_METADATA,
+                                f"Word作成日時: {created.isoformat()}", "metadata")] if parsed else []
+
+    def _from_text(self, text: str) -> List[Dict]:
+        """本文（テキスト層・OCR）中の日付"""
+        if not text:
+            return []
+
+        text = unicodedata.normalize('NFKC', text[:self.text_chars])
+        header_limit = min(len(text), 300)
+        candidates = []
+
+        matches = []
+        for match in _ERA_PATTERN.finditer(text):
+            era, year, month, day = match.groups()
+            year = 1 if year == '元' else int(year)
+            matches.append((match, self._to_date(ERA_START_YEARS[era] + year - 1, month, day)))
+        for pattern in (_KANJI_DATE_PATTERN, _NUMERIC_DATE_PATTERN):
+            for match in pattern.finditer(text):
+                matches.append((match, self._to_date(*match.groups())))
+
+        for match, parsed in matches:
+            if not parsed:
+                continue
+            before = text[max(0, match.start() - 10):match.start()]
+            if any(keyword in before for keyword in DATE_KEYWORDS):
+                confidence = CONFIDENCE_CONTENT_KEYWORD
+            elif match.start() < header_limit:
+                confidence = CONFIDENCE_CONTENT_HEADER
+            else:
+                confidence = CONFIDENCE_CONTENT_OTHER
+            context = text[max(0, match.start() - 15):match.end()].replace('\n', ' ').strip()
+            candidates.append(self._candidate(parsed, confidence, f"本文: {context}", "content"))
+
+        # 本文中の日付は先頭付近のものを優先し、同じ日付は最も高い信頼度のみ
+        unique = {}
+        for candidate in candidates:
+            if candidate['date'] not in unique or candidate['confidence'] > unique[candidate['date']]['confidence']:
+                unique[candidate['date']] = candidate
+        return list(unique.values())
+
+    def _read_text(self, file_path: str, file_type: str) -> str:
+        """テキスト層（なければOCR）を先頭部分のみ取得"""
+        try:
+            if file_type == 'pdf' and PYPDF2_AVAILABLE:
+                with open(file_path, 'rb') as f:
+                    reader = PyPDF2.PdfReader(f)
+                    return '\n'.join(
+                        (page.extract_text() or '') for page in reader.pages[:LOCAL_DATE_TEXT_PAGES]
+                    )
+
+            if file_type == 'document' and file_path.lower().endswith('.docx') and DOCX_AVAILABLE:
+                return '\n'.join(p.text for p in Document(file_path).paragraphs[:50])
+
+            if file_type == 'text':
+                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    return f.read(self.text_chars)
+
+            if file_type == 'image':
+                return self._read_image_ocr(file_path)[0]
+        except Exception as e:
+            logger.debug(f"日付抽出用テキスト取得失敗: {e}")
+        return ''
+
+    def _read_image_ocr(self, image_path: str) -> Tuple[str, float]:
+        """画像のOCRテキストと信頼度（OCR不可の場合は ('', 0.0)）"""
+        if not (OCR_ENABLED and OCR_AVAILABLE and PILLOW_AVAILABLE):
+            return '', 0.0
+        try:
+            with Image.open(image_path) as img:
+                ocr_result, _, _ = ocr_language_selector.recognize(
+                    get_ocr_backend(), img, filename=os.path.basename(image_path),
+                    case_languages=ocr_language_selector.case_languages
+                )
+            return ocr_result['text'], ocr_result.get('confidence', 0.0)
+        except Exception as e:
+            logger.debug(f"日付抽出用OCR失敗: {e}")
+            return '', 0.0
+
+    def _is_document_image(self, text: str, ocr_confidence: float) -> bool:
+        """文書を撮影した画像か（Vision詳細度の選択と同じ基準: 信頼できるOCR文字数）"""
+        if ocr_confidence < VISION_DETAIL_MIN_OCR_CONFIDENCE:
+            return False
+        return sum(1 for ch in text if not ch.isspace()) >= VISION_DETAIL_TEXT_CHARS
+
+    # ================================
+    # ユーティリティ
+    # ================================
+
+    def _to_date(self, year, month, day) -> Optional[str]:
+        """妥当な日付ならYYYY-MM-DD文字列（未来日・1900年以前は除外）"""
+        try:
+            parsed = date(int(year), int(month), int(day))
+        except (TypeError, ValueError):
+            return None
+        if parsed.year < 1900 or parsed > datetime.now().date():
+            return None
+        return parsed.isoformat()
+
+    def _candidate(self, date_str: str, confidence: float, context: str, source: str) -> Dict:
+        return {
+            "date": date_str,
+            "confidence": confidence,
+            "context": context,
+            "source": source
+        }
@@ -0,0 +1,220 @@
+"""
+OCR結果の永続キャッシュ
+- 画像化済みの画素データのSHA-256・言語・OCRエンジンのバージョン・DPIをキーに保存
+- 本文・信頼度・単語の位置（build_ocr_result の形式）を保持
+- 合計サイズが OCR_CACHE_MAX_MB を超えた場合は最終利用が古いものから削除（LRU）
+  （合計サイズは保存ごとに概算で加算し、上限を超えた時だけディレクトリを走査）
+
+再分析・同一証拠の再処理・複数事件に同じ添付ファイルがある場合にOCRを省略します。
+OCR結果は画素が同じなら変わらないため有効期限は設けません。
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from global_config import *
+
+logger = logging.getLogger(__name__)
+
+# 上限を超えた場合に削除後の合計サイズをこの割合まで下げる（削除のたびに走査しないように）
+EVICT_TARGET_RATIO = 0.9
+
+
+class OCRCache:
+    """OCR結果のディスクキャッシュ"""
+
+    def __init__(self,
+                 cache_dir: str = None,
+                 max_bytes: int = None,
+                 enabled: bool = None):
+        """初期化
+
+        Args:
+            cache_dir: キャッシュディレクトリ（未指定時は LOCAL_CACHE_DIR/ocr）
+            max_bytes: 合計サイズの上限（未指定時は OCR_CACHE_MAX_MB）
+            enabled: キャッシュを有効にするか（未指定時は ENABLE_OCR_CACHE）
+        """
+        self.cache_dir = cache_dir or os.path.join(LOCAL_CACHE_DIR, "ocr")
+        self.max_bytes = max_bytes or OCR_CACHE_MAX_MB * 1024 * 1024
+        self.enabled = ENABLE_OCR_CACHE if enabled is None else enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 合計サイズの概算（初回の保存時に1回だけ走査して初期化）
+        self._estimated_bytes: Optional[int] = None
+
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(image,
+                 languages: List[str],
+                 engine_version: str,
+                 dpi: Optional[int] = None) -> str:
+        """キャッシュキーを生成
+
+        Args:
+            image: OCRする画像（PIL.Image、画素データをハッシュ）
+            languages: OCR言語
+            engine_version: OCRエンジンのバージョン
+            dpi: PDFを画像化したDPI（画像ファイルはNone）
+
+        Returns:
+            キャッシュキー（SHA-256）
+        """
+        image_hash = hashlib.sha256()
+        image_hash.update(f"{image.mode}:{image.size}".encode('utf-8'))
+        image_hash.update(image.tobytes())
+        key_source = f"{image_hash.hexdigest()}:{'+'.join(languages)}:{engine_version}:{dpi or 'native'}"
+        return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        """キャッシュファイルのパス"""
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def recognize(self,
+                  backend,
+                  image,
+                  languages: Optional[List[str]] = None,
+                  dpi: Optional[int] = None) -> Tuple[Dict, bool]:
+        """キャッシュを確認し、なければOCRして保存
+
+        ヒット/ミス数は記録しません（子プロセスでの実行分も集計できるよう、呼び出し側で record を呼ぶこと）。
+
+        Returns:
+            (OCR結果, キャッシュヒットしたか)
+        """
+        languages = languages or OCR_LANGUAGES
+        if not self.enabled:
+            return backend.recognize(image, languages), False
+
+        key = self.make_key(image, languages, backend.version(), dpi)
+        cached = self.get(key)
+        if cached is not None:
+            return cached, True
+
+        result = backend.recognize(image, languages)
+        if not result.get('error'):
+            self.put(key, result)
+        return result, False
+
+    def get(self, key: str) -> Optional[Dict]:
+        """キャッシュからOCR結果を取得（未登録時はNone）"""
+        if not self.enabled:
+            return None
+
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ OCRキャッシュ読み込み失敗（破棄します）: {e}")
+            self._remove(path)
+            return None
+
+        # LRU用に最終利用時刻を更新
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return result
+
+    def put(self, key: str, result: Dict):
+        """OCR結果をキャッシュに保存"""
+        if not self.enabled:
+            return
+
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"⚠️ OCRキャッシュ保存失敗: {e}")
+            self._remove(tmp_path)
+            return
+
+        with self._lock:
+            if self._estimated_bytes is None:
+                self._estimated_bytes = sum(entry_size for _, entry_size, _ in self._scan())
+            else:
+                self._estimated_bytes += size
+            if self._estimated_bytes > self.max_bytes:
+                self._evict()
+
+    def _scan(self) -> List[Tuple[float, int, str]]:
+        """キャッシュファイルの一覧（最終利用時刻, サイズ, パス）"""
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # 他のプロセスが削除した
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        """最終利用が古い順に削除し、合計サイズを上限の EVICT_TARGET_RATIO まで下げる
+
+        概算は他のプロセスの保存・削除を含まないため、実際のサイズを走査し直してから判断します。
+        呼び出し側で self._lock を取得すること。
+        """
+        entries = self._scan()
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_bytes:
+            target = self.max_bytes * EVICT_TARGET_RATIO
+            entries.sort()
+            removed = 0
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                self._remove(path)
+                total -= size
+                removed += 1
+            logger.debug(f"OCRキャッシュ削除（LRU）: {removed}件")
+        self._estimated_bytes = total
+
+    def _remove(self, path: str):
+        """キャッシュファイルを削除（存在しなくてもエラーにしない）"""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def record(self, hit: bool):
+        """ヒット/ミス数を記録"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_stats(self) -> Dict:
+        """キャッシュ統計を取得"""
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+# プロセス全体で共有するOCRキャッシュ
+ocr_cache = OCRCache()
@@ -0,0 +1,305 @@
+"""
+OCRエンジン（バックエンドの抽象化）
+- tesserocr: Tesseractをプロセス内で実行（TessBaseAPIを言語ごとにプールし、言語データの再読み込みを省く）
+- pytesseract: 呼び出しごとに tesseract コマンドを起動（tesserocr未導入時のフォールバック）
+- どちらも image_to_data 形式の結果から本文・信頼度・単語・行構造を組み立て
+
+PDFの各ページ・一括処理の各証拠で同じエンジンを再利用します（get_ocr_backend）。
+"""
+
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from global_config import *
+
+logger = logging.getLogger(__name__)
+
+# Tesseract（プロセス内、オプショナル）
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+# Tesseract（コマンド起動）
+try:
+    import pytesseract
+    PYTESSERACT_AVAILABLE = True
+except ImportError:
+    PYTESSERACT_AVAILABLE = False
+
+OCR_AVAILABLE = TESSEROCR_AVAILABLE or PYTESSERACT_AVAILABLE
+
+# image_to_data の項目
+DATA_FIELDS = ['level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+               'left', 'top', 'width', 'height', 'conf', 'text']
+
+
+def build_ocr_result(data: Dict, languages: Optional[List[str]] = None) -> Dict:
+    """image_to_data の結果から本文・単語・行を組み立て
+
+    行は改行、段落・ブロックの区切りは空行で連結します（image_to_string と同じ形式）。
+
+    Returns:
+        {"text", "confidence", "language", "word_count", "char_count",
+         "words": [{"text", "confidence", "box": [left, top, width, height], "line"}],
+         "lines": [{"text", "confidence", "box"}]}
+    """
+    languages = languages or OCR_LANGUAGES
+    words = []
+    lines = []
+    line_index = {}
+    previous_paragraph = None
+
+    for i, word_text in enumerate(data['text']):
+        conf = float(data['conf'][i])
+        word_text = (word_text or '').strip()
+        if conf < 0 or not word_text:
+            continue
+
+        box = [data['left'][i], data['top'][i], data['width'][i], data['height'][i]]
+        paragraph_key = (data['page_num'][i], data['block_num'][i], data['par_num'][i])
+        line_key = paragraph_key + (data['line_num'][i],)
+
+        if line_key not in line_index:
+            new_paragraph = previous_paragraph is not None and paragraph_key != previous_paragraph
+            previous_paragraph = paragraph_key
+            line_index[line_key] = len(lines)
+            lines.append({"words": [], "box": list(box), "new_paragraph": new_paragraph})
+
+        line = lines[line_index[line_key]]
+        line['words'].append((word_text, conf))
+        left = min(line['box'][0], box[0])
+        top = min(line['box'][1], box[1])
+        right = max(line['box'][0] + line['box'][2], box[0] + box[2])
+        bottom = max(line['box'][1] + line['box'][3], box[1] + box[3])
+        line['box'] = [left, top, right - left, bottom - top]
+
+        words.append({
+            "text": word_text,
+            "confidence": round(conf / 100, 2),
+            "box": box,
+            "line": line_index[line_key]
+        })
+
+    text_lines = []
+    line_results = []
+    for line in lines:
+        if line['new_paragraph']:
+            text_lines.append('')
+        line_text = ' '.join(word for word, _ in line['words'])
+        text_lines.append(line_text)
+        line_results.append({
+            "text": line_text,
+            "confidence": round(sum(c for _, c in line['words']) / len(line['words']) / 100, 2),
+            "box": line['box']
+        })
+
+    text = '\n'.join(text_lines).strip()
+    avg_confidence = sum(w['confidence'] for w in words) / len(words) if words else 0.0
+
+    return {
+        "text": text,
+        "confidence": round(avg_confidence, 2),
+        "language": languages[0],
+        "word_count": len(words),
+        "char_count": len(text),
+        "words": words,
+        "lines": line_results
+    }
+
+
+class OCRBackend:
+    """OCRバックエンドの共通インターフェース"""
+
+    name = 'base'
+
+    def image_to_data(self, image, lang: str) -> Dict:
+        """pytesseract.image_to_data（Output.DICT）と同じ形式の結果"""
+        raise NotImplementedError
+
+    def version(self) -> str:
+        """エンジンのバージョン（OCR結果のキャッシュキー等に使用、初回のみ取得）"""
+        if getattr(self, '_version', None) is None:
+            self._version = self._get_version()
+        return self._version
+
+    def _get_version(self) -> str:
+        raise NotImplementedError
+
+    def detect_script(self, image) -> Optional[Dict]:
+        """OSD（文字種・向きの判定のみ、文字認識はしない）で文字種を判定
+
+        Returns:
+            {"script": "Japanese" / "Han" / "Latin" 等, "confidence": 判定の確信度}
+            （文字が少ない等で判定できない場合はNone）
+        """
+        raise NotImplementedError
+
+    def recognize(self, image, languages: Optional[List[str]] = None) -> Dict:
+        """OCR実行（build_ocr_result の形式）
+
+        Args:
+            image: 読み込み済みの画像（PIL.Image）
+            languages: 言語（未指定時は OCR_LANGUAGES）
+        """
+        languages = languages or OCR_LANGUAGES
+        data = self.image_to_data(image, '+'.join(languages))
+        return build_ocr_result(data, languages)
+
+
+class PytesseractBackend(OCRBackend):
+    """tesseract コマンドを呼び出しごとに起動"""
+
+    name = 'pytesseract'
+
+    def image_to_data(self, image, lang: str) -> Dict:
+        return pytesseract.image_to_data(image, lang=lang, output_type=pytesseract.Output.DICT)
+
+    def detect_script(self, image) -> Optional[Dict]:
+        try:
+            osd = pytesseract.image_to_osd(image, output_type=pytesseract.Output.DICT)
+        except pytesseract.TesseractError as e:
+            logger.debug(f"OSD判定不可: {e}")
+            return None
+        return {"script": osd.get('script'), "confidence": float(osd.get('script_conf') or 0.0)}
+
+    def _get_version(self) -> str:
+        return f"pytesseract/{pytesseract.get_tesseract_version()}"
+
+
+class TesserocrBackend(OCRBackend):
+    """TessBaseAPIを言語ごとにプールして再利用（言語データの読み込みは初回のみ）
+
+    呼び出しごとにプールから取り出して返却します。スレッドには紐付けないため、
+    一括処理ごとにワーカースレッドが入れ替わってもTessBaseAPIは増え続けません。
+    返却時に OCR_ENGINE_POOL_SIZE を超える分は解放します。
+    """
+
+    name = 'tesserocr'
+
+    def __init__(self, pool_size: int = None):
+        self.pool_size = pool_size or OCR_ENGINE_POOL_SIZE
+        self._idle: Dict[Tuple, List] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _checkout(self, lang: str, psm=None):
+        """TessBaseAPIを取り出し、使用後にプールへ返却"""
+        key = (lang, psm)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            api = idle.pop() if idle else None
+        if api is None:
+            if psm is None:
+                api = tesserocr.PyTessBaseAPI(lang=lang)
+            else:
+                api = tesserocr.PyTessBaseAPI(lang=lang, psm=psm)
+            logger.debug(f"TessBaseAPIを初期化: {lang}（{threading.current_thread().name}）")
+
+        try:
+            yield api
+        finally:
+            api.Clear()
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.pool_size:
+                    idle.append(api)
+                    api = None
+            if api is not None:
+                self._end(api)
+
+    def _end(self, api):
+        try:
+            api.End()
+        except Exception:
+            pass
+
+    def image_to_data(self, image, lang: str) -> Dict:
+        data = {field: [] for field in DATA_FIELDS}
+        with self._checkout(lang) as api:
+            api.SetImage(image)
+            api.Recognize()
+            iterator = api.GetIterator()
+            if iterator is None:
+                return data
+
+            level = tesserocr.RIL.WORD
+            block_num = par_num = line_num = word_num = 0
+            for item in tesserocr.iterate_level(iterator, level):
+                if item.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+                    block_num += 1
+                    par_num = line_num = 0
+                if item.IsAtBeginningOf(tesserocr.RIL.PARA):
+                    par_num += 1
+                    line_num = 0
+                if item.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                    line_num += 1
+                    word_num = 0
+                word_num += 1
+
+                bbox = item.BoundingBox(level)
+                if bbox is None:
+                    continue
+                left, top, right, bottom = bbox
+                values = [5, 1, block_num, par_num, line_num, word_num,
+                          left, top, right - left, bottom - top,
+                          item.Confidence(level), item.GetUTF8Text(level) or '']
+                for field, value in zip(DATA_FIELDS, values):
+                    data[field].append(value)
+            return data
+
+    def detect_script(self, image) -> Optional[Dict]:
+        with self._checkout('osd', psm=tesserocr.PSM.OSD_ONLY) as api:
+            api.SetImage(image)
+            osd = api.DetectOrientationScript()
+        if not osd:
+            return None
+        return {"script": osd.get('script_name'), "confidence": float(osd.get('script_conf') or 0.0)}
+
+    def _get_version(self) -> str:
+        return f"tesserocr/{tesserocr.tesseract_version().splitlines()[0]}"
+
+    def close(self):
+        """プール中のTessBaseAPIを解放"""
+        with self._lock:
+            apis = [api for idle in self._idle.values() for api in idle]
+            self._idle.clear()
+        for api in apis:
+            self._end(api)
+
+
+_backend: Optional[OCRBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_ocr_backend() -> Optional[OCRBackend]:
+    """プロセス全体で共有するOCRバックエンド（OCR_BACKEND に従い選択、利用不可ならNone）"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = _create_backend()
+        return _backend
+
+
+def _create_backend() -> Optional[OCRBackend]:
+    preferred = OCR_BACKEND
+    if preferred in ('auto', 'tesserocr') and TESSEROCR_AVAILABLE:
+        try:
+            backend = TesserocrBackend()
+            backend.version()
+            atexit.register(backend.close)
+            logger.info("✅ OCRエンジン: tesserocr（プロセス内）")
+            return backend
+        except Exception as e:
+            logger.warning(f"⚠️ tesserocr初期化失敗（pytesseractを使用）: {e}")
+    elif preferred == 'tesserocr':
+        logger.warning("⚠️ tesserocr未インストール - pytesseractを使用します")
+
+    if PYTESSERACT_AVAILABLE:
+        logger.info("✅ OCRエンジン: pytesseract")
+        return PytesseractBackend()
+    return None
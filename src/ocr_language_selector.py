@@ -0,0 +1,218 @@
+"""
+OCR言語の自動選択
+- 事件ごとの指定（database.json の metadata.ocr_languages）があればそれを使用
+- テキスト層（PDFの他ページ等）の文字種から判定
+- 判定できなければ縮小画像のOSD（文字種の判定のみ）で判定
+- OSDでも判定できない場合はファイル名、最後は OCR_LANGUAGES 全体
+
+jpn+eng+chi_sim の3言語同時のOCRは1言語の数倍の時間がかかるため、
+画像ごとに必要な言語データのみでOCRします。
+絞り込んだ言語での信頼度が低い場合は OCR_LANGUAGES 全体で再実行します
+（文字を1つも認識しなかった画像は言語の問題ではないため再実行しません）。
+"""
+
+import re
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from global_config import *
+from src.ocr_cache import ocr_cache
+
+logger = logging.getLogger(__name__)
+
+# 文字種の判定に使う文字
+KANA_PATTERN = re.compile(r'[぀-ヿ]')
+HAN_PATTERN = re.compile(r'[一-鿿]')
+LATIN_PATTERN = re.compile(r'[A-Za-z]')
+
+# テキスト層から判定する際の最小文字数
+HINT_MIN_KANA = 5
+HINT_MIN_HAN = 20
+HINT_MIN_LATIN = 50
+
+# ファイル名が日本語の場合の言語（内容は英語等の可能性もあるため英語を残す）
+FILENAME_JAPANESE_LANGUAGES = ['jpn', 'eng']
+
+
+class OCRLanguageSelector:
+    """画像ごとのOCR言語を選択し、言語データの使用回数を集計"""
+
+    def __init__(self):
+        self.case_languages: Optional[List[str]] = None
+        self.pack_counts: Counter = Counter()
+        self.method_counts: Counter = Counter()
+        self.retry_count = 0
+        self._lock = threading.Lock()
+
+    def set_case_languages(self, languages: Optional[List[str]]):
+        """事件ごとのOCR言語を設定（Noneで自動選択に戻す）"""
+        self.case_languages = list(languages) if languages else None
+        if self.case_languages:
+            logger.info(f"📷 OCR言語（事件の指定）: {'+'.join(self.case_languages)}")
+
+    def plan_from_hints(self, hint_text: str = '', case_languages: Optional[List[str]] = None) -> Optional[Dict]:
+        """画像を見ずに決まる言語（事件の指定・テキスト層）
+
+        PDFでは親プロセスで1回判定し、ページごとのOSDを省略するために使います。
+        事件の指定は引数でのみ受け取ります（子プロセスがプロセス内の事件設定を参照しないように、
+        self.case_languages は呼び出し側で渡すこと）。
+
+        Args:
+            hint_text: 同じ文書のテキスト層等
+            case_languages: 事件の指定（通常は self.case_languages）
+
+        Returns:
+            {"languages", "method", "reason"}（決まらない場合はNone）
+        """
+        if case_languages:
+            return self._plan(case_languages, 'case_override', "事件の指定")
+        if not ENABLE_ADAPTIVE_OCR_LANGUAGES:
+            return self._plan(OCR_LANGUAGES, 'disabled', "自動選択が無効")
+
+        script = self._script_from_text(hint_text or '')
+        if script and script in OCR_SCRIPT_LANGUAGES:
+            return self._plan(OCR_SCRIPT_LANGUAGES[script], 'text_layer', f"テキスト層の文字種 {script}")
+        return None
+
+    def select(self,
+               backend,
+               image,
+               hint_text: str = '',
+               filename: str = '',
+               case_languages: Optional[List[str]] = None) -> Dict:
+        """1画像のOCR言語を決定
+
+        Args:
+            backend: OCRバックエンド（OSDに使用）
+            image: OCRする画像（PIL.Image）
+            hint_text: 同じ文書のテキスト層等
+            filename: 元のファイル名
+            case_languages: 事件の指定（plan_from_hints を参照）
+
+        Returns:
+            {"languages", "method", "reason"}
+        """
+        plan = self.plan_from_hints(hint_text, case_languages)
+        if plan:
+            return plan
+
+        osd = self._detect_script(backend, image)
+        if osd and osd['confidence'] >= OCR_LANGUAGE_DETECT_MIN_CONFIDENCE:
+            languages = OCR_SCRIPT_LANGUAGES.get(osd['script'])
+            if languages:
+                return self._plan(languages, 'osd', f"OSDの文字種 {osd['script']}（確信度 {osd['confidence']:.1f}）")
+
+        if filename and (KANA_PATTERN.search(filename) or HAN_PATTERN.search(filename)):
+            return self._plan(FILENAME_JAPANESE_LANGUAGES, 'filename', "日本語のファイル名")
+
+        return self._plan(OCR_LANGUAGES, 'fallback', "文字種を判定できないため全言語")
+
+    def recognize(self,
+                  backend,
+                  image,
+                  dpi: Optional[int] = None,
+                  hint_text: str = '',
+                  filename: str = '',
+                  plan: Optional[Dict] = None,
+                  case_languages: Optional[List[str]] = None) -> Tuple[Dict, bool, Dict]:
+        """言語を選択してOCR（OCRキャッシュを使用）
+
+        使用回数・キャッシュのヒット/ミスは記録しません（子プロセスでの実行分も集計できるよう、
+        呼び出し側で record を呼ぶこと）。再実行した場合は2回分のキャッシュ参照を
+        言語の選択結果の cache_hits（attempts と同じ順）に残します。
+
+        Args:
+            plan: 決定済みの言語（plan_from_hints の結果、未指定時は select で決定）
+            case_languages: 事件の指定（plan_from_hints を参照）
+
+        Returns:
+            (OCR結果, 返したOCR結果がキャッシュヒットか, 言語の選択結果)
+        """
+        plan = dict(plan or self.select(backend, image, hint_text, filename, case_languages))
+        result, cache_hit = ocr_cache.recognize(backend, image, plan['languages'], dpi=dpi)
+
+        plan['attempts'] = [plan['languages']]
+        plan['cache_hits'] = [cache_hit]
+
+        narrowed = set(plan['languages']) != set(OCR_LANGUAGES)
+        if (narrowed and plan['method'] != 'case_override'
+                and result.get('word_count', 0) > 0
+                and result.get('confidence', 0.0) < OCR_LANGUAGE_RETRY_CONFIDENCE):
+            logger.debug(
+                f"OCR信頼度 {result.get('confidence', 0.0):.2f}（{'+'.join(plan['languages'])}）"
+                f" - 全言語で再実行"
+            )
+            retry_result, retry_cache_hit = ocr_cache.recognize(backend, image, OCR_LANGUAGES, dpi=dpi)
+            plan['attempts'].append(list(OCR_LANGUAGES))
+            plan['cache_hits'].append(retry_cache_hit)
+            if retry_result.get('confidence', 0.0) > result.get('confidence', 0.0):
+                result = retry_result
+                cache_hit = retry_cache_hit
+                plan['retried_from'] = plan['languages']
+                plan['languages'] = list(OCR_LANGUAGES)
+
+        return result, cache_hit, plan
+
+    def record(self, plan: Dict):
+        """言語データの使用回数・選択方法・OCRキャッシュのヒット/ミスを集計
+
+        再実行で採用しなかった分も使用回数・キャッシュ参照に含めます。
+        """
+        for cache_hit in plan.get('cache_hits', []):
+            ocr_cache.record(cache_hit)
+        with self._lock:
+            attempts = plan.get('attempts') or [plan['languages']]
+            for languages in attempts:
+                for language in languages:
+                    self.pack_counts[language] += 1
+            self.method_counts[plan['method']] += 1
+            if len(attempts) > 1:
+                self.retry_count += 1
+
+    def get_stats(self) -> Dict:
+        """言語データの使用回数の統計"""
+        with self._lock:
+            total = sum(self.method_counts.values())
+            return {
+                "images": total,
+                "pack_counts": dict(self.pack_counts),
+                "method_counts": dict(self.method_counts),
+                "retries": self.retry_count,
+                "average_packs": round(sum(self.pack_counts.values()) / total, 2) if total else 0.0
+            }
+
+    def _plan(self, languages: List[str], method: str, reason: str) -> Dict:
+        return {"languages": list(languages), "method": method, "reason": reason}
+
+    def _script_from_text(self, text: str) -> Optional[str]:
+        """テキストの文字種（OSDの文字種名で返す、判定できない場合はNone）"""
+        if not text:
+            return None
+        if len(KANA_PATTERN.findall(text)) >= HINT_MIN_KANA:
+            return 'Japanese'
+        han_count = len(HAN_PATTERN.findall(text))
+        if han_count >= HINT_MIN_HAN:
+            return 'Han'
+        if han_count == 0 and len(LATIN_PATTERN.findall(text)) >= HINT_MIN_LATIN:
+            return 'Latin'
+        return None
+
+    def _detect_script(self, backend, image) -> Optional[Dict]:
+        """縮小・グレースケール化した画像でOSDを実行"""
+        try:
+            sample = image.convert('L')
+            if max(sample.size) > OCR_LANGUAGE_DETECT_MAX_SIDE:
+                sample.thumbnail((OCR_LANGUAGE_DETECT_MAX_SIDE, OCR_LANGUAGE_DETECT_MAX_SIDE))
+            try:
+                return backend.detect_script(sample)
+            finally:
+                sample.close()
+        except Exception as e:
+            logger.debug(f"OSDによる文字種判定失敗: {e}")
+            return None
+
+
+# プロセス全体で共有するOCR言語の選択
+ocr_language_selector = OCRLanguageSelector()
@@ -0,0 +1,145 @@
+"""
+複数証拠の並列分析エンジン
+- MAX_PARALLEL_WORKERS に基づくスレッド並列実行
+- AIプロバイダー別の同時リクエスト数制限
+- 投入順の進捗表示
+- 証拠ごとのエラー分離
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from global_config import *
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderConcurrencyLimiter:
+    """AIプロバイダー別の同時リクエスト数制限"""
+
+    def __init__(self, limits: Dict[str, int] = None):
+        """初期化
+
+        Args:
+            limits: プロバイダー名 → 同時リクエスト数上限
+        """
+        self.limits = dict(limits or PROVIDER_CONCURRENCY_LIMITS)
+        self._semaphores = {
+            provider: threading.BoundedSemaphore(max(1, limit))
+            for provider, limit in self.limits.items()
+        }
+        self._lock = threading.Lock()
+
+    def _get_semaphore(self, provider: str) -> threading.BoundedSemaphore:
+        """プロバイダーのセマフォを取得（未定義ならワーカー数で作成）"""
+        with self._lock:
+            if provider not in self._semaphores:
+                self._semaphores[provider] = threading.BoundedSemaphore(max(1, MAX_PARALLEL_WORKERS))
+            return self._semaphores[provider]
+
+    @contextmanager
+    def limit(self, provider: str):
+        """プロバイダーの同時実行枠を確保してAPIを呼び出す
+
+        Examples:
+            with provider_limiter.limit('openai'):
+                client.chat.completions.create(...)
+        """
+        semaphore = self._get_semaphore(provider)
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+# プロセス全体で共有するプロバイダー制限
+provider_limiter = ProviderConcurrencyLimiter()
+
+
+class ParallelEvidenceExecutor:
+    """複数証拠の並列実行エグゼキューター"""
+
+    def __init__(self, max_workers: int = None):
+        """初期化
+
+        Args:
+            max_workers: 最大ワーカー数（未指定時は MAX_PARALLEL_WORKERS）
+        """
+        workers = max_workers or MAX_PARALLEL_WORKERS
+        if not ENABLE_PARALLEL_PROCESSING:
+            workers = 1
+        self.max_workers = max(1, workers)
+
+    def run(self,
+            items: List[Any],
+            worker: Callable[[Any], Any],
+            label: Optional[Callable[[Any], str]] = None) -> List[Dict]:
+        """全アイテムを並列処理し、投入順に結果を返す
+
+        1件の失敗が他のアイテムに影響しないよう、例外は結果に記録します。
+
+        Args:
+            items: 処理対象のリスト
+            worker: 1件を処理する関数
+            label: 進捗表示用のラベル関数
+
+        Returns:
+            [{"item": ..., "status": "success" | "failed", "result": ..., "error": ..., "elapsed_seconds": float}, ...]
+        """
+        label = label or str
+        total = len(items)
+        if total == 0:
+            return []
+
+        logger.info(f"⚡ 並列分析開始: {total}件（ワーカー数: {self.max_workers}）")
+        start_time = time.time()
+
+        results = []
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix="evidence") as executor:
+            futures = [executor.submit(self._run_one, worker, item) for item in items]
+
+            # 完了順ではなく投入順に結果を回収して進捗を表示
+            for idx, (item, future) in enumerate(zip(items, futures), 1):
+                outcome = future.result()
+                results.append(outcome)
+
+                if outcome['status'] == 'success':
+                    print(f"  [{idx}/{total}] ✅ {label(item)} ({outcome['elapsed_seconds']:.1f}秒)")
+                else:
+                    print(f"  [{idx}/{total}] ❌ {label(item)}: {outcome['error']}")
+
+        elapsed = time.time() - start_time
+        success_count = len([r for r in results if r['status'] == 'success'])
+        logger.info(f"⚡ 並列分析完了: 成功 {success_count}/{total}件（{elapsed:.1f}秒）")
+
+        return results
+
+    def _run_one(self, worker: Callable[[Any], Any], item: Any) -> Dict:
+        """1件を実行（例外を結果に変換）"""
+        start_time = time.time()
+        outcome = {
+            "item": item,
+            "status": "success",
+            "result": None,
+            "error": None,
+            "elapsed_seconds": 0.0
+        }
+
+        try:
+            outcome['result'] = worker(item)
+            if outcome['result'] is None:
+                outcome['status'] = 'failed'
+                outcome['error'] = '処理結果がありません'
+        except Exception as e:
+            logger.error(f"❌ 並列処理エラー: {item} - {e}", exc_info=True)
+            outcome['status'] = 'failed'
+            outcome['error'] = str(e)
+
+        outcome['elapsed_seconds'] = time.time() - start_time
+        return outcome
@@ -0,0 +1,144 @@
+"""
+複数ページPDFのVision分析用ページ選択・画像化
+- 送信するページの選択（先頭・末尾・署名/押印ページ・テキスト層の乏しいページ）
+- 選択したページのみを必要になった時点で画像化
+- 1リクエストあたりのページ数に合わせた分割
+"""
+
+import os
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from global_config import *
+
+logger = logging.getLogger(__name__)
+
+# PDF処理
+try:
+    from pdf2image import convert_from_path, pdfinfo_from_path
+    PDF2IMAGE_AVAILABLE = True
+except ImportError:
+    PDF2IMAGE_AVAILABLE = False
+
+# 署名・押印ページの判定キーワード
+SIGNATURE_KEYWORDS = ['署名', '記名', '押印', '捺印', '印鑑', '㊞', '（印）', '(印)', '実印', '代表者印']
+
+
+class PdfPageSampler:
+    """Vision分析で送信するPDFページの選択と画像化"""
+
+    def __init__(self,
+                 max_pages: int = None,
+                 pages_per_request: int = None,
+                 dpi: int = None):
+        """初期化
+
+        Args:
+            max_pages: 1証拠あたり送信する最大ページ数
+            pages_per_request: 1リクエストに含める最大ページ数
+            dpi: 画像化の解像度
+        """
+        self.max_pages = max_pages or VISION_MAX_PAGES
+        self.pages_per_request = pages_per_request or VISION_PAGES_PER_REQUEST
+        self.dpi = dpi or VISION_PDF_DPI
+
+    def get_page_count(self, pdf_path: str, file_content: Optional[Dict] = None) -> int:
+        """ページ数を取得（ファイル処理結果があれば再利用）"""
+        pages = self._get_page_texts(file_content)
+        if pages:
+            return len(pages)
+
+        if PDF2IMAGE_AVAILABLE:
+            try:
+                return int(pdfinfo_from_path(pdf_path).get('Pages', 1))
+            except Exception as e:
+                logger.warning(f"⚠️ PDFページ数取得失敗: {e}")
+        return 1
+
+    def select_pages(self, page_count: int, file_content: Optional[Dict] = None) -> List[int]:
+        """送信するページを選択
+
+        優先順位: 先頭 → 末尾 → 署名・押印ページ → テキスト層の乏しいページ → 等間隔
+
+        Returns:
+            ページ番号（1始まり・昇順）
+        """
+        if page_count <= self.max_pages:
+            return list(range(1, page_count + 1))
+
+        page_texts = self._get_page_texts(file_content)
+        candidates = [1, page_count]
+
+        # 署名・押印ページ（契約書の末尾等）
+        candidates += [
+            number for number, text in page_texts.items()
+            if any(keyword in text for keyword in SIGNATURE_KEYWORDS)
+        ]
+
+        # テキスト層の乏しいページ（スキャン画像・図表等）
+        candidates += [
+            number for number, text in page_texts.items()
+            if len(text.strip()) < VISION_LOW_TEXT_PAGE_CHARS
+        ]
+
+        # 残り枠は等間隔に選択
+        step = page_count / self.max_pages
+        candidates += [int(i * step) + 1 for i in range(self.max_pages)]
+
+        selected = []
+        for number in candidates:
+            if 1 <= number <= page_count and number not in selected:
+                selected.append(number)
+            if len(selected) >= self.max_pages:
+                break
+
+        return sorted(selected)
+
+    def chunk_pages(self, pages: List[int]) -> List[List[int]]:
+        """1リクエストあたりのページ数で分割"""
+        size = max(1, self.pages_per_request)
+        return [pages[i:i + size] for i in range(0, len(pages), size)]
+
+    def render_page(self, pdf_path: str, page_number: int) -> Optional[str]:
+        """1ページを画像化（要求されたページのみ変換）
+
+        Returns:
+            画像ファイルパス（失敗時はNone）
+        """
+        if not PDF2IMAGE_AVAILABLE:
+            logger.error("エラー: pdf2imageライブラリが未インストール")
+            return None
+
+        try:
+            images = convert_from_path(
+                pdf_path,
+                first_page=page_number,
+                last_page=page_number,
+                dpi=self.dpi
+            )
+            if not images:
+                return None
+
+            image_path = os.path.join(
+                os.path.dirname(pdf_path),
+                f"{Path(pdf_path).stem}_page{page_number}.jpg"
+            )
+            images[0].save(image_path, 'JPEG', quality=IMAGE_COMPRESSION_QUALITY)
+            return image_path
+
+        except Exception as e:
+            logger.warning(f"⚠️ PDFページ画像化失敗（p.{page_number}）: {e}")
+            return None
+
+    def _get_page_texts(self, file_content: Optional[Dict]) -> Dict[int, str]:
+        """ファイル処理結果からページ番号 → テキスト層の対応を取得"""
+        if not isinstance(file_content, dict):
+            return {}
+
+        pages = file_content.get('content', {}).get('pages') or []
+        return {
+            # OCRで補ったページはテキスト層なしとして扱う
+            page.get('page_number', i + 1): (page.get('text') or '') if page.get('source', 'text_layer') == 'text_layer' else ''
+            for i, page in enumerate(pages) if isinstance(page, dict)
+        }
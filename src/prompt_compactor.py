@@ -0,0 +1,218 @@
+"""
+プロンプト圧縮モジュール
+- メタデータから分析に必要なフィールドのみを抽出
+- ファイル内容の重複テキスト（pages と total_text 等）を除去
+- ローカルトークナイザーでトークン数を計測し、予算内に切り詰め
+"""
+
+import json
+import logging
+from typing import Any, Dict, List
+
+from global_config import *
+
+logger = logging.getLogger(__name__)
+
+# トークナイザー（オプショナル）
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+
+# プロンプトに含めるEXIFタグ（日時・撮影機器・位置情報のみ）
+EXIF_TAGS_FOR_PROMPT = [
+    'DateTimeOriginal', 'DateTimeDigitized', 'DateTime',
+    'Make', 'Model', 'Software', 'Orientation', 'GPSInfo'
+]
+
+
+class PromptCompactor:
+    """トークン予算に基づくプロンプト圧縮"""
+
+    def __init__(self,
+                 metadata_budget: int = None,
+                 content_budget: int = None):
+        """初期化
+
+        Args:
+            metadata_budget: メタデータ部分のトークン上限
+            content_budget: ファイル内容部分のトークン上限
+        """
+        self.metadata_budget = metadata_budget or PROMPT_METADATA_TOKEN_BUDGET
+        self.content_budget = content_budget or PROMPT_CONTENT_TOKEN_BUDGET
+        self._encoding = None
+
+        if TIKTOKEN_AVAILABLE:
+            try:
+                self._encoding = tiktoken.encoding_for_model(OPENAI_MODEL)
+            except Exception:
+                try:
+                    self._encoding = tiktoken.get_encoding("o200k_base")
+                except Exception as e:
+                    logger.warning(f"⚠️ トークナイザー初期化失敗（概算で計測します）: {e}")
+
+    # ================================
+    # トークン計測
+    # ================================
+
+    def count_tokens(self, text: str) -> int:
+        """トークン数を計測（tiktoken未インストール時は概算）"""
+        if not text:
+            return 0
+
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+
+        # 概算: ASCIIは約4文字/トークン、日本語等は約1文字/トークン
+        ascii_chars = sum(1 for c in text if ord(c) < 128)
+        return ascii_chars // 4 + (len(text) - ascii_chars)
+
+    def truncate_to_budget(self, text: str, budget: int) -> str:
+        """テキストをトークン予算内に切り詰め（先頭と末尾を残す）"""
+        tokens = self.count_tokens(text)
+        if tokens <= budget:
+            return text
+
+        # 文字数比で概算しつつ、予算内に収まるまで縮める
+        keep_chars = int(len(text) * budget / tokens)
+        while keep_chars > 0:
+            head = text[:int(keep_chars * 0.7)]
+            tail = text[len(text) - int(keep_chars * 0.3):] if keep_chars >= 10 else ''
+            omitted = len(text) - len(head) - len(tail)
+            truncated = f"{head}\n…（中略: {omitted}文字）…\n{tail}"
+            if self.count_tokens(truncated) <= budget:
+                return truncated
+            keep_chars = int(keep_chars * 0.9)
+
+        return ''
+
+    # ================================
+    # メタデータ圧縮
+    # ================================
+
+    def compact_metadata(self, metadata: Dict) -> Dict:
+        """分析に必要なメタデータのみを抽出
+
+        Drive の capabilities・owners・アイコン/サムネイルリンク、
+        MakerNote等のバイナリ由来EXIFタグは除外します。
+        """
+        if not isinstance(metadata, dict):
+            return {}
+
+        basic = metadata.get('basic', {})
+        gdrive = metadata.get('gdrive', {})
+        format_specific = metadata.get('format_specific', {})
+
+        # basic の created_time / modified_time はダウンロードしたローカルファイルの日時で、
+        # 再ダウンロードのたびに変わる（証拠の日時は gdrive 側を使用）。
+        # プロンプトに含めると同じ内容の証拠でも分析キャッシュ・カセットのキーが一致しないため除外します。
+        compact = {
+            "basic": self._pick(basic, [
+                'file_name', 'file_extension', 'file_size_human', 'mime_type'
+            ]),
+            "sha256": metadata.get('hashes', {}).get('sha256'),
+            "gdrive": self._pick(gdrive, [
+                'file_id', 'file_url', 'original_filename', 'created_time', 'modified_time'
+            ]),
+            "format_specific": self._compact_format_specific(format_specific)
+        }
+
+        return {k: v for k, v in compact.items() if v}
+
+    def _compact_format_specific(self, format_specific: Dict) -> Dict:
+        """ファイル形式固有メタデータの圧縮"""
+        if not isinstance(format_specific, dict):
+            return {}
+
+        compact = self._pick(format_specific, [
+            'format', 'width', 'height', 'resolution_dpi',
+            'page_count', 'is_encrypted', 'page_size',
+            'paragraph_count', 'table_count'
+        ])
+
+        exif = format_specific.get('exif')
+        if isinstance(exif, dict):
+            compact['exif'] = self._pick(exif, EXIF_TAGS_FOR_PROMPT)
+
+        for key in ['document_info', 'properties']:
+            value = format_specific.get(key)
+            if isinstance(value, dict):
+                compact[key] = {k: v for k, v in value.items() if v}
+
+        return {k: v for k, v in compact.items() if v not in (None, {}, [])}
+
+    def _pick(self, source: Dict, keys: List[str]) -> Dict:
+        """指定キーのうち値が空でないものを抽出"""
+        if not isinstance(source, dict):
+            return {}
+        return {k: source[k] for k in keys if source.get(k) not in (None, '', {}, [])}
+
+    # ================================
+    # ファイル内容圧縮
+    # ================================
+
+    def compact_file_content(self, file_content: Dict) -> Dict:
+        """ファイル内容から重複テキストを除去
+
+        - PDF: pages の本文は total_text と重複するためページ番号と文字数のみ残す
+        - OCR結果が本文テキストと同一の場合は片方のみ残す
+        """
+        if not isinstance(file_content, dict):
+            return {}
+
+        compact = {k: v for k, v in file_content.items() if k != 'content'}
+        content = file_content.get('content')
+        if not isinstance(content, dict):
+            return compact
+
+        content = dict(content)
+
+        if 'pages' in content and content.get('total_text'):
+            content['pages'] = [
+                {"page_number": p.get('page_number'), "char_count": p.get('char_count'), "source": p.get('source')}
+                for p in content['pages'] if isinstance(p, dict)
+            ]
+
+        if 'paragraphs' in content and content.get('full_text'):
+            content.pop('paragraphs')
+
+        # OCR結果の重複除去
+        body_text = (content.get('total_text') or content.get('full_text') or '').strip()
+        ocr_results = content.get('ocr_results')
+        if isinstance(ocr_results, list):
+            seen = set()
+            unique_results = []
+            for result in ocr_results:
+                text = (result.get('ocr_text') or '').strip() if isinstance(result, dict) else ''
+                # 本文（OCRで補ったページを含む）に含まれる結果は除去
+                if text and (text in seen or text in body_text):
+                    continue
+                seen.add(text)
+                unique_results.append(result)
+            content['ocr_results'] = unique_results
+
+        compact['content'] = content
+        return compact
+
+    def build_content_text(self, file_content: Dict) -> str:
+        """テキストベース分析用のファイル内容テキストを構築（予算内に切り詰め）"""
+        compact = self.compact_file_content(file_content)
+        content_text = json.dumps(compact, ensure_ascii=False, indent=1, default=str)
+        return self.truncate_to_budget(content_text, self.content_budget)
+
+    def build_metadata_text(self, metadata: Dict) -> str:
+        """プロンプト用のメタデータテキストを構築（予算内に切り詰め）"""
+        compact = self.compact_metadata(metadata)
+        metadata_text = json.dumps(compact, ensure_ascii=False, indent=1, default=str)
+        return self.truncate_to_budget(metadata_text, self.metadata_budget)
+
+    def log_savings(self, label: str, original: Any, compacted: str):
+        """圧縮前後のトークン数をログ出力"""
+        original_text = original if isinstance(original, str) else \
+            json.dumps(original, ensure_ascii=False, indent=2, default=str)
+        before = self.count_tokens(original_text)
+        after = self.count_tokens(compacted)
+        saved = (1 - after / before) if before else 0.0
+        logger.info(f"   ✂️ {label}: {before} → {after} トークン（{saved:.0%}削減）")
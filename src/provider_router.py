@@ -0,0 +1,392 @@
+"""
+AIプロバイダーのルーティングとヘッジリクエスト
+- モデルごとの応答時間（p50/p95）とエラー率をローリング記録
+- 主リクエストがp95を超えたら別プロバイダーへヘッジリクエストを送信
+- 先に返った有効な結果を採用し、もう一方はキャンセル
+- 事件ごとのヘッジ予算で追加コストを制限
+- モデル別サーキットブレーカー（利用不可・過負荷のモデルを一定時間スキップ）
+"""
+
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from global_config import *
+from src.ai_telemetry import bind_context
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderRouter:
+    """モデル別レイテンシ統計に基づくルーティング・ヘッジ実行"""
+
+    def __init__(self, stats_path: str = None, hedging_enabled: bool = None):
+        """初期化
+
+        Args:
+            stats_path: 統計の保存先（実行をまたいでp95を引き継ぐ）
+            hedging_enabled: ヘッジリクエストを行うか（未指定時は ENABLE_HEDGED_REQUESTS）
+        """
+        self.stats_path = stats_path or os.path.join(LOCAL_CACHE_DIR, "provider_latency.json")
+        self.hedging_enabled = ENABLE_HEDGED_REQUESTS if hedging_enabled is None else hedging_enabled
+        self._samples: Dict[str, deque] = defaultdict(lambda: deque(maxlen=ROUTER_LATENCY_WINDOW))
+        self._case_requests: Dict[str, int] = defaultdict(int)
+        self._case_hedges: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        # 統計の保存（呼び出しごとではなく ROUTER_STATS_SAVE_INTERVAL_SECONDS ごと・終了時）
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._last_saved = time.time()
+        self._load_stats()
+        atexit.register(self.flush)
+
+    # ================================
+    # 統計
+    # ================================
+
+    def record(self, model: str, elapsed_seconds: float, success: bool):
+        """1回の呼び出し結果を記録
+
+        Args:
+            model: モデルID
+            elapsed_seconds: 応答時間（秒）
+            success: 成功したか（APIエラー時はFalse）
+        """
+        with self._lock:
+            self._samples[model].append((round(elapsed_seconds, 3), bool(success)))
+            self._dirty = True
+            due = time.time() - self._last_saved >= ROUTER_STATS_SAVE_INTERVAL_SECONDS
+        if due:
+            self._save_stats(blocking=False)
+
+    def flush(self):
+        """未保存の統計を保存（終了時に自動で呼ばれる）"""
+        self._save_stats()
+
+    def percentile(self, model: str, q: float) -> Optional[float]:
+        """成功した呼び出しの応答時間のパーセンタイル（サンプル不足時はNone）"""
+        with self._lock:
+            latencies = sorted(elapsed for elapsed, ok in self._samples.get(model, []) if ok)
+        if len(latencies) < ROUTER_MIN_SAMPLES:
+            return None
+        index = min(len(latencies) - 1, int(round(q * (len(latencies) - 1))))
+        return latencies[index]
+
+    def error_rate(self, model: str) -> float:
+        """直近の呼び出しのエラー率"""
+        with self._lock:
+            samples = list(self._samples.get(model, []))
+        if not samples:
+            return 0.0
+        return sum(1 for _, ok in samples if not ok) / len(samples)
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """モデル別の統計（p50/p95/エラー率/サンプル数）"""
+        with self._lock:
+            models = list(self._samples.keys())
+        return {
+            model: {
+                "p50": self.percentile(model, 0.5),
+                "p95": self.percentile(model, 0.95),
+                "error_rate": self.error_rate(model),
+                "samples": len(self._samples[model])
+            }
+            for model in models
+        }
+
+    def hedge_delay(self, model: str) -> float:
+        """ヘッジリクエストを送るまでの待ち時間（主モデルのp95）"""
+        p95 = self.percentile(model, 0.95)
+        return p95 if p95 is not None else ROUTER_DEFAULT_HEDGE_DELAY_SECONDS
+
+    # ================================
+    # ヘッジ予算
+    # ================================
+
+    def _count_request(self, budget_key: str):
+        with self._lock:
+            self._case_requests[budget_key] += 1
+
+    def _consume_hedge(self, budget_key: str) -> bool:
+        """ヘッジ予算を1件消費（上限に達していればFalse）"""
+        with self._lock:
+            used = self._case_hedges[budget_key]
+            allowance = min(
+                ROUTER_HEDGE_MAX_PER_CASE,
+                max(1, int(self._case_requests[budget_key] * ROUTER_HEDGE_BUDGET_RATIO))
+            )
+            if used >= allowance:
+                return False
+            self._case_hedges[budget_key] += 1
+            return True
+
+    def get_budget_usage(self, budget_key: str) -> Dict:
+        """事件ごとのヘッジ予算の使用状況"""
+        with self._lock:
+            return {
+                "requests": self._case_requests[budget_key],
+                "hedges": self._case_hedges[budget_key]
+            }
+
+    # ================================
+    # 実行
+    # ================================
+
+    def order_candidates(self, candidates: List[Tuple[str, Callable]]) -> List[Tuple[str, Callable]]:
+        """候補の順序を決定
+
+        既定の順序（先頭が第一候補）を維持し、第一候補のエラー率が
+        ROUTER_MAX_ERROR_RATE を超え、かつ他候補の方が健全な場合のみ入れ替えます。
+        """
+        if len(candidates) < 2:
+            return candidates
+
+        primary_error = self.error_rate(candidates[0][0])
+        if primary_error <= ROUTER_MAX_ERROR_RATE:
+            return candidates
+
+        healthiest = min(candidates, key=lambda c: self.error_rate(c[0]))
+        if self.error_rate(healthiest[0]) < primary_error:
+            logger.warning(
+                f"⚠️ {candidates[0][0]} のエラー率が高いため {healthiest[0]} を優先します"
+                f"（{primary_error:.0%}）"
+            )
+            return [healthiest] + [c for c in candidates if c is not healthiest]
+        return candidates
+
+    def run(self,
+            candidates: List[Tuple[str, Callable[[threading.Event], Any]]],
+            is_valid: Callable[[Any], bool],
+            budget_key: str = 'default') -> Any:
+        """候補を順に（必要ならヘッジして並行に）実行し、最初の有効な結果を返す
+
+        - 第一候補が有効な結果を返せば、それを採用
+        - 第一候補がp95を超えても終わらなければ、予算内で次の候補を並行実行（ヘッジ）
+        - 無効な結果（拒否等）や例外の場合は次の候補へ（フォールバック、予算は消費しない）
+        - 採用しなかった実行中のリクエストにはキャンセルを通知
+
+        Args:
+            candidates: [(モデルID, 関数(キャンセルイベント) -> 結果), ...]
+            is_valid: 結果が採用可能か判定する関数
+            budget_key: ヘッジ予算の単位（事件ID）
+
+        Returns:
+            最初の有効な結果。有効な結果がなければ最初に得られた結果（なければNone）
+        """
+        candidates = self.order_candidates(candidates)
+        self._count_request(budget_key)
+
+        executor = ThreadPoolExecutor(max_workers=len(candidates), thread_name_prefix="hedge")
+        running: Dict[Any, Tuple[str, threading.Event]] = {}
+        next_index = 0
+        fallback_result = None
+        first_error = None
+
+        def launch():
+            nonlocal next_index
+            model, fn = candidates[next_index]
+            next_index += 1
+            cancel_event = threading.Event()
+            running[executor.submit(bind_context(fn), cancel_event)] = (model, cancel_event)
+
+        try:
+            launch()
+            primary_model = candidates[0][0]
+            deadline = time.time() + self.hedge_delay(primary_model) if self.hedging_enabled else None
+
+            while running:
+                timeout = None
+                if deadline is not None and next_index < len(candidates):
+                    timeout = max(0.0, deadline - time.time())
+
+                done, _ = wait(list(running.keys()), timeout=timeout, return_when=FIRST_COMPLETED)
+
+                if not done:
+                    # 第一候補がp95を超過 → ヘッジ
+                    deadline = None
+                    if self._consume_hedge(budget_key):
+                        logger.info(
+                            f"⏱️ {primary_model} がp95（{self.hedge_delay(primary_model):.1f}秒）を超過 - "
+                            f"{candidates[next_index][0]} へヘッジリクエスト"
+                        )
+                        launch()
+                    else:
+                        logger.info("⏱️ ヘッジ予算の上限に達しているため待機を継続")
+                    continue
+
+                for future in done:
+                    model, _ = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.warning(f"⚠️ {model} の呼び出し失敗: {e}")
+                        first_error = first_error or e
+                        continue
+
+                    if is_valid(result):
+                        for other_model, cancel_event in running.values():
+                            logger.info(f"   🛑 {other_model} のリクエストをキャンセル（{model} を採用）")
+                            cancel_event.set()
+                        return result
+
+                    if result is not None and fallback_result is None:
+                        fallback_result = result
+
+                # 有効な結果がなく実行中のものもなければ次の候補へ
+                if not running and next_index < len(candidates):
+                    logger.info(f"🔄 {candidates[next_index][0]} にフォールバックします")
+                    launch()
+
+            if fallback_result is None and first_error is not None:
+                raise first_error
+            return fallback_result
+
+        finally:
+            executor.shutdown(wait=False)
+
+    # ================================
+    # 永続化
+    # ================================
+
+    def _load_stats(self):
+        """保存済みの統計を読み込み"""
+        try:
+            with open(self.stats_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for model, samples in data.items():
+                self._samples[model].extend((float(elapsed), bool(ok)) for elapsed, ok in samples)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"⚠️ レイテンシ統計の読み込み失敗（破棄します）: {e}")
+
+    def _save_stats(self, blocking: bool = True):
+        """統計を保存（変更がなければ何もしない）
+
+        ファイルへの書き込みはスナップショットを取ってから self._lock の外で行います。
+
+        Args:
+            blocking: Falseの場合、他のスレッドが保存中なら待たずに戻る（次回の記録時に保存）
+        """
+        if not self._save_lock.acquire(blocking=blocking):
+            return
+        try:
+            with self._lock:
+                if not self._dirty:
+                    return
+                snapshot = {model: list(samples) for model, samples in self._samples.items()}
+                self._dirty = False
+                self._last_saved = time.time()
+
+            try:
+                os.makedirs(os.path.dirname(self.stats_path), exist_ok=True)
+                tmp_path = f"{self.stats_path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, self.stats_path)
+            except OSError as e:
+                logger.debug(f"レイテンシ統計の保存失敗: {e}")
+                with self._lock:
+                    self._dirty = True
+        finally:
+            self._save_lock.release()
+
+
+class ModelCircuitBreaker:
+    """モデル別のサーキットブレーカー（プロセス全体で共有）
+
+    状態:
+    - closed: 通常どおり呼び出す
+    - open: クールダウン中はスキップ（404・過負荷が続いたモデル）
+    - half_open: クールダウン経過後、1件だけ試行（プローブ）して復帰を判定
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self):
+        self._states: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, model: str) -> Dict:
+        return self._states.setdefault(model, {
+            "state": self.CLOSED,
+            "failures": 0,
+            "opened_at": 0.0,
+            "cooldown": 0.0,
+            "probing": False
+        })
+
+    def allow(self, model: str) -> bool:
+        """呼び出してよいか判定（half_open時は1件のみ許可）"""
+        with self._lock:
+            entry = self._get(model)
+            if entry["state"] == self.CLOSED:
+                return True
+
+            if entry["state"] == self.OPEN:
+                if time.time() - entry["opened_at"] < entry["cooldown"]:
+                    return False
+                entry["state"] = self.HALF_OPEN
+                entry["probing"] = False
+
+            # half_open: プローブ中でなければ1件だけ通す
+            if entry["probing"]:
+                return False
+            entry["probing"] = True
+            logger.info(f"🔌 {model}: クールダウン経過 - 復帰確認のため試行します")
+            return True
+
+    def record_success(self, model: str):
+        """呼び出し成功（遮断を解除）"""
+        with self._lock:
+            entry = self._get(model)
+            if entry["state"] != self.CLOSED:
+                logger.info(f"🔌 {model}: 復帰を確認しました")
+            entry.update(state=self.CLOSED, failures=0, probing=False)
+
+    def record_failure(self, model: str, not_found: bool = False):
+        """利用不可（404）・過負荷による失敗を記録
+
+        Args:
+            model: モデルID
+            not_found: 404（モデル廃止・未提供）の場合True（即座に長時間遮断）
+        """
+        with self._lock:
+            entry = self._get(model)
+            entry["failures"] += 1
+            entry["probing"] = False
+
+            if not (not_found
+                    or entry["state"] == self.HALF_OPEN
+                    or entry["failures"] >= CIRCUIT_BREAKER_FAILURE_THRESHOLD):
+                return
+
+            entry["state"] = self.OPEN
+            entry["opened_at"] = time.time()
+            entry["cooldown"] = (
+                CIRCUIT_BREAKER_NOT_FOUND_COOLDOWN_SECONDS if not_found else CIRCUIT_BREAKER_COOLDOWN_SECONDS
+            )
+            logger.warning(f"🔌 {model}: {entry['cooldown']:.0f}秒間スキップします")
+
+    def release(self, model: str):
+        """結果を判定せずに終了した場合（キャンセル等）にプローブ枠を返却"""
+        with self._lock:
+            self._get(model)["probing"] = False
+
+    def get_states(self) -> Dict[str, str]:
+        """モデル別の状態"""
+        with self._lock:
+            return {model: entry["state"] for model, entry in self._states.items()}
+
+
+# プロセス全体で共有するルーター・サーキットブレーカー
+provider_router = ProviderRouter()
+model_circuit_breaker = ModelCircuitBreaker()
@@ -0,0 +1,257 @@
+"""
+GPT-4o Vision拒否の予測と事前ルーティング
+- database.json の分析履歴（_analysis_method）から、GPT-4oに拒否された証拠の傾向を学習
+- 特徴: ファイルタイプ・ファイル名からの証拠種別推測・OCR/テキスト層のキーワード
+- 拒否される可能性が高い証拠は最初からClaudeに送信（GPT-4oの無駄な1回を省く）
+- ルーティングの判断と結果を _analysis_method.refusal_routing に記録し、評価に使用
+"""
+
+import random
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from global_config import *
+
+logger = logging.getLogger(__name__)
+
+# ファイル名から推測する証拠種別（EvidenceOrganizerのファイル名提案と共通）
+EVIDENCE_TYPE_KEYWORDS = {
+    "診断書": ["診断", "診断書", "medical", "diagnosis"],
+    "契約書": ["契約", "契約書", "contract", "agreement"],
+    "メール": ["メール", "mail", "email", "message"],
+    "SNS投稿": ["sns", "twitter", "facebook", "instagram", "投稿", "post"],
+    "写真": ["img", "photo", "写真", "画像", "jpg", "jpeg", "png"],
+    "請求書": ["請求", "請求書", "invoice", "bill"],
+    "領収書": ["領収", "領収書", "receipt"],
+    "録音": ["録音", "audio", "recording", "mp3", "m4a"],
+    "動画": ["動画", "video", "mp4", "mov"],
+}
+
+# 拒否と関係しうる本文キーワード（医療・負傷・SNS・個人情報等）
+REFUSAL_FEATURE_KEYWORDS = [
+    "診断", "病院", "医師", "処方", "治療", "負傷", "怪我", "傷", "出血", "死亡",
+    "LINE", "既読", "ツイート", "リツイート", "フォロー", "いいね", "DM", "Instagram", "Twitter",
+    "住所", "電話番号", "生年月日", "マイナンバー", "暴力", "脅迫"
+]
+
+# 特徴抽出に使う本文の最大文字数
+FEATURE_TEXT_CHARS = 5000
+
+
+def guess_evidence_type(filename: str) -> str:
+    """ファイル名から証拠種別を推測"""
+    filename_lower = (filename or '').lower()
+
+    for evidence_type, words in EVIDENCE_TYPE_KEYWORDS.items():
+        if any(word in filename_lower for word in words):
+            return evidence_type
+
+    return "その他"
+
+
+def extract_features(file_type: str, filename: str, file_content: Optional[Dict]) -> List[str]:
+    """拒否予測に使う特徴を抽出
+
+    Returns:
+        特徴名のリスト（例: "file_type:image", "evidence_type:診断書", "keyword:既読"）
+    """
+    features = [
+        f"file_type:{file_type or 'unknown'}",
+        f"evidence_type:{guess_evidence_type(filename)}"
+    ]
+    text = _content_text(file_content)
+    features += [f"keyword:{keyword}" for keyword in REFUSAL_FEATURE_KEYWORDS if keyword in text]
+    return features
+
+
+def _content_text(file_content: Optional[Dict]) -> str:
+    """ファイル処理結果からOCR・テキスト層の先頭部分を取得"""
+    if not isinstance(file_content, dict):
+        return ''
+
+    content = file_content.get('content', {}) or {}
+    parts = [content.get('ocr_text') or '', content.get('total_text') or '']
+    ocr_results = content.get('ocr_results')
+    if isinstance(ocr_results, list):
+        parts += [r.get('ocr_text') or '' for r in ocr_results if isinstance(r, dict)]
+    elif isinstance(ocr_results, dict):
+        parts.append(ocr_results.get('ocr_text') or '')
+    return '\n'.join(parts)[:FEATURE_TEXT_CHARS]
+
+
+class RefusalPredictor:
+    """特徴ごとの拒否率からGPT-4o Visionの拒否を予測"""
+
+    def __init__(self,
+                 threshold: float = None,
+                 min_samples: int = None,
+                 exploration_rate: float = None):
+        """初期化
+
+        Args:
+            threshold: この拒否確率以上ならClaudeを先に試行
+            min_samples: 特徴の拒否率を使う最小サンプル数
+            exploration_rate: 予測に反してGPT-4oを先に試す割合（予測の評価・再学習用）
+        """
+        self.threshold = REFUSAL_ROUTING_THRESHOLD if threshold is None else threshold
+        self.min_samples = REFUSAL_ROUTING_MIN_SAMPLES if min_samples is None else min_samples
+        self.exploration_rate = REFUSAL_ROUTING_EXPLORATION_RATE if exploration_rate is None else exploration_rate
+        self._counts: Dict[str, List[int]] = defaultdict(lambda: [0, 0])  # 特徴 → [拒否数, 試行数]
+        self._lock = threading.Lock()
+
+    # ================================
+    # 学習
+    # ================================
+
+    def observe(self, features: Iterable[str], refused: bool):
+        """GPT-4o Visionの結果を1件学習"""
+        with self._lock:
+            for feature in features:
+                counts = self._counts[feature]
+                counts[0] += 1 if refused else 0
+                counts[1] += 1
+
+    def fit(self, evidence_list: List[Dict]) -> int:
+        """database.jsonの証拠一覧から学習し直す
+
+        Returns:
+            学習に使用した件数
+        """
+        with self._lock:
+            self._counts.clear()
+
+        samples = 0
+        for features, refused in self._history(evidence_list):
+            self.observe(features, refused)
+            samples += 1
+
+        if samples:
+            refused_count = sum(1 for _, refused in self._history(evidence_list) if refused)
+            logger.info(f"📊 拒否予測: 履歴 {samples}件から学習（GPT-4o拒否 {refused_count}件）")
+        return samples
+
+    def _history(self, evidence_list: List[Dict]) -> Iterable[Tuple[List[str], bool]]:
+        """GPT-4o Visionを試行した証拠の (特徴, 拒否されたか)"""
+        for evidence in evidence_list or []:
+            analysis = evidence.get('phase1_complete_analysis') or {}
+            ai_analysis = analysis.get('ai_analysis') or {}
+            method = ai_analysis.get('_analysis_method') or {}
+            if not method.get('vision_api_used'):
+                continue
+
+            routing = method.get('refusal_routing') or {}
+            if routing:
+                refused = routing.get('openai_refused')
+                if refused is None:  # GPT-4oを試行していない
+                    continue
+                features = routing.get('features') or []
+            else:
+                # ルーティング導入前の記録
+                # 当時のClaudeはGPT-4oの拒否時のみ使用（Claudeが成功した場合 rejection_reason は None）
+                answered_by_claude = str(ai_analysis.get('_ai_engine', '')).startswith('Claude')
+                refused = (
+                    method.get('rejection_reason') == 'content_policy_rejection'
+                    or (method.get('vision_api_success') and answered_by_claude)
+                )
+                file_content = analysis.get('file_processing_result') or {}
+                features = extract_features(
+                    file_content.get('file_type'), evidence.get('original_filename', ''), file_content
+                )
+            yield features, bool(refused)
+
+    # ================================
+    # 予測
+    # ================================
+
+    def predict(self, features: List[str]) -> Dict:
+        """拒否確率を予測
+
+        サンプル数が十分な特徴のうち、最も拒否率の高いものを採用します。
+
+        Returns:
+            {"probability": float, "reasons": [{"feature", "refusal_rate", "samples"}]}
+        """
+        reasons = []
+        with self._lock:
+            for feature in features:
+                refused, total = self._counts.get(feature, (0, 0))
+                if total >= self.min_samples:
+                    # 少数サンプルの極端な率を抑える（ラプラス補正）
+                    reasons.append({
+                        "feature": feature,
+                        "refusal_rate": round((refused + 1) / (total + 2), 3),
+                        "samples": total
+                    })
+
+        reasons.sort(key=lambda r: r['refusal_rate'], reverse=True)
+        return {
+            "probability": reasons[0]['refusal_rate'] if reasons else 0.0,
+            "reasons": reasons[:3]
+        }
+
+    def decide(self, file_type: str, filename: str, file_content: Optional[Dict]) -> Dict:
+        """ルーティングを決定
+
+        Returns:
+            _analysis_method.refusal_routing に記録する内容
+            （"route": "claude" ならClaudeを先に試行）
+        """
+        features = extract_features(file_type, filename, file_content)
+        prediction = self.predict(features)
+        predicted_refusal = ENABLE_REFUSAL_ROUTING and prediction['probability'] >= self.threshold
+
+        exploration = predicted_refusal and random.random() < self.exploration_rate
+        route = 'claude' if predicted_refusal and not exploration else 'openai'
+
+        if route == 'claude':
+            top = prediction['reasons'][0]
+            logger.info(
+                f"🔀 GPT-4o拒否の可能性が高いためClaudeを優先（{prediction['probability']:.0%}、"
+                f"{top['feature']}: {top['samples']}件中の拒否率）"
+            )
+        elif exploration:
+            logger.info(f"🔀 拒否予測 {prediction['probability']:.0%} - 評価のためGPT-4oを先に試行")
+
+        return {
+            "features": features,
+            "predicted_probability": prediction['probability'],
+            "predicted_refusal": predicted_refusal,
+            "reasons": prediction['reasons'],
+            "route": route,
+            "exploration": exploration,
+            "openai_refused": None  # 分析後に記録（GPT-4oを試行しなければNoneのまま）
+        }
+
+    # ================================
+    # 評価
+    # ================================
+
+    def evaluate(self, evidence_list: List[Dict]) -> Dict:
+        """記録済みのルーティング判断を評価
+
+        GPT-4oを試行した証拠（通常ルート・探索）について予測と実際の拒否を比較し、
+        Claude優先にした件数（省略できたGPT-4o呼び出し）を集計します。
+        """
+        stats = {"routed_to_claude": 0, "true_positive": 0, "false_positive": 0,
+                 "false_negative": 0, "true_negative": 0}
+        for evidence in evidence_list or []:
+            analysis = evidence.get('phase1_complete_analysis') or {}
+            routing = ((analysis.get('ai_analysis') or {}).get('_analysis_method') or {}).get('refusal_routing')
+            if not routing:
+                continue
+            if routing.get('route') == 'claude':
+                stats['routed_to_claude'] += 1
+            actual = routing.get('openai_refused')
+            if actual is None:
+                continue
+            predicted = routing.get('predicted_refusal', False)
+            key = ('true_' if predicted == actual else 'false_') + ('positive' if predicted else 'negative')
+            stats[key] += 1
+
+        predicted_positive = stats['true_positive'] + stats['false_positive']
+        actual_positive = stats['true_positive'] + stats['false_negative']
+        stats['precision'] = round(stats['true_positive'] / predicted_positive, 3) if predicted_positive else None
+        stats['recall'] = round(stats['true_positive'] / actual_positive, 3) if actual_positive else None
+        return stats
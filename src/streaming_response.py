@@ -0,0 +1,353 @@
+"""
+AI応答のストリーミング受信
+- OpenAI Chat Completions / Anthropic Messages のストリーミング呼び出し
+- 受信中のJSONを逐次解析し、トップレベル項目の完了を進捗表示
+- 応答冒頭で拒否メッセージを検知した時点で受信を打ち切り
+
+ENABLE_STREAMING=false の場合は従来どおり一括受信します（戻り値の形式は同じ）。
+"""
+
+import json
+import time
+import logging
+import threading
+from typing import Callable, List, Optional
+
+from global_config import *
+
+logger = logging.getLogger(__name__)
+
+# 拒否メッセージ（応答全体での判定）
+REFUSAL_PHRASES = [
+    "I'm sorry, I can't assist with that",
+    "I cannot assist with that request"
+]
+
+# 拒否メッセージの書き出し（ストリーミング冒頭での判定）
+REFUSAL_PREFIXES = [
+    "I'm sorry", "I’m sorry", "I can't", "I can’t", "I cannot",
+    "I am unable", "I'm unable", "Sorry,", "申し訳", "お手伝いできません"
+]
+
+
+def is_refusal_text(text: str) -> bool:
+    """応答全体が拒否メッセージか判定
+
+    拒否メッセージの特徴:
+    1. 非常に短い（通常100文字未満）
+    2. JSON形式ではない
+    3. "I'm sorry, I can't assist with that" 等の定型文
+    """
+    if not text or len(text) >= 200 or "```" in text or "{" in text:
+        return False
+    return any(phrase in text for phrase in REFUSAL_PHRASES) or \
+        (text.startswith("I'm sorry") and "assist" in text)
+
+
+def detect_refusal_prefix(text: str) -> Optional[bool]:
+    """受信途中のテキストから拒否かどうかを判定
+
+    Returns:
+        True: 拒否 / False: 通常の応答 / None: まだ判定できない
+    """
+    stripped = text.lstrip()
+    if stripped.startswith('{') or stripped.startswith('```'):
+        return False
+    if any(stripped.startswith(prefix) for prefix in REFUSAL_PREFIXES):
+        return True
+    if len(stripped) >= STREAM_REFUSAL_CHECK_CHARS:
+        return False
+    return None
+
+
+class IncrementalJsonTracker:
+    """受信途中のJSONを逐次解析し、トップレベル項目の完了を検出"""
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escape = False
+        self._string_buffer: List[str] = []
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self.completed_keys: List[str] = []
+        self.is_complete = False
+
+    def feed(self, chunk: str) -> List[str]:
+        """受信テキストを追加
+
+        Returns:
+            このチャンクで値の受信が完了したトップレベル項目名
+        """
+        completed = []
+        for ch in chunk:
+            if self.is_complete:
+                break
+
+            # 最初の '{' までの前置き（```json 等）は読み飛ばす
+            if not self.started:
+                if ch == '{':
+                    self.started = True
+                    self.depth = 1
+                continue
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.depth == 1:
+                        self._last_string = ''.join(self._string_buffer)
+                    continue
+                if self.depth == 1:
+                    self._string_buffer.append(ch)
+                continue
+
+            if ch == '"':
+                self.in_string = True
+                self._string_buffer = []
+            elif ch in '{[':
+                self.depth += 1
+            elif ch in '}]':
+                self.depth -= 1
+                if self.depth == 0:
+                    if self._current_key:
+                        completed.append(self._current_key)
+                        self._current_key = None
+                    self.is_complete = True
+            elif ch == ':' and self.depth == 1:
+                self._current_key = self._last_string
+            elif ch == ',' and self.depth == 1 and self._current_key:
+                completed.append(self._current_key)
+                self._current_key = None
+
+        self.completed_keys.extend(completed)
+        return completed
+
+
+class StreamResult:
+    """ストリーミング受信結果（SDKのレスポンスと同様に .usage を持つ）"""
+
+    def __init__(self):
+        self.text = ''
+        self.refused = False
+        self.cancelled = False
+        self.usage = None
+        self.finish_reason = None
+        self.first_token_seconds: Optional[float] = None
+        self.elapsed_seconds = 0.0
+
+
+def _default_progress(label: str) -> Callable[[str, int], None]:
+    """既定の進捗表示（ログ出力）"""
+    def on_key(key: str, received_chars: int):
+        logger.info(f"   📥 {label}: {key} 受信（{received_chars}文字）")
+    return on_key
+
+
+class _StreamCollector:
+    """チャンクを蓄積し、拒否判定・JSON進捗を更新"""
+
+    def __init__(self,
+                 result: StreamResult,
+                 label: str,
+                 on_key: Optional[Callable[[str, int], None]],
+                 streaming: bool = True,
+                 cancel_event: Optional[threading.Event] = None):
+        self.result = result
+        self.cancel_event = cancel_event
+        self.label = label
+        self.on_key = on_key or _default_progress(label)
+        self.streaming = streaming
+        self.tracker = IncrementalJsonTracker()
+        self.refusal_checked = not streaming
+        self.start_time = time.time()
+        self._parts: List[str] = []
+        self._length = 0
+
+    def add(self, text: str) -> bool:
+        """テキストを追加（拒否を検知した場合・キャンセルされた場合はFalseを返す）"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            self.result.cancelled = True
+            return False
+        if not text:
+            return True
+
+        if self.result.first_token_seconds is None:
+            self.result.first_token_seconds = time.time() - self.start_time
+            if self.streaming:
+                logger.info(f"   ⚡ {self.label}: 最初の応答まで {self.result.first_token_seconds:.1f}秒")
+
+        self._parts.append(text)
+        self._length += len(text)
+
+        if not self.refusal_checked:
+            verdict = detect_refusal_prefix(''.join(self._parts))
+            if verdict is not None:
+                self.refusal_checked = True
+                if verdict:
+                    self.result.refused = True
+                    return False
+
+        if self.streaming:
+            for key in self.tracker.feed(text):
+                self.on_key(key, self._length)
+        return True
+
+    def finish(self):
+        """受信結果を確定"""
+        self.result.text = ''.join(self._parts)
+        self.result.elapsed_seconds = time.time() - self.start_time
+        if self.result.cancelled:
+            logger.info(f"   🛑 {self.label}: 受信をキャンセルしました（{self.result.elapsed_seconds:.1f}秒）")
+        elif self.result.refused and self.streaming:
+            logger.warning(
+                f"⚠️ {self.label}: 応答冒頭で拒否を検知し受信を中止"
+                f"（{self.result.elapsed_seconds:.1f}秒）: {self.result.text[:80]}"
+            )
+        elif is_refusal_text(self.result.text):
+            self.result.refused = True
+
+
+def stream_openai_chat(client,
+                       label: str = "OpenAI",
+                       on_key: Optional[Callable[[str, int], None]] = None,
+                       stream: Optional[bool] = None,
+                       cancel_event: Optional[threading.Event] = None,
+                       **params) -> StreamResult:
+    """OpenAI Chat Completions をストリーミングで呼び出し
+
+    Args:
+        client: openai.OpenAIクライアント
+        label: 進捗表示用の名前
+        on_key: トップレベル項目の受信完了時に呼ばれる関数 (項目名, 受信文字数)
+        stream: ストリーミングするか（未指定時は ENABLE_STREAMING）
+        cancel_event: セットされたら受信を中止するイベント（ヘッジリクエストの敗者側）
+        **params: chat.completions.create の引数
+
+    Returns:
+        StreamResult
+    """
+    streaming = ENABLE_STREAMING if stream is None else stream
+    result = StreamResult()
+    collector = _StreamCollector(result, label, on_key, streaming=streaming, cancel_event=cancel_event)
+
+    if not streaming:
+        response = client.chat.completions.create(**params)
+        message = response.choices[0].message
+        collector.add(message.content or '')
+        result.usage = getattr(response, 'usage', None)
+        result.finish_reason = response.choices[0].finish_reason
+        if getattr(message, 'refusal', None):
+            result.refused = True
+        collector.finish()
+        return result
+
+    response_stream = client.chat.completions.create(
+        stream=True,
+        stream_options={"include_usage": True},
+        **params
+    )
+    try:
+        for chunk in response_stream:
+            if getattr(chunk, 'usage', None):
+                result.usage = chunk.usage
+            if not chunk.choices:
+                continue
+
+            choice = chunk.choices[0]
+            if choice.finish_reason:
+                result.finish_reason = choice.finish_reason
+
+            # Structured Outputs 等の明示的な拒否
+            if getattr(choice.delta, 'refusal', None):
+                result.refused = True
+                collector.add(choice.delta.refusal)
+                break
+
+            if not collector.add(choice.delta.content or ''):
+                break
+    finally:
+        response_stream.close()
+
+    collector.finish()
+    return result
+
+
+def stream_anthropic_message(client,
+                             label: str = "Claude",
+                             on_key: Optional[Callable[[str, int], None]] = None,
+                             stream: Optional[bool] = None,
+                             cancel_event: Optional[threading.Event] = None,
+                             **params) -> StreamResult:
+    """Anthropic Messages をストリーミングで呼び出し
+
+    Args:
+        client: anthropic.Anthropicクライアント
+        label: 進捗表示用の名前
+        on_key: トップレベル項目の受信完了時に呼ばれる関数 (項目名, 受信文字数)
+        stream: ストリーミングするか（未指定時は ENABLE_STREAMING）
+        cancel_event: セットされたら受信を中止するイベント（ヘッジリクエストの敗者側）
+        **params: messages.create の引数
+
+    Returns:
+        StreamResult
+    """
+    streaming = ENABLE_STREAMING if stream is None else stream
+    result = StreamResult()
+    collector = _StreamCollector(result, label, on_key, streaming=streaming, cancel_event=cancel_event)
+
+    if not streaming:
+        message = client.messages.create(**params)
+        collector.add(anthropic_message_text(message.content))
+        result.usage = getattr(message, 'usage', None)
+        result.finish_reason = message.stop_reason
+        if message.stop_reason == 'refusal':
+            result.refused = True
+        collector.finish()
+        return result
+
+    with client.messages.stream(**params) as message_stream:
+        completed = True
+        for event in message_stream:
+            if event.type != 'content_block_delta':
+                continue
+
+            # テキスト出力、またはtool use（構造化出力）の入力JSON
+            if event.delta.type == 'text_delta':
+                text = event.delta.text
+            elif event.delta.type == 'input_json_delta':
+                text = event.delta.partial_json
+            else:
+                continue
+
+            if not collector.add(text):
+                completed = False
+                break
+
+        # 途中で打ち切った場合は残りを受信しない
+        if completed:
+            final_message = message_stream.get_final_message()
+            result.usage = getattr(final_message, 'usage', None)
+            result.finish_reason = final_message.stop_reason
+            if final_message.stop_reason == 'refusal':
+                result.refused = True
+
+    collector.finish()
+    return result
+
+
+def anthropic_message_text(content_blocks) -> str:
+    """Anthropicの応答ブロックから出力テキストを取得
+
+    tool use（構造化出力）の場合は入力をJSON文字列として返します。
+    """
+    for block in content_blocks:
+        if getattr(block, 'type', '') == 'tool_use':
+            return json.dumps(block.input, ensure_ascii=False)
+    return ''.join(
+        block.text for block in content_blocks if getattr(block, 'type', '') == 'text'
+    )
@@ -31,6 +31,7 @@ import os
 import sys
 import json
 import re
+import time
 from typing import List, Dict, Optional, Tuple, Any
 from datetime import datetime
 from collections import defaultdict
@@ -40,7 +41,8 @@ try:
     import global_config as gconfig
     from src.case_manager import CaseManager
     from src.gdrive_database_manager import GDriveDatabaseManager, create_database_manager
-    from anthropic import Anthropic
+    from src.api_clients import get_anthropic_client
+    from src.ai_telemetry import ai_telemetry, extract_usage
     from dotenv import load_dotenv
     from googleapiclient.http import MediaFileUpload
     
@@ -172,7 +174,7 @@ class TimelineBuilder:
         if self.use_ai:
             api_key = os.getenv('ANTHROPIC_API_KEY')
             if api_key:
-                self.anthropic_client = Anthropic(api_key=api_key)
+                self.anthropic_client = get_anthropic_client(api_key)  # プロセス全体で共有（接続を再利用）
             else:
                 print("⚠️ ANTHROPIC_API_KEY が設定されていません。AI 機能は無効化されます。")
                 print("   .env ファイルに ANTHROPIC_API_KEY=sk-ant-... を設定してください。")
@@ -181,6 +183,21 @@ class TimelineBuilder:
         else:
             self.anthropic_client = None
     
+    def _create_message(self, label: str, **params):
+        """Claude API呼び出し（トークン・所要時間・推定コストをテレメトリに記録）"""
+        start_time = time.time()
+        try:
+            response = self.anthropic_client.messages.create(**params)
+        except Exception:
+            ai_telemetry.record_call('timeline_builder', 'anthropic', params.get('model'), None,
+                                     time.time() - start_time, status='error', label=label)
+            raise
+        
+        ai_telemetry.record_call('timeline_builder', 'anthropic', params.get('model'),
+                                 extract_usage(getattr(response, 'usage', None), 'anthropic'),
+                                 time.time() - start_time, label=label)
+        return response
+    
     def _load_database(self) -> Dict:
         """データベースをロード"""
         try:
@@ -854,7 +871,8 @@ class TimelineBuilder:
         
         try:
             # Claude API を呼び出し
-            response = self.anthropic_client.messages.create(
+            response = self._create_message(
+                "ストーリー生成",
                 model="claude-sonnet-4-20250514",
                 max_tokens=8000,
                 temperature=0.3,
@@ -1134,7 +1152,8 @@ class TimelineBuilder:
 """
         
         try:
-            response = self.anthropic_client.messages.create(
+            response = self._create_message(
+                "ストーリー改善",
                 model="claude-sonnet-4-20250514",
                 max_tokens=8000,
                 temperature=0.3,
@@ -0,0 +1,143 @@
+"""
+Vision APIの詳細度（detail）の選択
+- ローカルの軽量な指標（OCR文字数・エッジ密度・画像サイズ・ファイルタイプ）から
+  画像ごとに detail（low/high）・タイル数の上限・モデルを決定
+- 文字のない写真は detail=low（512px・固定85トークン）で送信し、トークンと応答時間を削減
+- 文字・細部の多い画像と文書ページは従来どおり detail=high
+
+low で分析した結果の品質評価が閾値未満の場合は、呼び出し側（AIAnalyzerComplete）が high で再分析します。
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+from global_config import *
+
+logger = logging.getLogger(__name__)
+
+# 画像処理
+try:
+    from PIL import Image, ImageFilter, ImageOps
+    PILLOW_AVAILABLE = True
+except ImportError:
+    PILLOW_AVAILABLE = False
+
+# エッジ密度の計算に使う縮小サイズ（長辺）
+EDGE_SAMPLE_SIZE = 256
+
+# エッジとみなす輝度差
+EDGE_PIXEL_THRESHOLD = 48
+
+
+class VisionDetailSelector:
+    """画像ごとのVision API詳細度を選択"""
+
+    def select(self,
+               image_paths: List[str],
+               file_type: str,
+               file_content: Optional[Dict] = None) -> Dict:
+        """1リクエスト分の画像の詳細度を決定
+
+        Args:
+            image_paths: 送信する画像（複数ページの場合はページ順）
+            file_type: ファイルタイプ（image / pdf / document）
+            file_content: FileProcessorの処理結果（OCR文字数の取得に使用）
+
+        Returns:
+            {"detail": "low" / "high", "image_profile": VISION_IMAGE_LIMITS のキー,
+             "model": モデルID, "max_tiles": タイル数の上限, "reasons": [...], "signals": {...}}
+        """
+        if not ENABLE_ADAPTIVE_VISION_DETAIL:
+            return self._plan('high', ["適応的な詳細度選択が無効"], {})
+
+        # 文書ページは文字が主体のため常に high
+        if file_type in ('pdf', 'document') or len(image_paths) != 1:
+            return self._plan('high', [f"{file_type}のページ画像"], {"file_type": file_type})
+
+        signals = {"file_type": file_type, "ocr_chars": self._ocr_chars(file_content)}
+        signals.update(self._image_signals(image_paths[0]))
+
+        ocr_chars = signals['ocr_chars']
+        edge_density = signals.get('edge_density')
+        long_side = signals.get('long_side')
+
+        if edge_density is None and ocr_chars is None:
+            return self._plan('high', ["画像の指標を取得できないため high"], signals)
+
+        if ocr_chars is not None and ocr_chars >= VISION_DETAIL_DENSE_TEXT_CHARS:
+            return self._plan('high', [f"OCR文字数 {ocr_chars}"], signals)
+
+        if edge_density is not None and edge_density >= VISION_DETAIL_EDGE_DENSITY_HIGH:
+            return self._plan('high', [f"エッジ密度 {edge_density:.2f}（細部・小さな文字）"], signals)
+
+        if ocr_chars is not None and ocr_chars >= VISION_DETAIL_TEXT_CHARS:
+            # 文字は少ないが読み取りが必要 → タイル数を抑えた high
+            return self._plan('high', [f"OCR文字数 {ocr_chars}（少量）"], signals, profile='openai_medium')
+
+        if long_side is not None and long_side <= 512:
+            return self._plan('low', [f"小さな画像（長辺 {long_side}px）"], signals)
+
+        reasons = ["文字をほとんど含まない画像"]
+        if edge_density is not None:
+            reasons.append(f"エッジ密度 {edge_density:.2f}")
+        return self._plan('low', reasons, signals)
+
+    def escalate(self, plan: Dict, reason: str) -> Dict:
+        """high に引き上げた計画"""
+        escalated = self._plan('high', plan['reasons'] + [reason], plan['signals'])
+        escalated['escalated_from'] = plan['detail']
+        return escalated
+
+    def _plan(self, detail: str, reasons: List[str], signals: Dict, profile: Optional[str] = None) -> Dict:
+        profile = profile or ('openai_low' if detail == 'low' else 'openai')
+        limits = VISION_IMAGE_LIMITS[profile]
+        if detail == 'low':
+            max_tiles = 0
+        else:
+            tile = limits['tile_size']
+            max_tiles = -(-limits['max_long_side'] // tile) * -(-limits['max_short_side'] // tile)
+        return {
+            "detail": detail,
+            "image_profile": profile,
+            "model": VISION_LOW_DETAIL_MODEL if detail == 'low' else OPENAI_MODEL,
+            "max_tiles": max_tiles,
+            "reasons": reasons,
+            "signals": signals
+        }
+
+    def _ocr_chars(self, file_content: Optional[Dict]) -> Optional[int]:
+        """信頼できるOCR文字数（空白を除く、OCR未実行ならNone）
+
+        写真に対するOCRは誤認識の文字列を返しやすいため、
+        信頼度が VISION_DETAIL_MIN_OCR_CONFIDENCE 未満の場合は0文字とみなします。
+        """
+        content = (file_content or {}).get('content') or {}
+        if 'ocr_text' not in content:
+            return None
+        if (content.get('ocr_confidence') or 0.0) < VISION_DETAIL_MIN_OCR_CONFIDENCE:
+            return 0
+        return sum(1 for ch in content.get('ocr_text') or '' if not ch.isspace())
+
+    def _image_signals(self, image_path: str) -> Dict:
+        """画像サイズとエッジ密度（エッジ画素の割合）"""
+        if not PILLOW_AVAILABLE:
+            return {}
+        try:
+            with Image.open(image_path) as img:
+                width, height = img.size
+                gray = ImageOps.exif_transpose(img).convert('L')
+                gray.thumbnail((EDGE_SAMPLE_SIZE, EDGE_SAMPLE_SIZE))
+                edges = gray.filter(ImageFilter.FIND_EDGES)
+                histogram = edges.histogram()
+                edge_pixels = sum(histogram[EDGE_PIXEL_THRESHOLD:])
+                edge_density = edge_pixels / max(1, edges.width * edges.height)
+        except Exception as e:
+            logger.debug(f"エッジ密度の計算失敗: {e}")
+            return {}
+
+        return {
+            "width": width,
+            "height": height,
+            "long_side": max(width, height),
+            "edge_density": round(edge_density, 3)
+        }
@@ -0,0 +1,261 @@
+"""
+Vision API送信前の画像前処理
+- プロバイダーごとの最適解像度・タイル構成に縮小
+- EXIF等のメタデータを除去（向きは画素に反映してから除去）
+- JPEGで再エンコード（IMAGE_COMPRESSION_QUALITY）
+- 元画像のハッシュをキーにLOCAL_CACHE_DIRへキャッシュ
+- エンコード済みペイロード（バイト列・Base64等）をプロセス内でメモ化し、
+  プロバイダー再試行・リトライ・AI編集で同じ画像を再読み込み・再エンコードしない
+
+プロバイダー側でも同じ上限まで縮小されるため、モデルが読み取れる内容は変わらず、
+リクエストサイズ・アップロード時間・画像トークンのみが削減されます。
+"""
+
+import io
+import os
+import math
+import base64
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from global_config import *
+
+logger = logging.getLogger(__name__)
+
+# 画像処理
+try:
+    from PIL import Image, ImageOps
+    PILLOW_AVAILABLE = True
+    # HEIC対応
+    try:
+        from pillow_heif import register_heif_opener
+        register_heif_opener()
+    except ImportError:
+        pass
+except ImportError:
+    PILLOW_AVAILABLE = False
+
+
+class ImagePayload:
+    """Vision APIに送信する画像（一度だけエンコードし、全呼び出しで共有）"""
+
+    def __init__(self,
+                 mime_type: str,
+                 data: bytes,
+                 width: Optional[int] = None,
+                 height: Optional[int] = None):
+        self.mime_type = mime_type
+        self.data = data
+        self.width = width
+        self.height = height
+        self._base64: Optional[str] = None
+
+    @property
+    def base64(self) -> str:
+        """Base64文字列（初回アクセス時のみエンコード）"""
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self.data).decode('utf-8')
+        return self._base64
+
+    @property
+    def data_url(self) -> str:
+        """data URL形式（OpenAIのimage_url用）"""
+        return f"data:{self.mime_type};base64,{self.base64}"
+
+
+# プロセス全体で共有するペイロードのメモ
+# ファイル識別（パス・更新時刻・サイズ） → 元画像ハッシュ、(元画像ハッシュ, プロバイダー) → ペイロード
+_source_hashes: Dict[Tuple[str, float, int], str] = {}
+_payloads: "OrderedDict[Tuple[str, str], ImagePayload]" = OrderedDict()
+_payload_lock = threading.Lock()
+
+
+class VisionImagePreprocessor:
+    """Vision API用の画像前処理（プロバイダー別）"""
+
+    def __init__(self, cache_dir: str = None, enabled: bool = None):
+        """初期化
+
+        Args:
+            cache_dir: 前処理済み画像の保存先（未指定時は LOCAL_CACHE_DIR/vision_images）
+            enabled: キャッシュを有効にするか（未指定時は ENABLE_CACHING）
+        """
+        self.cache_dir = cache_dir or os.path.join(LOCAL_CACHE_DIR, "vision_images")
+        self.cache_enabled = ENABLE_CACHING if enabled is None else enabled
+
+        if self.cache_enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def prepare(self, image_path: str, provider: str = 'openai') -> Tuple[str, bytes]:
+        """Vision APIに送信する画像を準備
+
+        Args:
+            image_path: 元画像のパス
+            provider: 'openai' または 'anthropic'
+
+        Returns:
+            (MIMEタイプ, 画像バイト列)
+            前処理できない場合は元画像をそのまま返します。
+        """
+        payload = self.get_payload(image_path, provider)
+        return payload.mime_type, payload.data
+
+    def get_payload(self, image_path: str, provider: str = 'openai') -> ImagePayload:
+        """Vision APIに送信する画像ペイロードを取得（プロセス内でメモ化）
+
+        同じファイル・プロバイダーの2回目以降はディスク読み込み・再エンコードを行いません。
+
+        Args:
+            image_path: 元画像のパス
+            provider: 'openai' または 'anthropic'
+        """
+        stat = os.stat(image_path)
+        file_key = (os.path.abspath(image_path), stat.st_mtime, stat.st_size)
+
+        with _payload_lock:
+            source_hash = _source_hashes.get(file_key)
+            payload = _payloads.get((source_hash, provider)) if source_hash else None
+            if payload is not None:
+                _payloads.move_to_end((source_hash, provider))
+                return payload
+
+        with open(image_path, 'rb') as f:
+            source_bytes = f.read()
+        source_hash = hashlib.sha256(source_bytes).hexdigest()
+
+        with _payload_lock:
+            _source_hashes[file_key] = source_hash
+            payload = _payloads.get((source_hash, provider))
+        if payload is None:
+            payload = self._build_payload(image_path, source_bytes, source_hash, provider)
+
+        with _payload_lock:
+            _payloads[(source_hash, provider)] = payload
+            _payloads.move_to_end((source_hash, provider))
+            while len(_payloads) > IMAGE_PAYLOAD_MEMO_SIZE:
+                _payloads.popitem(last=False)
+        return payload
+
+    def _build_payload(self, image_path: str, source_bytes: bytes, source_hash: str, provider: str) -> ImagePayload:
+        """前処理（ディスクキャッシュがあれば再利用）してペイロードを作成"""
+        if not PILLOW_AVAILABLE:
+            return ImagePayload(self._guess_mime_type(image_path), source_bytes)
+
+        limits = VISION_IMAGE_LIMITS.get(provider, VISION_IMAGE_LIMITS['openai'])
+        cache_path = self._cache_path(source_hash, provider, limits)
+
+        if self.cache_enabled and os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                data = f.read()
+            with Image.open(io.BytesIO(data)) as img:
+                return ImagePayload('image/jpeg', data, img.width, img.height)
+
+        try:
+            processed, (width, height) = self._process(source_bytes, limits)
+        except Exception as e:
+            logger.warning(f"⚠️ 画像前処理失敗（元画像を送信します）: {e}")
+            return ImagePayload(self._guess_mime_type(image_path), source_bytes)
+
+        logger.info(
+            f"   🖼️ 画像前処理（{provider}）: "
+            f"{len(source_bytes) / 1024:.0f}KB → {len(processed) / 1024:.0f}KB"
+        )
+
+        if self.cache_enabled:
+            self._save_cache(cache_path, processed)
+
+        return ImagePayload('image/jpeg', processed, width, height)
+
+    def _process(self, source_bytes: bytes, limits: Dict) -> Tuple[bytes, Tuple[int, int]]:
+        """縮小・メタデータ除去・JPEG再エンコード
+
+        Returns:
+            (JPEGバイト列, (幅, 高さ))
+        """
+        with Image.open(io.BytesIO(source_bytes)) as img:
+            # EXIFの回転情報を画素に反映（メタデータ除去後も向きを保つ）
+            img = ImageOps.exif_transpose(img)
+
+            # 透過画像は白背景に合成
+            if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+                img = img.convert('RGBA')
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                background.paste(img, mask=img.split()[-1])
+                img = background
+            elif img.mode != 'RGB':
+                img = img.convert('RGB')
+
+            target_size = self._target_size(img.width, img.height, limits)
+            if target_size != img.size:
+                img = img.resize(target_size, Image.LANCZOS)
+
+            # メタデータを付けずに保存
+            output = io.BytesIO()
+            img.save(output, 'JPEG', quality=IMAGE_COMPRESSION_QUALITY, optimize=True)
+            return output.getvalue(), img.size
+
+    def _target_size(self, width: int, height: int, limits: Dict) -> Tuple[int, int]:
+        """プロバイダーの上限に合わせた縮小後サイズを計算"""
+        scale = 1.0
+
+        # 全体の上限（IMAGE_MAX_SIZE）
+        max_w, max_h = IMAGE_MAX_SIZE
+        long_side, short_side = max(width, height), min(width, height)
+        scale = min(scale, max(max_w, max_h) / long_side, min(max_w, max_h) / short_side)
+
+        # プロバイダー別の上限
+        if limits.get('max_long_side'):
+            scale = min(scale, limits['max_long_side'] / long_side)
+        if limits.get('max_short_side'):
+            scale = min(scale, limits['max_short_side'] / short_side)
+        if limits.get('max_pixels'):
+            scale = min(scale, math.sqrt(limits['max_pixels'] / (width * height)))
+
+        new_w, new_h = width * scale, height * scale
+
+        # タイル境界をわずかに超える場合はタイル数が増えないよう縮める
+        tile = limits.get('tile_size')
+        if tile:
+            tile_scale = 1.0
+            for side in (new_w, new_h):
+                tiles = math.ceil(side / tile)
+                if tiles > 1 and side - (tiles - 1) * tile <= tile * 0.05:
+                    tile_scale = min(tile_scale, (tiles - 1) * tile / side)
+            new_w, new_h = new_w * tile_scale, new_h * tile_scale
+
+        return max(1, int(new_w)), max(1, int(new_h))
+
+    def _cache_path(self, source_hash: str, provider: str, limits: Dict) -> str:
+        """元画像ハッシュ・プロバイダー・設定からキャッシュパスを生成"""
+        settings = f"{provider}:{sorted(limits.items())}:{IMAGE_MAX_SIZE}:{IMAGE_COMPRESSION_QUALITY}"
+        settings_hash = hashlib.sha256(settings.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{source_hash}_{settings_hash}.jpg")
+
+    def _save_cache(self, cache_path: str, data: bytes):
+        """前処理済み画像を保存"""
+        tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"⚠️ 前処理画像のキャッシュ保存失敗: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _guess_mime_type(self, file_path: str) -> str:
+        """拡張子からMIMEタイプを推定"""
+        ext = os.path.splitext(file_path)[1].lower()
+        mime_types = {
+            '.jpg': 'image/jpeg',
+            '.jpeg': 'image/jpeg',
+            '.png': 'image/png',
+            '.gif': 'image/gif',
+            '.webp': 'image/webp'
+        }
+        return mime_types.get(ext, 'image/jpeg')
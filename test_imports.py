@@ -32,6 +32,25 @@ test_modules = [
     ("src.ai_analyzer_complete", "AI分析"),
     ("src.evidence_editor_ai", "証拠編集"),
     ("src.timeline_builder", "タイムライン構築"),
+    ("src.api_clients", "APIクライアント"),
+    ("src.analysis_schema", "分析結果スキーマ"),
+    ("src.analysis_cache", "分析結果キャッシュ"),
+    ("src.prompt_compactor", "プロンプト圧縮"),
+    ("src.streaming_response", "ストリーミング受信"),
+    ("src.provider_router", "プロバイダールーティング"),
+    ("src.refusal_predictor", "拒否予測"),
+    ("src.ai_cassette", "AI呼び出しの記録・再生"),
+    ("src.ai_telemetry", "AI呼び出しの計測"),
+    ("src.batch_providers", "バッチAPI"),
+    ("src.parallel_analyzer", "並列分析"),
+    ("src.evidence_artifacts", "証拠ファイルの中間生成物"),
+    ("src.pdf_page_sampler", "PDFページ選択"),
+    ("src.vision_detail_selector", "Vision解像度選択"),
+    ("src.vision_image_preprocessor", "Vision画像前処理"),
+    ("src.local_date_extractor", "ローカル日付抽出"),
+    ("src.ocr_engine", "OCRエンジン"),
+    ("src.ocr_cache", "OCRキャッシュ"),
+    ("src.ocr_language_selector", "OCR言語選択"),
 ]
 
 errors = []